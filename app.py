@@ -1,15 +1,28 @@
+import argparse
+from contextlib import asynccontextmanager
 import logging
+import os
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from lockana.api.v1 import api_router
 from lockana.config import (
     APP_HOST, APP_PORT, APP_PREFIX, CORS_ENABLED, CORS_ORIGINS, CORS_METHODS, 
-    CORS_HEADERS, CORS_CREDENTIALS, CORS_MAX_AGE
+    CORS_HEADERS, CORS_CREDENTIALS, CORS_MAX_AGE,
+    SERVER_WORKERS, SERVER_LOOP, SERVER_HTTP, SERVER_TIMEOUT_KEEP_ALIVE,
+    SERVER_BACKLOG, SERVER_LIMIT_CONCURRENCY, RATE_LIMIT_ENABLED
 )
+from lockana.database.database import _db_instance
 from lockana.database.database_setup import create_database_tables
+from lockana.database.migrations import current_revision, head_revision, upgrade, verify_schema_version
 from lockana import logging_config 
 from lockana.error_handlers import exception_handlers
+from lockana.metrics import render_metrics
+from lockana.ratelimit import RateLimitMiddleware
+from lockana.crypto import CRYPTO_EXECUTOR
+from lockana.api.v1.auth.jwt import start_revocation_sync, stop_revocation_sync
+from lockana.api.v1.auth.keys import JWT_KEYS
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +30,29 @@ def get_base_url(request: Request) -> str:
     """Получение базового URL приложения"""
     return f"{request.base_url.scheme}://{request.base_url.netloc}"
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Жизненный цикл воркера: синхронизация отозванных токенов с Redis запускается при старте,
+    пул процессов криптографических операций создается по требованию и закрывается при остановке
+    """
+    await start_revocation_sync()
+    yield
+    await stop_revocation_sync()
+    CRYPTO_EXECUTOR.shutdown()
+
 def create_app() -> FastAPI:
     """Создание и настройка приложения FastAPI"""
     app = FastAPI(
         title="Lockana API",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
 
+    """Ограничение частоты запросов (добавляется до CORS, чтобы ответ 429 получал заголовки CORS)"""
+    if RATE_LIMIT_ENABLED:
+        app.add_middleware(RateLimitMiddleware)
+
     """Настройка CORS"""
     if CORS_ENABLED:
         logger.info("CORS enabled")
@@ -41,6 +70,17 @@ def create_app() -> FastAPI:
 
     app.include_router(api_router, prefix=APP_PREFIX)
 
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Метрики в формате Prometheus"""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+    @app.get("/.well-known/jwks.json", include_in_schema=False)
+    async def jwks():
+        """Открытые ключи подписи JWT для проверки токенов другими сервисами"""
+        return JSONResponse(content=JWT_KEYS.jwks(), headers={"Cache-Control": "public, max-age=300"})
+
     @app.get("/")
     async def root(request: Request):
         """Корневой эндпоинт"""
@@ -69,12 +109,86 @@ def create_app() -> FastAPI:
 
     return app
 
-if __name__ == '__main__':
-    create_database_tables()
-    app = create_app()
-    logger.info("Запуск Lockana...")
+def prepare_database():
+    """
+    Проверяет версию схемы базы данных один раз до запуска воркеров.
+
+    Выполняется один запрос к таблице `schema_version`; схема не изменяется.
+    После проверки соединения главного процесса закрываются, чтобы воркеры
+    не наследовали их и открывали собственные пулы.
+    """
+    version = verify_schema_version(_db_instance.engine)
+    logger.info(f"Версия схемы базы данных: {version}")
+    _db_instance.close()
+
+def migrate_database(target: str = None, status_only: bool = False):
+    """Применение миграций схемы базы данных (команда `migrate`)"""
+    if status_only:
+        with _db_instance.engine.connect() as conn:
+            current = current_revision(conn)
+        print(f"Текущая версия схемы: {current or 'отсутствует'}, последняя ревизия: {head_revision()}")
+        return
+    if target is None:
+        create_database_tables()
+    else:
+        upgrade(_db_instance.engine, target)
+    _db_instance.close()
+
+def run_server(workers: int):
+    """Запуск uvicorn с настройками из секции `server` конфигурации"""
     uvicorn.run(
-        app, 
-        host=APP_HOST, 
-        port=APP_PORT
-    )
\ No newline at end of file
+        "app:create_app",
+        factory=True,
+        host=APP_HOST,
+        port=APP_PORT,
+        workers=workers,
+        loop=SERVER_LOOP,
+        http=SERVER_HTTP,
+        timeout_keep_alive=SERVER_TIMEOUT_KEEP_ALIVE,
+        backlog=SERVER_BACKLOG,
+        limit_concurrency=SERVER_LIMIT_CONCURRENCY or None
+    )
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Lockana API")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="serve",
+        choices=["serve", "migrate"],
+        help="serve - запуск API (по умолчанию), migrate - применение миграций схемы"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=SERVER_WORKERS,
+        help="Количество процессов-воркеров (0 - по числу ядер CPU)"
+    )
+    parser.add_argument(
+        "--skip-db-setup",
+        action="store_true",
+        help="Не проверять версию схемы базы данных перед запуском"
+    )
+    parser.add_argument(
+        "--to",
+        dest="target",
+        default=None,
+        help="migrate: ревизия, до которой обновить схему (по умолчанию - последняя)"
+    )
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        help="migrate: только показать текущую версию схемы"
+    )
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == "migrate":
+        migrate_database(args.target, args.status)
+    else:
+        workers = args.workers or os.cpu_count() or 1
+        if not args.skip_db_setup:
+            prepare_database()
+        logger.info(f"Запуск Lockana... (воркеров: {workers})")
+        run_server(workers)
@@ -0,0 +1,56 @@
+import time
+import pyotp
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from lockana.api.v1.auth.jwt import create_jwt_access_token, verify_jwt_token
+from lockana.api.v1.auth.keys import JWTKeySet, SigningKey
+from lockana.totp import TOTP_MANAGER
+from .harness import benchmark
+
+
+@benchmark("totp.check_totp_code")
+def setup_check_totp_code():
+    secret = TOTP_MANAGER.create_totp_secret()
+    code = pyotp.TOTP(secret, digits=TOTP_MANAGER.totp_code_len).now()
+    return lambda: TOTP_MANAGER.check_totp_code(code, secret)
+
+
+@benchmark("totp.check_totp_code.wrong_code")
+def setup_check_wrong_totp_code():
+    # Перебор кодов против одного секрета: коды шага вычисляются один раз
+    secret = TOTP_MANAGER.create_totp_secret()
+    code = "0" * TOTP_MANAGER.totp_code_len
+    return lambda: TOTP_MANAGER.check_totp_code(code, secret)
+
+
+@benchmark("jwt.create_access_token")
+def setup_create_access_token():
+    return lambda: create_jwt_access_token({"sub": "bench", "role": "user"})
+
+
+@benchmark("jwt.verify_token")
+def setup_verify_token():
+    token = create_jwt_access_token({"sub": "bench", "role": "user"})
+    return lambda: verify_jwt_token(token)
+
+
+def _key_set(algorithm: str) -> JWTKeySet:
+    private_key = ed25519.Ed25519PrivateKey.generate() if algorithm == "EdDSA" else ec.generate_private_key(ec.SECP256R1())
+    return JWTKeySet([SigningKey("bench", algorithm, private_key.public_key(), private_key)], "bench")
+
+
+def _register_signature_benchmarks(algorithm: str) -> None:
+    @benchmark(f"jwt.{algorithm.lower()}.sign")
+    def setup_sign():
+        keys = _key_set(algorithm)
+        claims = {"sub": "bench", "role": "user", "exp": int(time.time()) + 3600}
+        return lambda: keys.encode(claims)
+
+    @benchmark(f"jwt.{algorithm.lower()}.verify")
+    def setup_verify():
+        keys = _key_set(algorithm)
+        token = keys.encode({"sub": "bench", "role": "user", "exp": int(time.time()) + 3600})
+        return lambda: keys.decode(token)
+
+
+for _algorithm in ("EdDSA", "ES256"):
+    _register_signature_benchmarks(_algorithm)
@@ -0,0 +1,79 @@
+import os
+from cryptography.hazmat.primitives.asymmetric import rsa
+from lockana.crypto import decrypt_data, encrypt_data
+from lockana.crypto.envelope import envelope_aad, pack_envelope
+from lockana.crypto.keyring import DATA_KEY_ID, MasterKeyring, RSAKeyPair
+from lockana.crypto.registry import AES_GCM, CHACHA20_POLY1305
+from .harness import benchmark
+
+PAYLOAD_SIZES = (16, 256, 4096, 65536, 1024 * 1024)
+RSA_KEY_ID = 1
+
+
+def _payload(size: int) -> str:
+    return "s" * size
+
+
+def _register_aead(name: str, engine) -> None:
+    # encrypt_data шифрует алгоритмом из конфигурации, поэтому конверт собирается
+    # тем же путем, но выбранным алгоритмом
+    def encrypt(data: str, key: bytes) -> bytes:
+        aad = envelope_aad(engine.alg_id, DATA_KEY_ID)
+        nonce, ciphertext = engine.encrypt(key, data.encode(), aad)
+        return pack_envelope(engine.alg_id, DATA_KEY_ID, nonce, ciphertext)
+
+    for size in PAYLOAD_SIZES:
+        def setup_encrypt(size=size):
+            key, data = os.urandom(32), _payload(size)
+            return lambda: encrypt(data, key)
+
+        def setup_decrypt(size=size):
+            key = os.urandom(32)
+            envelope = encrypt(_payload(size), key)
+            return lambda: decrypt_data(envelope, key)
+
+        benchmark(f"crypto.{name}.encrypt[{size}]")(setup_encrypt)
+        benchmark(f"crypto.{name}.decrypt[{size}]")(setup_decrypt)
+
+
+_register_aead("aes", AES_GCM)
+_register_aead("chacha20", CHACHA20_POLY1305)
+
+
+_RSA_KEYRING = None
+
+
+def _rsa_keyring() -> MasterKeyring:
+    # Гибридный режим rsa: ключ данных шифруется RSA-OAEP, данные - AES-GCM
+    global _RSA_KEYRING
+    if _RSA_KEYRING is None:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=3072)
+        _RSA_KEYRING = MasterKeyring(
+            {0: os.urandom(32)}, RSA_KEY_ID, cache_size=1, cache_ttl_seconds=0,
+            rsa_keys={RSA_KEY_ID: RSAKeyPair(private_key.public_key(), private_key)}
+        )
+    return _RSA_KEYRING
+
+
+for _size in PAYLOAD_SIZES:
+    def _setup_rsa_encrypt(size=_size):
+        keyring, data = _rsa_keyring(), _payload(size)
+
+        def run():
+            data_key, wrapped = keyring.generate_data_key()
+            return encrypt_data(data, data_key, DATA_KEY_ID), wrapped
+        return run
+
+    def _setup_rsa_decrypt(size=_size):
+        keyring = _rsa_keyring()
+        data_key, wrapped = keyring.generate_data_key()
+        envelope = encrypt_data(_payload(size), data_key, DATA_KEY_ID)
+
+        def run():
+            # Кэш ключей данных очищается: измеряется расшифровка закрытым ключом RSA
+            keyring.clear_cache()
+            return decrypt_data(envelope, keyring.unwrap_data_key(wrapped))
+        return run
+
+    benchmark(f"crypto.rsa.encrypt[{_size}]")(_setup_rsa_encrypt)
+    benchmark(f"crypto.rsa.decrypt[{_size}]")(_setup_rsa_decrypt)
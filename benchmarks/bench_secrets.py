@@ -0,0 +1,61 @@
+import asyncio
+from lockana.api.v1.secrets.service import SecretService
+from lockana.database.database import _db_instance
+from lockana.database.database_setup import create_database_tables
+from .harness import benchmark
+
+USERNAME = "bench"
+SECRETS_COUNT = 1000
+SECRET_SIZE = 256
+LIST_PAGE_SIZE = 100
+
+_loop = None
+
+
+def _prepare() -> asyncio.AbstractEventLoop:
+    """
+    Создает схему и секреты пользователя один раз для всех бенчмарков сервиса.
+    """
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        create_database_tables()
+        with _db_instance.SessionLocal() as session:
+            service = SecretService(session)
+            for number in range(SECRETS_COUNT):
+                _loop.run_until_complete(service.add_secret(USERNAME, f"secret-{number}", "v" * SECRET_SIZE))
+            session.commit()
+    return _loop
+
+
+def _call(loop: asyncio.AbstractEventLoop, method: str, *args):
+    # Сессия на вызов, как сессия на запрос в API
+    with _db_instance.SessionLocal() as session:
+        result = loop.run_until_complete(getattr(SecretService(session), method)(*args))
+        session.commit()
+        return result
+
+
+@benchmark("secrets.service.get")
+def setup_get():
+    loop = _prepare()
+    return lambda: _call(loop, "get_secret", USERNAME, "secret-500")
+
+
+@benchmark(f"secrets.service.get_batch[{LIST_PAGE_SIZE}]")
+def setup_get_batch():
+    loop = _prepare()
+    names = [f"secret-{number}" for number in range(LIST_PAGE_SIZE)]
+    return lambda: _call(loop, "get_secrets", USERNAME, names)
+
+
+@benchmark(f"secrets.service.list[{LIST_PAGE_SIZE}]")
+def setup_list():
+    loop = _prepare()
+    return lambda: _call(loop, "list_secrets", USERNAME, LIST_PAGE_SIZE, None, False)
+
+
+@benchmark(f"secrets.service.list_names[{LIST_PAGE_SIZE}]")
+def setup_list_names():
+    loop = _prepare()
+    return lambda: _call(loop, "list_secrets", USERNAME, LIST_PAGE_SIZE, None, True)
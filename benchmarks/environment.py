@@ -0,0 +1,29 @@
+"""
+Окружение бенчмарков: SQLite во временном каталоге вместо MySQL и fakeredis вместо Redis.
+
+Модуль нужно импортировать до любого модуля `lockana`: конфигурация читается при импорте,
+а клиенты Redis создаются на уровне модуля `lockana.redis_client` (в режиме fake).
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="lockana-bench-")
+
+os.environ["DATABASE_STRING"] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+os.environ.pop("DATABASE_ASYNC_STRING", None)
+os.environ.setdefault("SECRET_KEY", "0123456789abcdef0123456789abcdef")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-jwt-secret")
+os.environ.pop("MASTER_KEYS", None)
+os.environ["REDIS_MODE"] = "fake"
+
+# config.yaml читается из текущего каталога
+os.chdir(ROOT)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    import fakeredis  # клиенты Redis создаются в режиме fake (redis.mode)
+except ImportError:
+    raise SystemExit("Для бенчмарков нужен fakeredis: pip install -r benchmarks/requirements.txt")
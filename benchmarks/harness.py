@@ -0,0 +1,147 @@
+import json
+import os
+import platform
+import re
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+class Benchmark(NamedTuple):
+    """
+    Зарегистрированный бенчмарк.
+
+    Атрибуты:
+        name (str): Уникальное имя, например "crypto.aes.encrypt[4096]".
+        setup (Callable): Вызывается один раз перед замером и возвращает функцию без аргументов,
+            время выполнения которой измеряется.
+    """
+    name: str
+    setup: Callable[[], Callable[[], object]]
+
+
+_BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str):
+    """
+    Декоратор, регистрирующий функцию подготовки бенчмарка.
+    """
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        _BENCHMARKS.append(Benchmark(name, setup))
+        return setup
+    return decorator
+
+
+def registered(pattern: Optional[str] = None) -> List[Benchmark]:
+    if not pattern:
+        return list(_BENCHMARKS)
+    regex = re.compile(pattern)
+    return [bench for bench in _BENCHMARKS if regex.search(bench.name)]
+
+
+def measure(fn: Callable[[], object], min_time: float, repeat: int) -> dict:
+    """
+    Измеряет время одного вызова функции.
+
+    Количество вызовов в серии подбирается так, чтобы серия длилась не меньше `min_time`,
+    затем выполняется `repeat` серий. В результат попадают медиана и минимум времени одного вызова.
+
+    Возвращает:
+        dict: median_s, min_s, stdev_s, loops, repeat.
+    """
+    fn()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed < min_time / 10 else max(2, int(min_time / max(elapsed, 1e-9)) + 1)
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def run(benchmarks: List[Benchmark], min_time: float, repeat: int, log: Callable[[str], None] = print) -> dict:
+    """
+    Выполняет бенчмарки и возвращает отчет в формате JSON-совместимого словаря.
+    """
+    results: Dict[str, dict] = {}
+    for bench in benchmarks:
+        result = measure(bench.setup(), min_time, repeat)
+        results[bench.name] = result
+        log(f"{bench.name:<48} {format_seconds(result['median_s']):>12}  (±{format_seconds(result['stdev_s'])}, {result['loops']}x{repeat})")
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "min_time": min_time,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[dict]:
+    """
+    Сравнивает отчет с базовой линией.
+
+    Параметры:
+        threshold (float): Допустимое замедление, например 1.5 - не более чем в полтора раза медленнее.
+
+    Возвращает:
+        List[dict]: Для каждого бенчмарка из обоих отчетов - name, baseline_s, current_s, ratio, regressed.
+    """
+    rows = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_s": base["median_s"],
+            "current_s": result["median_s"],
+            "ratio": ratio,
+            "regressed": ratio > threshold,
+        })
+    return rows
+
+
+def load_json(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as report_file:
+        return json.load(report_file)
+
+
+def save_json(path: str, data: dict) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as report_file:
+        json.dump(data, report_file, indent=2, ensure_ascii=False)
+        report_file.write("\n")
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
@@ -0,0 +1,84 @@
+"""
+Бенчмарки Lockana: криптография, TOTP, JWT и чтение секретов через SecretService.
+
+База данных - SQLite во временном каталоге, Redis - fakeredis (см. `benchmarks.environment`),
+поэтому запуск не требует внешних сервисов.
+
+Запуск (из корня репозитория):
+    python -m benchmarks.run                                  # все бенчмарки, отчет в bench_output.json
+    python -m benchmarks.run -k "crypto.aes"                  # только подходящие под регулярное выражение
+    python -m benchmarks.run --save-baseline                  # сохранить результат как базовую линию
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 1.5
+
+Код возврата 1 означает, что хотя бы один бенчмарк медленнее базовой линии больше чем в `threshold` раз.
+Базовую линию нужно снимать на той же машине (CI-раннере), на которой выполняется сравнение.
+"""
+import argparse
+import os
+import sys
+from benchmarks import environment
+from benchmarks import harness
+
+DEFAULT_BASELINE = os.path.join(environment.ROOT, "benchmarks", "baseline.json")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарки Lockana")
+    parser.add_argument("-k", "--filter", default=None, help="Регулярное выражение для имен бенчмарков")
+    parser.add_argument("--output", default="bench_output.json", help="Файл отчета JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Базовая линия для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.5, help="Допустимое замедление относительно базовой линии")
+    parser.add_argument("--save-baseline", action="store_true", help="Записать результат в файл базовой линии")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Минимальная длительность серии в секундах")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество серий")
+    parser.add_argument("--list", action="store_true", help="Показать имена бенчмарков и выйти")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    # Модули регистрируют бенчмарки при импорте и импортируют lockana после подготовки окружения
+    from benchmarks import bench_auth, bench_crypto, bench_secrets  # noqa: F401
+
+    benchmarks = harness.registered(args.filter)
+    if args.list:
+        print("\n".join(bench.name for bench in benchmarks))
+        return 0
+    if not benchmarks:
+        print("❌ Нет бенчмарков, подходящих под фильтр")
+        return 1
+
+    report = harness.run(benchmarks, args.min_time, args.repeat)
+    harness.save_json(args.output, report)
+    print(f"📄 Отчет: {args.output}")
+
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            # Бенчмарки, не вошедшие в текущий запуск (-k), сохраняются из прежней базовой линии
+            previous = harness.load_json(args.baseline)
+            report = {"meta": report["meta"], "results": {**previous.get("results", {}), **report["results"]}}
+        harness.save_json(args.baseline, report)
+        print(f"📌 Базовая линия сохранена: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Базовая линия {args.baseline} не найдена, сравнение пропущено (--save-baseline, чтобы создать)")
+        return 0
+
+    rows = harness.compare(report, harness.load_json(args.baseline), args.threshold)
+    regressions = [row for row in rows if row["regressed"]]
+    for row in rows:
+        status = "FAIL" if row["regressed"] else "OK"
+        print(
+            f"[{status}] {row['name']:<48} {harness.format_seconds(row['baseline_s']):>12} -> "
+            f"{harness.format_seconds(row['current_s']):>12}  x{row['ratio']:.2f}"
+        )
+    if regressions:
+        print(f"❌ Замедление больше чем в {args.threshold} раза: {len(regressions)} из {len(rows)}")
+        return 1
+    print(f"✅ Регрессий нет ({len(rows)} бенчмарков сравнено, порог x{args.threshold})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Конфигурация gunicorn для запуска Lockana с воркерами uvicorn.
+
+Запуск:
+    gunicorn "app:create_app()" -c gunicorn.conf.py
+
+Версия схемы базы данных проверяется один раз в главном процессе (`on_starting`),
+миграции выполняются отдельно командой `python app.py migrate`.
+Параметры берутся из секций `app` и `server` файла config.yaml.
+"""
+import os
+from uvicorn.workers import UvicornWorker
+from lockana.config import (
+    APP_HOST, APP_PORT, SERVER_WORKERS, SERVER_LOOP, SERVER_HTTP,
+    SERVER_TIMEOUT_KEEP_ALIVE, SERVER_BACKLOG, SERVER_LIMIT_CONCURRENCY
+)
+
+
+class LockanaUvicornWorker(UvicornWorker):
+    """
+    Воркер uvicorn с параметрами из секции `server`.
+
+    UvicornWorker берет из настроек gunicorn только keepalive, backlog и таймауты,
+    а `worker_connections` игнорирует: ограничение одновременных соединений, цикл событий
+    и HTTP-парсер передаются в `uvicorn.Config` через `CONFIG_KWARGS`, как при запуске `app.py`.
+    """
+    CONFIG_KWARGS = {
+        "loop": SERVER_LOOP,
+        "http": SERVER_HTTP,
+        "limit_concurrency": SERVER_LIMIT_CONCURRENCY or None,
+    }
+
+
+bind = f"{APP_HOST}:{APP_PORT}"
+workers = SERVER_WORKERS or os.cpu_count() or 1
+worker_class = LockanaUvicornWorker
+keepalive = SERVER_TIMEOUT_KEEP_ALIVE
+backlog = SERVER_BACKLOG
+preload_app = True
+
+
+def on_starting(server):
+    from app import prepare_database
+    prepare_database()
+
+
+def post_fork(server, worker):
+    # Пулы соединений, созданные до fork, не должны использоваться воркерами
+    from lockana.database.database import _db_instance
+    _db_instance.engine.dispose(close=False)
+    if _db_instance.async_engine is not None:
+        _db_instance.async_engine.sync_engine.dispose(close=False)
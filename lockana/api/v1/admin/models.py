@@ -1,4 +1,21 @@
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
 class CreateUser(BaseModel):
-    username: str 
\ No newline at end of file
+    username: str 
+class StartKeyRotation(BaseModel):
+    mode: Literal["auto", "reencrypt"] = "auto"
+    resume_job_id: Optional[int] = None
+
+class CreateServiceAccount(BaseModel):
+    name: str
+    roles: List[str] = []
+
+class CreateApiKey(BaseModel):
+    service_account: str
+    name: str
+    scopes: Optional[List[str]] = None
+    expires_in_days: Optional[int] = None
+
+class RevokeApiKey(BaseModel):
+    key_id: str
@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from lockana.database.database import get_db
-from lockana.api.v1.auth.jwt import oauth2_scheme, verify_jwt_token
-from lockana.permissions import check_permission
-from .models import CreateUser
+from lockana.permissions import Principal, check_permission, check_role, get_principal
+from .models import CreateApiKey, CreateServiceAccount, CreateUser, RevokeApiKey, StartKeyRotation
 from .service import AdminService
 from lockana.exceptions import (
+    BadRequestError,
+    ConflictError,
     InvalidTokenError,
     ResourceNotFoundError,
     PermissionDeniedError,
@@ -19,14 +20,15 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.post("/users/create")
+@check_role("admin")
 @check_permission("manage")
-def create_user(user_data: CreateUser, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def create_user(user_data: CreateUser, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     """
     Создает нового пользователя в базе данных.
 
     Args:
         user_data (CreateUser): Данные нового пользователя.
-        token (str, optional): Токен аутентификации, получаемый через OAuth2.
+        principal (Principal): Субъект запроса, полученный из токена аутентификации.
         db (Session, optional): Сессия базы данных.
 
     Returns:
@@ -35,13 +37,13 @@ def create_user(user_data: CreateUser, token: str = Depends(oauth2_scheme), db:
             - 401: Ошибка аутентификации.
             - 500: Внутренняя ошибка сервера.
     """
-    username: str = verify_jwt_token(token, required_role="admin")
+    username: str = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid auth data")
         
         service = AdminService(db)
-        user_id = service.create_user(user_data.username)
+        user_id = await service.create_user(user_data.username)
         return JSONResponse({"message": "User created successfully", "user_id": user_id}, status_code=201)
     except InvalidTokenError as e:
         return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
@@ -50,14 +52,15 @@ def create_user(user_data: CreateUser, token: str = Depends(oauth2_scheme), db:
         raise InternalServerError(detail="Error creating user")
 
 @router.delete("/users/delete")
+@check_role("admin")
 @check_permission("manage")
-def delete_user(user_data: CreateUser, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def delete_user(user_data: CreateUser, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     """
     Удаляет пользователя из базы данных.
 
     Args:
         user_data (CreateUser): Данные пользователя для удаления.
-        token (str, optional): Токен аутентификации, получаемый через OAuth2.
+        principal (Principal): Субъект запроса, полученный из токена аутентификации.
         db (Session, optional): Сессия базы данных.
 
     Returns:
@@ -67,13 +70,13 @@ def delete_user(user_data: CreateUser, token: str = Depends(oauth2_scheme), db:
             - 401: Ошибка аутентификации.
             - 500: Внутренняя ошибка сервера.
     """
-    username: str = verify_jwt_token(token, required_role="admin")
+    username: str = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid auth data")
         
         service = AdminService(db)
-        service.delete_user(user_data.username)
+        await service.delete_user(user_data.username)
         return JSONResponse({"message": "User deleted successfully"}, status_code=200)
     except InvalidTokenError as e:
         return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
@@ -84,13 +87,14 @@ def delete_user(user_data: CreateUser, token: str = Depends(oauth2_scheme), db:
         raise InternalServerError(detail="Error deleting user")
 
 @router.get("/users/list")
+@check_role("admin")
 @check_permission("manage")
-def list_users(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def list_users(principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
     """
     Возвращает список всех пользователей в базе данных.
 
     Args:
-        token (str, optional): Токен аутентификации, получаемый через OAuth2.
+        principal (Principal): Субъект запроса, полученный из токена аутентификации.
         db (Session, optional): Сессия базы данных.
 
     Returns:
@@ -99,16 +103,236 @@ def list_users(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db
             - 401: Ошибка аутентификации.
             - 500: Внутренняя ошибка сервера.
     """
-    username: str = verify_jwt_token(token, required_role="admin")
+    username: str = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid auth data")
         
         service = AdminService(db)
-        users = service.list_users()
+        users = await service.list_users()
         return JSONResponse({"users": users}, status_code=200)
     except InvalidTokenError as e:
         return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
     except Exception as e:
         logger.error(f"Error listing users: {e}")
-        raise InternalServerError(detail="Error listing users") 
\ No newline at end of file
+        raise InternalServerError(detail="Error listing users") 
+
+@router.post("/service-accounts/create")
+@check_role("admin")
+@check_permission("manage")
+async def create_service_account(account_data: CreateServiceAccount, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Создает сервисную учетную запись для автоматизации (CI/CD, рабочие нагрузки Kubernetes).
+
+    Сервисная учетная запись не входит по TOTP: она аутентифицируется ключом API,
+    а ее права определяются назначенными ролями.
+
+    Args:
+        account_data (CreateServiceAccount): Имя учетной записи и имена ее ролей.
+        principal (Principal): Субъект запроса, полученный из токена аутентификации.
+        db (Session, optional): Сессия базы данных.
+
+    Returns:
+        JSONResponse: Ответ с сообщением о статусе операции.
+            - 201: Учетная запись создана.
+            - 401: Ошибка аутентификации.
+            - 404: Роль не найдена.
+            - 409: Пользователь с таким именем уже существует.
+            - 500: Внутренняя ошибка сервера.
+    """
+    username: str = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid auth data")
+
+        service = AdminService(db)
+        user_id = await service.create_service_account(account_data.name, account_data.roles)
+        return JSONResponse({"message": "Service account created successfully", "user_id": user_id}, status_code=201)
+    except (InvalidTokenError, ResourceNotFoundError, ConflictError) as e:
+        return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error creating service account: {e}")
+        raise InternalServerError(detail="Error creating service account")
+
+@router.post("/service-accounts/keys/create")
+@check_role("admin")
+@check_permission("manage")
+async def create_api_key(key_data: CreateApiKey, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Выпускает ключ API сервисной учетной записи.
+
+    Ключ возвращается только в этом ответе; в базе хранится его хэш. Ключ передается
+    в заголовке `Authorization: Bearer <ключ>` вместо JWT.
+
+    Args:
+        key_data (CreateApiKey): Учетная запись, описание ключа, ограничение разрешениями и срок действия.
+        principal (Principal): Субъект запроса, полученный из токена аутентификации.
+        db (Session, optional): Сессия базы данных.
+
+    Returns:
+        JSONResponse: Ответ с ключом.
+            - 201: Ключ выпущен.
+            - 400: Неизвестное разрешение или некорректный срок действия.
+            - 401: Ошибка аутентификации.
+            - 404: Сервисная учетная запись не найдена.
+            - 500: Внутренняя ошибка сервера.
+    """
+    username: str = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid auth data")
+
+        service = AdminService(db)
+        key = await service.create_api_key(key_data.service_account, key_data.name, key_data.scopes, key_data.expires_in_days)
+        return JSONResponse({"message": "API key created successfully", **key}, status_code=201)
+    except (InvalidTokenError, ResourceNotFoundError, BadRequestError) as e:
+        return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error creating API key: {e}")
+        raise InternalServerError(detail="Error creating API key")
+
+@router.get("/service-accounts/{name}/keys")
+@check_role("admin")
+@check_permission("manage")
+async def list_api_keys(name: str, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Возвращает ключи API сервисной учетной записи (без самих ключей).
+
+    Returns:
+        JSONResponse: Ответ со списком ключей.
+            - 200: Список ключей.
+            - 401: Ошибка аутентификации.
+            - 404: Сервисная учетная запись не найдена.
+            - 500: Внутренняя ошибка сервера.
+    """
+    username: str = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid auth data")
+
+        service = AdminService(db)
+        keys = await service.list_api_keys(name)
+        return JSONResponse({"keys": keys}, status_code=200)
+    except (InvalidTokenError, ResourceNotFoundError) as e:
+        return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error listing API keys: {e}")
+        raise InternalServerError(detail="Error listing API keys")
+
+@router.post("/service-accounts/keys/revoke")
+@check_role("admin")
+@check_permission("manage")
+async def revoke_api_key(key_data: RevokeApiKey, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Отзывает ключ API. Воркеры перестают принимать ключ сразу после фиксации транзакции.
+
+    Returns:
+        JSONResponse: Ответ с сообщением о статусе операции.
+            - 200: Ключ отозван.
+            - 401: Ошибка аутентификации.
+            - 404: Ключ не найден.
+            - 500: Внутренняя ошибка сервера.
+    """
+    username: str = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid auth data")
+
+        service = AdminService(db)
+        await service.revoke_api_key(key_data.key_id)
+        return JSONResponse({"message": "API key revoked successfully"}, status_code=200)
+    except (InvalidTokenError, ResourceNotFoundError) as e:
+        return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error revoking API key: {e}")
+        raise InternalServerError(detail="Error revoking API key")
+
+@router.post("/keys/rotation")
+@check_role("admin")
+@check_permission("manage")
+async def start_key_rotation(rotation: StartKeyRotation, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Запускает фоновое задание перешифровки секретов под активный мастер-ключ и алгоритм.
+
+    Args:
+        rotation (StartKeyRotation): Режим задания или идентификатор прерванного задания для продолжения.
+        principal (Principal): Субъект запроса, полученный из токена аутентификации.
+        db (Session, optional): Сессия базы данных.
+
+    Returns:
+        JSONResponse: Ответ с состоянием задания.
+            - 202: Задание запущено.
+            - 401: Ошибка аутентификации.
+            - 404: Задание для продолжения не найдено.
+            - 409: Уже выполняется другое задание или задание нельзя продолжить.
+            - 500: Внутренняя ошибка сервера.
+    """
+    username: str = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid auth data")
+
+        service = AdminService(db)
+        job = await service.start_key_rotation(rotation.mode, rotation.resume_job_id)
+        return JSONResponse({"job": job}, status_code=202)
+    except (InvalidTokenError, ResourceNotFoundError, ConflictError) as e:
+        return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error starting key rotation: {e}")
+        raise InternalServerError(detail="Error starting key rotation")
+
+@router.get("/keys/rotation/{job_id}")
+@check_role("admin")
+@check_permission("manage")
+async def get_key_rotation(job_id: int, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Возвращает состояние и прогресс задания перешифровки.
+
+    Returns:
+        JSONResponse: Ответ с состоянием задания.
+            - 200: Состояние задания.
+            - 401: Ошибка аутентификации.
+            - 404: Задание не найдено.
+            - 500: Внутренняя ошибка сервера.
+    """
+    username: str = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid auth data")
+
+        service = AdminService(db)
+        job = await service.get_key_rotation(job_id)
+        return JSONResponse({"job": job}, status_code=200)
+    except (InvalidTokenError, ResourceNotFoundError) as e:
+        return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error getting key rotation job: {e}")
+        raise InternalServerError(detail="Error getting key rotation job")
+
+@router.post("/keys/rotation/{job_id}/cancel")
+@check_role("admin")
+@check_permission("manage")
+async def cancel_key_rotation(job_id: int, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Останавливает задание перешифровки после текущей пачки. Задание можно продолжить позже.
+
+    Returns:
+        JSONResponse: Ответ с состоянием задания.
+            - 200: Остановка запрошена.
+            - 401: Ошибка аутентификации.
+            - 404: Задание не найдено.
+            - 500: Внутренняя ошибка сервера.
+    """
+    username: str = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid auth data")
+
+        service = AdminService(db)
+        job = await service.cancel_key_rotation(job_id)
+        return JSONResponse({"job": job}, status_code=200)
+    except (InvalidTokenError, ResourceNotFoundError) as e:
+        return JSONResponse({"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error cancelling key rotation job: {e}")
+        raise InternalServerError(detail="Error cancelling key rotation job")
@@ -1,10 +1,24 @@
 from sqlalchemy.orm import Session
-from lockana.models import User
+from lockana.database.database import after_commit, run_db, sync_session
+from lockana.models import ApiKey, KeyRotationJob, Permission, Role, User
 from lockana.totp import TOTP_MANAGER
+from lockana.permissions import bump_permissions_version_async
+from lockana.api.v1.auth.api_keys import generate_api_key, hash_api_key
+from lockana.rotation import (
+    KeyRotationRunner,
+    cancel_rotation_job,
+    claim_rotation_job,
+    create_rotation_job,
+    job_to_dict
+)
 from lockana.exceptions import (
+    BadRequestError,
+    ConflictError,
     ResourceNotFoundError,
     InternalServerError
 )
+from datetime import datetime, timedelta
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,39 +26,215 @@ logger = logging.getLogger(__name__)
 class AdminService:
     def __init__(self, db: Session):
         self.db = db
+        self.session = sync_session(db)
+
+    async def create_user(self, username: str):
+        user_id = await run_db(self.db, self._create_user, username)
+        after_commit(self.db, bump_permissions_version_async)
+        return user_id
+
+    async def delete_user(self, username: str):
+        await run_db(self.db, self._delete_user, username)
+        after_commit(self.db, bump_permissions_version_async)
+
+    async def list_users(self):
+        return await run_db(self.db, self._list_users)
+
+    async def create_service_account(self, name: str, roles: List[str]):
+        user_id = await run_db(self.db, self._create_service_account, name, roles)
+        after_commit(self.db, bump_permissions_version_async)
+        return user_id
+
+    async def create_api_key(self, service_account: str, name: str, scopes: Optional[List[str]], expires_in_days: Optional[int]):
+        return await run_db(self.db, self._create_api_key, service_account, name, scopes, expires_in_days)
+
+    async def list_api_keys(self, service_account: str):
+        return await run_db(self.db, self._list_api_keys, service_account)
+
+    async def revoke_api_key(self, key_id: str):
+        await run_db(self.db, self._revoke_api_key, key_id)
+        # Проверенные ключи кэшируются в воркерах до смены версии прав
+        after_commit(self.db, bump_permissions_version_async)
+
+    async def start_key_rotation(self, mode: str, resume_job_id: Optional[int] = None):
+        job = await run_db(self.db, self._start_key_rotation, mode, resume_job_id)
+
+        async def launch():
+            # Задание выполняется в фоновом потоке воркера со своими сессиями
+            KeyRotationRunner().run_in_background(job["id"])
+
+        after_commit(self.db, launch)
+        return job
+
+    async def get_key_rotation(self, job_id: int):
+        return await run_db(self.db, self._get_key_rotation, job_id)
+
+    async def cancel_key_rotation(self, job_id: int):
+        return await run_db(self.db, self._cancel_key_rotation, job_id)
 
-    def create_user(self, username: str):
+    def _create_user(self, username: str):
         try:
             new_user = User(username=username, totp_secret=TOTP_MANAGER.create_totp_secret())
-            self.db.add(new_user)
-            self.db.commit()
-            self.db.refresh(new_user)
+            self.session.add(new_user)
+            self.session.flush()
             return new_user.id
         except Exception as error:
             logger.error(f"Error creating user: {error}")
-            self.db.rollback()
             raise InternalServerError(detail="Error creating user")
 
-    def delete_user(self, username: str):
+    def _delete_user(self, username: str):
         try:
-            user_to_delete = self.db.query(User).filter(User.username == username).first()
+            user_to_delete = self.session.query(User).filter(User.username == username).first()
             if not user_to_delete:
                 logger.warning(f"Attempt to delete non-existent user: {username}")
                 raise ResourceNotFoundError(detail="User not found")
             
-            self.db.delete(user_to_delete)
-            self.db.commit()
+            self.session.delete(user_to_delete)
+            self.session.flush()
         except ResourceNotFoundError:
             raise
         except Exception as error:
             logger.error(f"Error deleting user: {error}")
-            self.db.rollback()
             raise InternalServerError(detail="Error deleting user")
 
-    def list_users(self):
+    def _list_users(self):
         try:
-            users = self.db.query(User).all()
+            users = self.session.query(User).all()
             return [{"id": user.id, "username": user.username, "created_at": user.created_at} for user in users]
         except Exception as error:
             logger.error(f"Error listing users: {error}")
-            raise InternalServerError(detail="Error listing users") 
\ No newline at end of file
+            raise InternalServerError(detail="Error listing users") 
+
+    def _create_service_account(self, name: str, roles: List[str]):
+        try:
+            if self.session.query(User.id).filter(User.username == name).first():
+                raise ConflictError(detail="User already exists")
+            role_objects = self.session.query(Role).filter(Role.name.in_(roles)).all() if roles else []
+            missing = set(roles) - {role.name for role in role_objects}
+            if missing:
+                raise ResourceNotFoundError(detail=f"Role not found: {', '.join(sorted(missing))}")
+            # Секрет TOTP обязателен в схеме, но сервисная учетная запись им не пользуется
+            account = User(
+                username=name,
+                totp_secret=TOTP_MANAGER.create_totp_secret(),
+                account_type="service",
+                roles=role_objects
+            )
+            self.session.add(account)
+            self.session.flush()
+            return account.id
+        except (ConflictError, ResourceNotFoundError):
+            raise
+        except Exception as error:
+            logger.error(f"Error creating service account: {error}")
+            raise InternalServerError(detail="Error creating service account")
+
+    def _get_service_account(self, name: str) -> User:
+        account = self.session.query(User).filter(User.username == name, User.account_type == "service").first()
+        if account is None:
+            raise ResourceNotFoundError(detail="Service account not found")
+        return account
+
+    def _create_api_key(self, service_account: str, name: str, scopes: Optional[List[str]], expires_in_days: Optional[int]):
+        try:
+            account = self._get_service_account(service_account)
+            if scopes is not None:
+                known = {row.name for row in self.session.query(Permission.name).filter(Permission.name.in_(scopes))}
+                unknown = set(scopes) - known
+                if unknown:
+                    raise BadRequestError(detail=f"Unknown permission: {', '.join(sorted(unknown))}")
+            if expires_in_days is not None and expires_in_days <= 0:
+                raise BadRequestError(detail="expires_in_days must be positive")
+
+            key_id, api_key = generate_api_key()
+            record = ApiKey(
+                key_id=key_id,
+                key_hash=hash_api_key(api_key),
+                username=account.username,
+                name=name,
+                scopes=",".join(sorted(set(scopes))) if scopes is not None else None,
+                expires_at=datetime.utcnow() + timedelta(days=expires_in_days) if expires_in_days else None
+            )
+            self.session.add(record)
+            self.session.flush()
+            logger.info(f"Выпущен ключ API {key_id} для {account.username}")
+            return {"key_id": key_id, "api_key": api_key, **self._api_key_to_dict(record)}
+        except (BadRequestError, ResourceNotFoundError):
+            raise
+        except Exception as error:
+            logger.error(f"Error creating API key: {error}")
+            raise InternalServerError(detail="Error creating API key")
+
+    def _list_api_keys(self, service_account: str):
+        try:
+            account = self._get_service_account(service_account)
+            return [self._api_key_to_dict(record) for record in account.api_keys]
+        except ResourceNotFoundError:
+            raise
+        except Exception as error:
+            logger.error(f"Error listing API keys: {error}")
+            raise InternalServerError(detail="Error listing API keys")
+
+    def _revoke_api_key(self, key_id: str):
+        try:
+            record = self.session.query(ApiKey).filter(ApiKey.key_id == key_id).first()
+            if record is None:
+                raise ResourceNotFoundError(detail="API key not found")
+            if record.revoked_at is None:
+                record.revoked_at = datetime.utcnow()
+                self.session.flush()
+                logger.info(f"Отозван ключ API {key_id} ({record.username})")
+        except ResourceNotFoundError:
+            raise
+        except Exception as error:
+            logger.error(f"Error revoking API key: {error}")
+            raise InternalServerError(detail="Error revoking API key")
+
+    @staticmethod
+    def _api_key_to_dict(record: ApiKey) -> dict:
+        def isoformat(value: Optional[datetime]) -> Optional[str]:
+            return value.isoformat() if value is not None else None
+
+        return {
+            "key_id": record.key_id,
+            "service_account": record.username,
+            "name": record.name,
+            "scopes": sorted(record.scope_set) if record.scope_set is not None else None,
+            "created_at": isoformat(record.created_at),
+            "expires_at": isoformat(record.expires_at),
+            "revoked_at": isoformat(record.revoked_at),
+        }
+
+    def _start_key_rotation(self, mode: str, resume_job_id: Optional[int]):
+        try:
+            if resume_job_id is not None:
+                job = claim_rotation_job(self.session, resume_job_id)
+            else:
+                job = create_rotation_job(self.session, mode)
+            return job_to_dict(job)
+        except (ConflictError, ResourceNotFoundError):
+            raise
+        except Exception as error:
+            logger.error(f"Error starting key rotation: {error}")
+            raise InternalServerError(detail="Error starting key rotation")
+
+    def _get_key_rotation(self, job_id: int):
+        try:
+            job = self.session.get(KeyRotationJob, job_id)
+            if job is None:
+                raise ResourceNotFoundError(detail="Key rotation job not found")
+            return job_to_dict(job)
+        except ResourceNotFoundError:
+            raise
+        except Exception as error:
+            logger.error(f"Error getting key rotation job: {error}")
+            raise InternalServerError(detail="Error getting key rotation job")
+
+    def _cancel_key_rotation(self, job_id: int):
+        try:
+            return job_to_dict(cancel_rotation_job(self.session, job_id))
+        except ResourceNotFoundError:
+            raise
+        except Exception as error:
+            logger.error(f"Error cancelling key rotation job: {error}")
+            raise InternalServerError(detail="Error cancelling key rotation job")
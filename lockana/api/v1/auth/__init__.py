@@ -1,4 +1,4 @@
 from .router import router
-from .jwt import oauth2_scheme, verify_jwt_token
+from .jwt import oauth2_scheme, verify_jwt_token, decode_jwt_token
 
-__all__ = ['router', 'oauth2_scheme', 'verify_jwt_token']
+__all__ = ['router', 'oauth2_scheme', 'verify_jwt_token', 'decode_jwt_token']
@@ -0,0 +1,45 @@
+import hashlib
+import hmac
+import secrets
+from typing import Optional, Tuple
+from lockana.config import API_KEY_HASH_KEY, SECRET_KEY
+
+# Ключ API имеет вид "lk_<key_id>_<секрет>": по открытому key_id запись находится по индексу,
+# а совпадение проверяется по HMAC всего ключа
+API_KEY_PREFIX = "lk_"
+
+# Ключи API случайные (256 бит), поэтому для хранения достаточно быстрого HMAC-SHA256
+# с секретным ключом сервера: медленный хэш паролей (bcrypt) не добавляет стойкости,
+# но стоил бы десятков миллисекунд на каждый запрос
+_HASH_KEY = API_KEY_HASH_KEY or hmac.new(SECRET_KEY, b"lockana-api-key-hash", hashlib.sha256).digest()
+
+
+def is_api_key(token: str) -> bool:
+    return token.startswith(API_KEY_PREFIX)
+
+
+def generate_api_key() -> Tuple[str, str]:
+    """
+    Создает новый ключ API.
+
+    Возвращает:
+        Tuple[str, str]: Открытый идентификатор ключа и сам ключ (показывается один раз).
+    """
+    key_id = secrets.token_hex(8)
+    return key_id, f"{API_KEY_PREFIX}{key_id}_{secrets.token_urlsafe(32)}"
+
+
+def parse_key_id(api_key: str) -> Optional[str]:
+    """
+    Возвращает открытый идентификатор ключа или None, если формат ключа неверный.
+    """
+    if not is_api_key(api_key):
+        return None
+    key_id, _, secret = api_key[len(API_KEY_PREFIX):].partition("_")
+    if len(key_id) != 16 or not secret:
+        return None
+    return key_id
+
+
+def hash_api_key(api_key: str) -> str:
+    return hmac.new(_HASH_KEY, api_key.encode(), hashlib.sha256).hexdigest()
@@ -1,72 +1,67 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from lockana.config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+from typing import Optional, Tuple
+import time
+import uuid
+from lockana.config import (
+    JWT_ACCESS_TOKEN_EXPIRE_MINUTES,
+    JWT_REVOCATION_CACHE_ENABLED, JWT_REVOCATION_STREAM_MAXLEN
+)
 from lockana import logging_config  
+from .keys import JWT_KEYS, TokenError
+from .revocation import REVOCATION_CACHE, REVOCATION_STREAM, REVOKED_TOKENS, revocation_id, token_expiry
+from lockana.redis_client import redis_client, async_redis_client
 import logging
-import redis
 
 
+# Множество полных токенов, в которое отзывы записывались до появления `jti`
+# (переносится в REVOKED_TOKENS скриптом scripts/migrate_revoked_tokens.py)
 BLACKLISTED_TOKENS = "blacklisted_tokens"
 
-redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def verify_jwt_token(token: str = Depends(oauth2_scheme), required_role: str = "user"):
-    """
-    Проверяет и декодирует JWT токен, а также валидирует роль пользователя.
+def _revoked_token_error() -> HTTPException:
+    logger.warning("Попытка использования отозванного токена.")
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token has been revoked",
+    )
 
-    Эта функция извлекает информацию из переданного JWT токена, проверяет его действительность и 
-    роль пользователя. Также выполняется проверка на отозванные токены, используя Redis.
 
-    Параметры:
-        token (str): JWT токен, который необходимо проверить.
-        required_role (str): Роль, необходимая для доступа (по умолчанию "user").
+def _decode_payload(token: str, verify_exp: bool = True) -> dict:
+    """
+    Декодирует полезную нагрузку JWT токена без обращения к Redis.
 
-    Возвращает:
-        str: Имя пользователя, если токен действителен и пользователь имеет требуемую роль.
+    Параметры:
+        verify_exp (bool): Проверять срок действия токена.
 
     Исключения:
-        HTTPException: Если токен отозван, имеет недействительные данные, или роль пользователя 
-        не соответствует требуемой, возвращается ошибка с кодом 401 (Unauthorized).
-
-    Логирование:
-        В случае успешной проверки токена и роли пользователя, функция логирует успешную валидацию.
-        В случае ошибок — записывает предупреждения и ошибки.
+        HTTPException: Если токен истек или имеет недействительные данные (401).
     """
     try:
-        if redis_client.sismember(BLACKLISTED_TOKENS, str(token)):
-            logger.warning("Попытка использования отозванного токена.")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has been revoked",
-            )
-        
-        if JWT_SECRET_KEY is None:
-            logger.error("JWT_SECRET_KEY не установлен.")
+        if not JWT_KEYS.can_verify:
+            logger.error("Не заданы ни JWT_SECRET_KEY, ни ключи jwt.signing_keys.")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Internal server error",
             )
-            
-        payload = jwt.decode(str(token), JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        username: str = str(payload.get("sub"))
-        user_role: str = str(payload.get("role"))
 
-        if username is None or (user_role != required_role and user_role != "admin"):
-            logger.warning(f"Ошибка валидации токена для пользователя: {username}. Роль: {user_role}")
+        payload = JWT_KEYS.decode(token, verify_exp=verify_exp)
+        if not payload.get("sub"):
+            logger.warning("Токен не содержит имени пользователя.")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials or insufficient permissions",
+                detail="Could not validate credentials",
             )
-        
-        return username
-    except JWTError as e:
+
+        return payload
+    except HTTPException:
+        raise
+    except TokenError as e:
         logger.error(f"Ошибка декодирования токена: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -80,12 +75,216 @@ def verify_jwt_token(token: str = Depends(oauth2_scheme), required_role: str = "
         )
 
 
+def _check_revoked_locally(token_id: str):
+    """
+    Проверяет токен по набору отозванных токенов в памяти воркера.
+
+    Возвращает:
+        Optional[bool]: Результат проверки или None, если нужно обратиться к Redis.
+    """
+    if not JWT_REVOCATION_CACHE_ENABLED:
+        return None
+    return REVOCATION_CACHE.contains(token_id)
+
+
+async def start_revocation_sync() -> None:
+    """
+    Запускает синхронизацию набора отозванных токенов воркера с Redis (при старте воркера).
+    """
+    if JWT_REVOCATION_CACHE_ENABLED:
+        await REVOCATION_CACHE.start(async_redis_client)
+
+
+async def stop_revocation_sync() -> None:
+    await REVOCATION_CACHE.stop()
+
+
+async def revoke_jwt_token(token: str) -> dict:
+    """
+    Отзывает JWT токен до истечения его срока действия.
+
+    Идентификатор токена (`jti`) добавляется в `revoked_tokens` с весом, равным времени
+    истечения, истекшие записи удаляются, а событие отзыва добавляется в поток
+    `revoked_tokens:stream` - все одной транзакцией, поэтому воркеры не пропустят отзыв.
+    Набор текущего воркера обновляется сразу. Отзыв истекшего токена ничего не записывает.
+
+    Возвращает:
+        dict: Полезная нагрузка отозванного токена.
+
+    Исключения:
+        HTTPException: Если подпись токена недействительна (401).
+    """
+    payload = _decode_payload(token, verify_exp=False)
+    token_id = revocation_id(payload, token)
+    expires_at = token_expiry(payload)
+    now = time.time()
+    if expires_at <= now:
+        return payload
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.zadd(REVOKED_TOKENS, {token_id: expires_at})
+        pipe.zremrangebyscore(REVOKED_TOKENS, "-inf", now)
+        pipe.xadd(
+            REVOCATION_STREAM,
+            {"id": token_id, "exp": str(expires_at)},
+            maxlen=JWT_REVOCATION_STREAM_MAXLEN,
+            approximate=True
+        )
+        await pipe.execute()
+    REVOCATION_CACHE.add(token_id, expires_at)
+    return payload
+
+
+def migrate_legacy_blacklist(batch_size: int = 1000) -> Tuple[int, int]:
+    """
+    Переносит отзывы из множества `blacklisted_tokens` в `revoked_tokens`.
+
+    Действующие токены с корректной подписью переносятся под своим идентификатором,
+    остальные (истекшие, поддельные) отбрасываются. Обработанные токены удаляются из множества
+    пачками, поэтому прерванный перенос можно повторить.
+
+    Возвращает:
+        Tuple[int, int]: Количество перенесенных и отброшенных токенов.
+    """
+    migrated = dropped = 0
+    cursor = None
+    while cursor != 0:
+        cursor, tokens = redis_client.sscan(BLACKLISTED_TOKENS, cursor or 0, count=batch_size)
+        if not tokens:
+            continue
+        now = time.time()
+        revoked = {}
+        for token in tokens:
+            try:
+                payload = _decode_payload(token, verify_exp=False)
+            except HTTPException:
+                dropped += 1
+                continue
+            expires_at = token_expiry(payload)
+            if expires_at > now:
+                revoked[revocation_id(payload, token)] = expires_at
+            else:
+                dropped += 1
+        pipe = redis_client.pipeline(transaction=True)
+        if revoked:
+            pipe.zadd(REVOKED_TOKENS, revoked)
+            for token_id, expires_at in revoked.items():
+                pipe.xadd(
+                    REVOCATION_STREAM,
+                    {"id": token_id, "exp": str(expires_at)},
+                    maxlen=JWT_REVOCATION_STREAM_MAXLEN,
+                    approximate=True
+                )
+        pipe.srem(BLACKLISTED_TOKENS, *tokens)
+        pipe.execute()
+        migrated += len(revoked)
+    return migrated, dropped
+
+
+def token_subject(token: str) -> Optional[str]:
+    """
+    Возвращает имя пользователя (`sub`) из токена с действительной подписью или None.
+
+    Не проверяет отзыв и не пишет в журнал: используется ограничением частоты запросов
+    до проверки токена зависимостями маршрута.
+    """
+    try:
+        return JWT_KEYS.decode(token).get("sub")
+    except TokenError:
+        return None
+
+
+async def decode_jwt_token(token: str) -> dict:
+    """
+    Проверяет JWT токен на отзыв и декодирует его полезную нагрузку.
+
+    Отзыв проверяется по набору отозванных токенов в памяти воркера; если набор
+    неактуален (нет связи с Redis дольше `jwt.revocation_cache_max_staleness_seconds`),
+    выполняется проверка по `revoked_tokens` в Redis. Используется зависимостью
+    `get_principal`, чтобы запрос не проверял токен повторно.
+
+    Параметры:
+        token (str): JWT токен, который необходимо проверить.
+
+    Возвращает:
+        dict: Полезная нагрузка токена.
+
+    Исключения:
+        HTTPException: Если токен отозван, истек или имеет недействительные данные (401).
+    """
+    payload = _decode_payload(token)
+    token_id = revocation_id(payload, token)
+    revoked = _check_revoked_locally(token_id)
+    try:
+        if revoked is None:
+            revoked = await async_redis_client.zscore(REVOKED_TOKENS, token_id) is not None
+    except Exception as e:
+        logger.error(f"Неожиданная ошибка при проверке токена: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+    if revoked:
+        raise _revoked_token_error()
+
+    return payload
+
+
+def verify_jwt_token(token: str = Depends(oauth2_scheme), required_role: str = "user"):
+    """
+    Проверяет и декодирует JWT токен, а также валидирует роль пользователя.
+
+    Эта функция извлекает информацию из переданного JWT токена, проверяет его действительность и 
+    роль пользователя. Также выполняется проверка на отозванные токены (в памяти воркера или в Redis).
+
+    Маршруты API используют `lockana.permissions.get_principal`, который декодирует токен
+    один раз за запрос; эта синхронная функция сохранена для внешних вызовов.
+
+    Параметры:
+        token (str): JWT токен, который необходимо проверить.
+        required_role (str): Роль, необходимая для доступа (по умолчанию "user").
+
+    Возвращает:
+        str: Имя пользователя, если токен действителен и пользователь имеет требуемую роль.
+
+    Исключения:
+        HTTPException: Если токен отозван, имеет недействительные данные, или роль пользователя 
+        не соответствует требуемой, возвращается ошибка с кодом 401 (Unauthorized).
+    """
+    payload = _decode_payload(token)
+    token_id = revocation_id(payload, token)
+    revoked = _check_revoked_locally(token_id)
+    try:
+        if revoked is None:
+            revoked = redis_client.zscore(REVOKED_TOKENS, token_id) is not None
+    except Exception as e:
+        logger.error(f"Неожиданная ошибка при проверке токена: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+    if revoked:
+        raise _revoked_token_error()
+
+    username: str = str(payload.get("sub"))
+    user_role: str = str(payload.get("role"))
+
+    if user_role != required_role and user_role != "admin":
+        logger.warning(f"Ошибка валидации токена для пользователя: {username}. Роль: {user_role}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials or insufficient permissions",
+        )
+
+    return username
+
+
 def create_jwt_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)):
     """
     Создает новый JWT токен с указанными данными и сроком действия.
 
     Эта функция генерирует новый токен доступа на основе переданных данных, добавляя информацию о времени 
     истечения токена (по умолчанию это время, определенное в настройках). Токен также включает роль пользователя.
+    Токен подписывается активным ключом `jwt.signing_keys` (EdDSA/ES256, заголовок `kid`) или HS256 с `JWT_SECRET_KEY`.
 
     Параметры:
         data (dict): Данные, которые должны быть включены в токен (например, имя пользователя).
@@ -95,32 +294,34 @@ def create_jwt_access_token(data: dict, expires_delta: timedelta = timedelta(min
         str: Закодированный JWT токен.
 
     Примечания:
-        - Время истечения токена добавляется в поле "exp".
+        - Время истечения токена добавляется в поле "exp", уникальный идентификатор - в поле "jti"
+          (по нему хранится отзыв токена).
+        - Токены, выданные в рамках сессии с токеном обновления, содержат ее идентификатор в поле "sid".
         - Если роль не указана в данных, по умолчанию используется роль "user".
     """
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     
     role = data.get("role", "user")
     to_encode.update({"role": role})
     
-    if JWT_SECRET_KEY is None:
+    if not JWT_KEYS.can_sign:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
         )
 
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return encoded_jwt
+    return JWT_KEYS.encode(to_encode)
 
 
-def jwt_is_blocked(username: str, ip: str) -> bool:
+async def jwt_is_blocked(username: str, ip: str) -> bool:
     """
     Проверяет, заблокирован ли пользователь или его IP-адрес.
 
     Эта функция проверяет, находится ли пользователь с указанным именем или его IP-адрес в списке заблокированных.
-    Для проверки используются ключи в Redis, которые представляют собой блокировки по имени пользователя и IP-адресу.
+    Для проверки используются ключи в Redis, которые представляют собой блокировки по имени пользователя и IP-адресу
+    (оба проверяются одним запросом EXISTS).
 
     Параметры:
         username (str): Имя пользователя, для которого проверяется блокировка.
@@ -129,7 +330,4 @@ def jwt_is_blocked(username: str, ip: str) -> bool:
     Возвращает:
         bool: True, если пользователь или его IP-адрес заблокированы, иначе False.
     """
-    if redis_client.exists(f"block_user:{username}") or redis_client.exists(f"block_ip:{ip}"):
-        return True
-    
-    return False
\ No newline at end of file
+    return await async_redis_client.exists(f"block_user:{username}", f"block_ip:{ip}") > 0
\ No newline at end of file
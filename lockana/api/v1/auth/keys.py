@@ -0,0 +1,289 @@
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
+from lockana.config import (
+    JWT_ALGORITHM,
+    JWT_SECRET_KEY,
+    JWT_ACTIVE_KEY_ID,
+    JWT_SIGNING_KEYS,
+    JWT_SIGNING_KEY_PASSWORD
+)
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "ES256")
+_HMAC_ALGORITHMS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+_TIME_CLAIMS = ("exp", "iat", "nbf")
+
+
+class TokenError(Exception):
+    """Токен не прошел проверку (подпись, формат или срок действия)"""
+
+
+class SigningKey(NamedTuple):
+    """
+    Ключ подписи JWT.
+
+    Атрибуты:
+        kid (str): Идентификатор ключа (заголовок `kid` токена).
+        algorithm (str): "EdDSA" (Ed25519) или "ES256" (ECDSA P-256).
+        public_key: Открытый ключ для проверки подписи.
+        private_key: Закрытый ключ для подписи или None (ключ только проверяет старые токены).
+    """
+    kid: str
+    algorithm: str
+    public_key: object
+    private_key: Optional[object] = None
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JWTKeySet:
+    """
+    Ключи подписи и проверки JWT, разобранные один раз при запуске.
+
+    Токены подписываются активным асимметричным ключом (EdDSA или ES256) с заголовком `kid`,
+    поэтому проверить токен может любой сервис, получивший открытые ключи через JWKS,
+    без общего секрета. Для ротации новый ключ добавляется в `jwt.signing_keys` и делается
+    активным, а старый остается в списке (можно только с открытым ключом) до истечения
+    выпущенных им токенов. Токены без `kid` проверяются общим секретом HMAC (`JWT_SECRET_KEY`),
+    если он задан, - это прежний формат, и пока асимметричные ключи не настроены, им же
+    подписываются новые токены.
+
+    Алгоритм проверки определяется ключом, а не заголовком токена: токен, подписанный
+    другим алгоритмом, отклоняется.
+
+    Атрибуты:
+        active_kid (Optional[str]): Ключ для подписи новых токенов (None - HMAC).
+    """
+    def __init__(
+        self,
+        keys: List[SigningKey],
+        active_kid: Optional[str] = None,
+        hmac_secret: Optional[str] = None,
+        hmac_algorithm: str = "HS256"
+    ):
+        self._keys: Dict[str, SigningKey] = {key.kid: key for key in keys}
+        if hmac_algorithm not in _HMAC_ALGORITHMS:
+            raise ValueError(f"Неподдерживаемый алгоритм JWT: {hmac_algorithm}")
+        self._hmac_secret = hmac_secret.encode() if hmac_secret else None
+        self._hmac_algorithm = hmac_algorithm
+        self.active_kid = active_kid
+        if active_kid is not None:
+            active = self._keys.get(active_kid)
+            if active is None or active.private_key is None:
+                raise ValueError(f"Для активного ключа JWT '{active_kid}' не задан закрытый ключ")
+        self._jwks = {"keys": [self._public_jwk(key) for key in keys]}
+
+    @property
+    def can_sign(self) -> bool:
+        return self.active_kid is not None or self._hmac_secret is not None
+
+    @property
+    def can_verify(self) -> bool:
+        """
+        Задан ли хотя бы один ключ проверки: сервис, которому выданы только открытые ключи
+        (без `active_key_id`), проверяет токены, но не выпускает их.
+        """
+        return bool(self._keys) or self._hmac_secret is not None
+
+    def encode(self, claims: dict) -> str:
+        """
+        Подписывает полезную нагрузку активным ключом.
+
+        Исключения:
+            ValueError: Если не задан ни один ключ подписи.
+        """
+        if self.active_kid is not None:
+            key = self._keys[self.active_kid]
+            header = {"alg": key.algorithm, "typ": "JWT", "kid": key.kid}
+        elif self._hmac_secret is not None:
+            key = None
+            header = {"alg": self._hmac_algorithm, "typ": "JWT"}
+        else:
+            raise ValueError("Не задан ключ подписи JWT")
+        signing_input = (
+            _b64encode(json.dumps(header, separators=(",", ":")).encode())
+            + "."
+            + _b64encode(json.dumps(claims, separators=(",", ":"), default=_json_default).encode())
+        )
+        signature = self._sign(key, signing_input.encode())
+        return signing_input + "." + _b64encode(signature)
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        """
+        Проверяет подпись и срок действия токена и возвращает полезную нагрузку.
+
+        Поля `exp`, `iat` и `nbf`, если они есть, должны быть числами. Токен без `exp`
+        при `verify_exp=True` отклоняется (сервис выпускает токены только со сроком действия),
+        токен с `nbf` в будущем - всегда.
+
+        Исключения:
+            TokenError: Если токен поврежден, подписан неизвестным ключом, истек или еще не действует.
+        """
+        try:
+            header_b64, payload_b64, signature_b64 = str(token).split(".")
+            header = json.loads(_b64decode(header_b64))
+            signature = _b64decode(signature_b64)
+        except ValueError:
+            raise TokenError("Malformed token")
+        if not isinstance(header, dict):
+            raise TokenError("Malformed token header")
+
+        signing_input = f"{header_b64}.{payload_b64}".encode()
+        kid = header.get("kid")
+        if kid is None:
+            if self._hmac_secret is None or header.get("alg") != self._hmac_algorithm:
+                raise TokenError("Unsupported token algorithm")
+            if not hmac.compare_digest(self._sign(None, signing_input), signature):
+                raise TokenError("Signature verification failed")
+        else:
+            key = self._keys.get(kid)
+            if key is None or header.get("alg") != key.algorithm:
+                raise TokenError("Unknown signing key")
+            self._verify(key, signing_input, signature)
+
+        try:
+            payload = json.loads(_b64decode(payload_b64))
+        except ValueError:
+            raise TokenError("Malformed token payload")
+        if not isinstance(payload, dict):
+            raise TokenError("Malformed token payload")
+        self._check_time_claims(payload, verify_exp)
+        return payload
+
+    @staticmethod
+    def _check_time_claims(payload: dict, verify_exp: bool) -> None:
+        for claim in _TIME_CLAIMS:
+            value = payload.get(claim)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise TokenError(f"Invalid {claim} claim")
+        now = time.time()
+        if verify_exp:
+            if "exp" not in payload:
+                raise TokenError("Token has no exp claim")
+            if payload["exp"] <= now:
+                raise TokenError("Signature has expired")
+        if "nbf" in payload and payload["nbf"] > now:
+            raise TokenError("The token is not yet valid (nbf)")
+
+    def jwks(self) -> dict:
+        """
+        Возвращает открытые ключи в формате JWKS (RFC 7517). Секрет HMAC не публикуется.
+        """
+        return self._jwks
+
+    def _sign(self, key: Optional[SigningKey], data: bytes) -> bytes:
+        if key is None:
+            return hmac.new(self._hmac_secret, data, _HMAC_ALGORITHMS[self._hmac_algorithm]).digest()
+        if key.algorithm == "EdDSA":
+            return key.private_key.sign(data)
+        r, s = decode_dss_signature(key.private_key.sign(data, ec.ECDSA(hashes.SHA256())))
+        return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    def _verify(self, key: SigningKey, data: bytes, signature: bytes) -> None:
+        try:
+            if key.algorithm == "EdDSA":
+                key.public_key.verify(signature, data)
+            else:
+                if len(signature) != 64:
+                    raise TokenError("Signature verification failed")
+                der = encode_dss_signature(int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big"))
+                key.public_key.verify(der, data, ec.ECDSA(hashes.SHA256()))
+        except InvalidSignature:
+            raise TokenError("Signature verification failed")
+
+    @staticmethod
+    def _public_jwk(key: SigningKey) -> dict:
+        jwk = {"kid": key.kid, "alg": key.algorithm, "use": "sig"}
+        if key.algorithm == "EdDSA":
+            raw = key.public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+            jwk.update(kty="OKP", crv="Ed25519", x=_b64encode(raw))
+        else:
+            numbers = key.public_key.public_numbers()
+            jwk.update(
+                kty="EC", crv="P-256",
+                x=_b64encode(numbers.x.to_bytes(32, "big")),
+                y=_b64encode(numbers.y.to_bytes(32, "big"))
+            )
+        return jwk
+
+
+def load_signing_key(
+    kid: str,
+    algorithm: str,
+    private_key_file: Optional[str] = None,
+    public_key_file: Optional[str] = None,
+    password: Optional[bytes] = None
+) -> SigningKey:
+    """
+    Загружает ключ подписи из файлов PEM. Открытый ключ вычисляется из закрытого, если файл не задан.
+
+    Исключения:
+        ValueError: Если алгоритм не поддерживается или тип ключа ему не соответствует.
+    """
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        raise ValueError(f"Неподдерживаемый алгоритм ключа JWT '{kid}': {algorithm}")
+    private_key = None
+    if private_key_file:
+        with open(private_key_file, "rb") as key_file:
+            private_key = serialization.load_pem_private_key(key_file.read(), password=password)
+        public_key = private_key.public_key()
+    elif public_key_file:
+        with open(public_key_file, "rb") as key_file:
+            public_key = serialization.load_pem_public_key(key_file.read())
+    else:
+        raise ValueError(f"Для ключа JWT '{kid}' не задан ни закрытый, ни открытый ключ")
+
+    if algorithm == "EdDSA":
+        valid = isinstance(public_key, ed25519.Ed25519PublicKey)
+    else:
+        valid = isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, ec.SECP256R1)
+    if not valid:
+        raise ValueError(f"Ключ JWT '{kid}' не подходит для алгоритма {algorithm}")
+    return SigningKey(kid, algorithm, public_key, private_key)
+
+
+def _load_key_set() -> JWTKeySet:
+    keys = [
+        load_signing_key(
+            str(options["kid"]),
+            options.get("algorithm", "EdDSA"),
+            options.get("private_key_file"),
+            options.get("public_key_file"),
+            JWT_SIGNING_KEY_PASSWORD
+        )
+        for options in JWT_SIGNING_KEYS
+    ]
+    active_kid = JWT_ACTIVE_KEY_ID
+    if active_kid is None:
+        # По умолчанию подписывает последний ключ из списка, у которого есть закрытый ключ
+        active_kid = next((key.kid for key in reversed(keys) if key.private_key is not None), None)
+    if keys:
+        logger.info(f"Ключи JWT: {', '.join(key.kid for key in keys)}, активный: {active_kid}")
+    return JWTKeySet(keys, str(active_kid) if active_kid is not None else None, JWT_SECRET_KEY, JWT_ALGORITHM)
+
+
+JWT_KEYS = _load_key_set()
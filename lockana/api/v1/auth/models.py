@@ -4,7 +4,11 @@ class UserAuth(BaseModel):
     username: str
     totp_code: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class TokenResponse(BaseModel):
     message: str
     access_token: str
+    refresh_token: str
     token_type: str 
\ No newline at end of file
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import secrets
+from typing import NamedTuple, Tuple
+from lockana.config import JWT_REFRESH_TOKEN_EXPIRE_MINUTES, JWT_REFRESH_SESSION_MAX_HOURS
+from lockana.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Токен обновления имеет вид "<id сессии>.<случайная часть>". В Redis хранятся только хэши токенов:
+#   refresh:<sha256 токена>  - hash {user, session}, живет refresh_token_expire_minutes
+#   refresh_session:<id>     - sha256 текущего токена сессии, живет до конца сессии (refresh_session_max_hours)
+_TOKEN_KEY = "refresh:{}"
+_SESSION_KEY = "refresh_session:{}"
+
+# KEYS: ключ предъявленного токена, ключ сессии, ключ нового токена
+# ARGV: хэш предъявленного токена, хэш нового токена, время жизни токена (мс)
+# Возвращает {"ok", user}, {"invalid"}, {"expired", user} (сессия завершена) или {"reuse", user}.
+# Использованный токен остается в Redis до истечения, чтобы его повторное предъявление
+# обнаружилось как кража: в этом случае сессия отзывается целиком.
+_ROTATE_LUA = """
+local user = redis.call('HGET', KEYS[1], 'user')
+if not user then
+    return {'invalid'}
+end
+local current = redis.call('GET', KEYS[2])
+if not current then
+    return {'expired', user}
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[2])
+    return {'reuse', user}
+end
+local ttl = math.min(tonumber(ARGV[3]), redis.call('PTTL', KEYS[2]))
+if ttl <= 0 then
+    return {'expired', user}
+end
+redis.call('HSET', KEYS[3], 'user', user, 'session', redis.call('HGET', KEYS[1], 'session'))
+redis.call('PEXPIRE', KEYS[3], ttl)
+redis.call('SET', KEYS[2], ARGV[2], 'KEEPTTL')
+return {'ok', user}
+"""
+
+_rotate_script = async_redis_client.register_script(_ROTATE_LUA)
+
+
+class RefreshResult(NamedTuple):
+    """
+    Результат обмена токена обновления.
+
+    Атрибуты:
+        status (str): "ok", "invalid" (токен неизвестен или истек), "expired" (сессия завершена)
+            или "reuse" (предъявлен уже использованный токен, сессия отозвана).
+        username (str): Пользователь сессии (пусто для "invalid").
+        session_id (str): Идентификатор сессии.
+        refresh_token (str): Новый токен обновления (только для "ok").
+    """
+    status: str
+    username: str = ""
+    session_id: str = ""
+    refresh_token: str = ""
+
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _new_token(session_id: str) -> str:
+    return f"{session_id}.{secrets.token_urlsafe(32)}"
+
+
+async def issue_refresh_token(username: str) -> Tuple[str, str]:
+    """
+    Начинает сессию и выдает первый токен обновления.
+
+    Возвращает:
+        Tuple[str, str]: Токен обновления и идентификатор сессии.
+    """
+    session_id = secrets.token_urlsafe(12)
+    token = _new_token(session_id)
+    token_hash = _hash(token)
+    async with async_redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(_TOKEN_KEY.format(token_hash), mapping={"user": username, "session": session_id})
+        pipe.expire(_TOKEN_KEY.format(token_hash), JWT_REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+        pipe.set(_SESSION_KEY.format(session_id), token_hash, ex=JWT_REFRESH_SESSION_MAX_HOURS * 3600)
+        await pipe.execute()
+    return token, session_id
+
+
+async def rotate_refresh_token(token: str) -> RefreshResult:
+    """
+    Обменивает токен обновления на новый одним скриптом Lua.
+
+    Каждый токен действует один раз. Срок действия нового токена отсчитывается заново
+    (скользящая сессия), но не выходит за максимальную длительность сессии.
+    """
+    session_id, _, secret = str(token).partition(".")
+    if not session_id or not secret:
+        return RefreshResult("invalid")
+    new_token = _new_token(session_id)
+    status, *rest = await _rotate_script(
+        keys=[_TOKEN_KEY.format(_hash(token)), _SESSION_KEY.format(session_id), _TOKEN_KEY.format(_hash(new_token))],
+        args=[_hash(token), _hash(new_token), JWT_REFRESH_TOKEN_EXPIRE_MINUTES * 60 * 1000]
+    )
+    username = rest[0] if rest else ""
+    if status != "ok":
+        return RefreshResult(status, username, session_id)
+    return RefreshResult(status, username, session_id, new_token)
+
+
+async def revoke_session(session_id: str) -> None:
+    """
+    Завершает сессию: ни один ее токен обновления больше не будет принят.
+    """
+    await async_redis_client.delete(_SESSION_KEY.format(session_id))
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from lockana.config import (
+    JWT_REVOCATION_CACHE_MAX_SIZE,
+    JWT_REVOCATION_CACHE_MAX_STALENESS_SECONDS,
+    REDIS_SOCKET_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# Отозванные токены: sorted set, член - идентификатор токена, вес - время истечения токена.
+# Истекшие члены удаляются при каждом отзыве, поэтому размер ограничен числом действующих токенов.
+REVOKED_TOKENS = "revoked_tokens"
+# Поток событий отзыва токенов: {"id": идентификатор токена, "exp": время истечения токена}
+REVOCATION_STREAM = "revoked_tokens:stream"
+# Сколько ждать новых событий в XREAD, мс (меньше max_staleness_seconds и таймаута сокета Redis)
+_STREAM_BLOCK_MS = int(min(1000, REDIS_SOCKET_TIMEOUT * 500))
+_RECONNECT_DELAY_SECONDS = 1.0
+
+
+def revocation_id(payload: dict, token: str) -> str:
+    """
+    Возвращает идентификатор, под которым хранится отзыв токена: `jti`, а для токенов,
+    выпущенных без него, - sha256 токена.
+    """
+    jti = payload.get("jti")
+    if jti:
+        return str(jti)
+    return hashlib.sha256(str(token).encode()).hexdigest()
+
+
+def token_expiry(payload: dict) -> float:
+    """
+    Возвращает время истечения токена (unix time) или бесконечность для токена без `exp`.
+    """
+    try:
+        return float(payload.get("exp", float("inf")))
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+class RevocationCache:
+    """
+    Отозванные токены в памяти воркера.
+
+    При запуске воркера (`start`) набор загружается из Redis, затем воркер читает поток
+    `revoked_tokens:stream`, в который `AuthService.logout` атомарно с записью отзыва
+    добавляет событие. Проверка токена, которого нет в наборе, не обращается к Redis.
+    Идентификаторы хранятся до истечения токена, поэтому точное совпадение не требует подтверждения.
+
+    Если поток не читался дольше `max_staleness_seconds` (Redis недоступен) или набор
+    превысил `max_size`, ответ из памяти не используется (`contains` возвращает None)
+    и токен проверяется в Redis, как раньше. Кратковременная недоступность Redis
+    не влияет на проверку токенов: после восстановления события дочитываются из потока.
+
+    Атрибуты:
+        max_size (int): Максимальное количество отозванных токенов в памяти.
+        max_staleness_seconds (float): Сколько можно отвечать из памяти без связи с Redis.
+    """
+    def __init__(self, max_size: int, max_staleness_seconds: float):
+        self.max_size = max(int(max_size), 1)
+        self.max_staleness_seconds = float(max_staleness_seconds)
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._synced_at: Optional[float] = None
+        self._overflow = False
+        self._last_id: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        Можно ли отвечать на проверки из памяти.
+        """
+        return (
+            self._synced_at is not None
+            and not self._overflow
+            and time.monotonic() - self._synced_at <= self.max_staleness_seconds
+        )
+
+    def contains(self, token_id: str) -> Optional[bool]:
+        """
+        Проверяет, отозван ли токен.
+
+        Возвращает:
+            Optional[bool]: True/False или None, если набор в памяти неактуален и нужно спросить Redis.
+        """
+        if not self.ready:
+            return None
+        with self._lock:
+            expires_at = self._revoked.get(token_id)
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, token_id: str, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._revoked[token_id] = expires_at
+            if len(self._revoked) > self.max_size:
+                self._prune()
+                if len(self._revoked) > self.max_size and not self._overflow:
+                    logger.warning(f"Набор отозванных токенов превысил {self.max_size}, проверка через Redis")
+                    self._overflow = True
+
+    async def start(self, redis_client) -> None:
+        """
+        Запускает фоновую синхронизацию с Redis в текущем цикле событий.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(redis_client), name="revocation-cache")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._synced_at = None
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._revoked = {token_id: exp for token_id, exp in self._revoked.items() if exp > now}
+
+    async def _run(self, redis_client) -> None:
+        while True:
+            try:
+                await self._bootstrap(redis_client)
+                await self._follow(redis_client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                # Набор в памяти продолжает использоваться, пока не устареет
+                logger.warning(f"Синхронизация отозванных токенов прервана: {error}")
+                await asyncio.sleep(_RECONNECT_DELAY_SECONDS)
+
+    async def _bootstrap(self, redis_client) -> None:
+        # Позиция в потоке запоминается до чтения набора: события, добавленные во время
+        # загрузки, будут прочитаны повторно, но не потеряны
+        last = await redis_client.xrevrange(REVOCATION_STREAM, count=1)
+        last_id = last[0][0] if last else "0-0"
+
+        revoked: Dict[str, float] = {}
+        now = time.time()
+        async for token_id, expires_at in redis_client.zscan_iter(REVOKED_TOKENS, count=1000):
+            if expires_at > now:
+                revoked[token_id] = expires_at
+
+        with self._lock:
+            self._revoked = revoked
+            self._overflow = len(revoked) > self.max_size
+        self._last_id = last_id
+        self._synced_at = time.monotonic()
+        logger.info(f"Загружено отозванных токенов: {len(revoked)}")
+
+    async def _follow(self, redis_client) -> None:
+        while True:
+            response = await redis_client.xread({REVOCATION_STREAM: self._last_id}, count=1000, block=_STREAM_BLOCK_MS)
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    if "id" in fields:
+                        self.add(fields["id"], float(fields.get("exp", "inf")))
+                    self._last_id = entry_id
+            self._synced_at = time.monotonic()
+
+
+REVOCATION_CACHE = RevocationCache(
+    max_size=JWT_REVOCATION_CACHE_MAX_SIZE,
+    max_staleness_seconds=JWT_REVOCATION_CACHE_MAX_STALENESS_SECONDS
+)
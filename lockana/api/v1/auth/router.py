@@ -2,10 +2,11 @@ from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from lockana.database.database import get_db
-from .models import UserAuth, TokenResponse
+from .models import UserAuth, RefreshRequest, TokenResponse
 from .service import AuthService
 from .jwt import oauth2_scheme
 from lockana.exceptions import (
+    AuthenticationError,
     InvalidTokenError,
     RateLimitExceededError,
     InternalServerError
@@ -17,7 +18,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/login", response_model=TokenResponse)
-def login(request: Request, request_body: UserAuth, db: Session = Depends(get_db)):
+async def login(request: Request, request_body: UserAuth, db: Session = Depends(get_db)):
     """
     Выполняет аутентификацию пользователя и генерирует JWT токен.
 
@@ -35,10 +36,13 @@ def login(request: Request, request_body: UserAuth, db: Session = Depends(get_db
     """
     try:
         service = AuthService(db)
-        result = service.login(request, request_body.username, request_body.totp_code)
+        result = await service.login(request, request_body.username, request_body.totp_code)
         return JSONResponse(content=result, status_code=200)
     except HTTPException as e:
         return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+    except AuthenticationError as e:
+        # Неизвестный пользователь, неверный или уже использованный код: ответ одинаковый
+        return JSONResponse(content={"error": "Invalid TOTP code", "code": e.code}, status_code=401)
     except InvalidTokenError as e:
         return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
     except RateLimitExceededError as e:
@@ -47,12 +51,41 @@ def login(request: Request, request_body: UserAuth, db: Session = Depends(get_db
         logger.error(f"Error during login: {str(e)}")
         raise InternalServerError(detail="Internal server error during login")
 
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(request: Request, request_body: RefreshRequest, db: Session = Depends(get_db)):
+    """
+    Выдает новый токен доступа по токену обновления, полученному при входе.
+
+    Токен обновления одноразовый: в ответе возвращается новый, а предъявленный больше не принимается.
+    Повторное использование старого токена завершает сессию, после чего нужен новый вход с TOTP.
+
+    Параметры:
+        request (Request): Запрос, содержащий информацию о клиенте (например, IP-адрес).
+        request_body (RefreshRequest): Объект с токеном обновления.
+        db (Session): Объект сессии для работы с базой данных.
+
+    Возвращает:
+        JSONResponse: Ответ с новой парой токенов, либо с ошибкой 401.
+    """
+    try:
+        service = AuthService(db)
+        result = await service.refresh(request, request_body.refresh_token)
+        return JSONResponse(content=result, status_code=200)
+    except InvalidTokenError as e:
+        return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except HTTPException as e:
+        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+    except Exception as e:
+        logger.error(f"Error during token refresh: {str(e)}")
+        raise InternalServerError(detail="Internal server error during token refresh")
+
 @router.post("/logout")
-def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Завершающий процесс для пользователя: удаление токена из активных.
 
-    Эта функция позволяет пользователю выйти из системы, добавляя его токен в черный список.
+    Эта функция позволяет пользователю выйти из системы, добавляя его токен в черный список
+    и завершая сессию токена обновления.
     После этого токен считается отозванным, и его больше нельзя использовать для доступа к защищенным ресурсам.
 
     Параметры:
@@ -64,7 +97,7 @@ def logout(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     try:
         service = AuthService(db)
-        result = service.logout(token)
+        result = await service.logout(token)
         return JSONResponse(content=result, status_code=200)
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=getattr(e, 'status_code', 500)) 
\ No newline at end of file
@@ -1,10 +1,14 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, Request
 from lockana.models import User, Log
 from lockana.totp import TOTP_MANAGER
-from lockana.config import BLOCK_TIME_SECONDS, MAX_LOGIN_ATTEMPTS, WHITELIST_IPS
-from .jwt import jwt_is_blocked, create_jwt_access_token, redis_client, BLACKLISTED_TOKENS
-from lockana.exceptions import RateLimitExceededError, AuthenticationError, TOTPCodeError, TOTPSecretError
+from lockana.config import WHITELIST_IPS
+from lockana.database.database import run_db, sync_session
+from .jwt import jwt_is_blocked, create_jwt_access_token, revoke_jwt_token
+from .throttle import record_failed_login, reset_failed_logins
+from .refresh import issue_refresh_token, rotate_refresh_token, revoke_session
+from lockana.exceptions import RateLimitExceededError, AuthenticationError, InvalidTokenError, TOTPCodeError, TOTPSecretError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,49 +16,43 @@ logger = logging.getLogger(__name__)
 class AuthService:
     def __init__(self, db: Session):
         self.db = db
+        self.session = sync_session(db)
 
-    def login(self, request: Request, username: str, totp_code: str):
+    async def login(self, request: Request, username: str, totp_code: str):
         try:
             client_ip = request.client.host if request.client else '???'
 
-            if jwt_is_blocked(username, client_ip) and client_ip not in WHITELIST_IPS:
+            if await jwt_is_blocked(username, client_ip) and client_ip not in WHITELIST_IPS:
                 logger.warning(f"Блокированная попытка входа: {username} с IP {client_ip}")
                 raise RateLimitExceededError("Too many failed attempts. Try again later.")
 
-            user = self.db.query(User).filter(User.username == username).first()
+            user = await run_db(self.db, self._get_user, username)
             if not user:
-                self._handle_failed_login(username, client_ip)
+                await self._handle_failed_login(username, client_ip)
                 raise AuthenticationError("Invalid username or TOTP code")
 
-            user_secret = str(user.totp_secret)
+            user_secret, user_role = user
             try:
-                if not TOTP_MANAGER.check_totp_code(totp_code, user_secret):
-                    self._handle_failed_login(username, client_ip)
+                # Код проверяется и отмечается использованным: повторный вход с тем же кодом отклоняется
+                if not await TOTP_MANAGER.consume_totp_code(totp_code, user_secret, username):
+                    await self._handle_failed_login(username, client_ip)
                     raise AuthenticationError("Invalid username or TOTP code")
             except (TOTPCodeError, TOTPSecretError) as e:
-                self._handle_failed_login(username, client_ip)
+                await self._handle_failed_login(username, client_ip)
                 raise AuthenticationError("Invalid username or TOTP code")
 
-            redis_client.delete(f"fail_user:{username}")
-            redis_client.delete(f"fail_ip:{client_ip}")
+            await reset_failed_logins(username, client_ip)
 
-            user_role = "user"
-            if user.roles:
-                admin_role = next((role for role in user.roles if role.name == "admin"), None)
-                if admin_role:
-                    user_role = "admin"
-                else:
-                    user_role = user.roles[0].name
+            refresh_token, session_id = await issue_refresh_token(username)
+            jwt_token = create_jwt_access_token({"sub": username, "role": user_role, "sid": session_id})
 
-            jwt_token = create_jwt_access_token({"sub": username, "role": user_role})
-
-            self.db.add(Log(username=username, action='LOGIN_SUCCESS', ip_address=client_ip))
-            self.db.commit()
+            await run_db(self.db, self._add_log, username, 'LOGIN_SUCCESS', client_ip)
             logger.info(f"Успешный вход: {username}")
 
             return {
                 "message": "Login successful",
                 "access_token": jwt_token,
+                "refresh_token": refresh_token,
                 "token_type": "bearer"
             }
 
@@ -64,27 +62,86 @@ class AuthService:
             logger.error(f"Ошибка входа: {str(error)}")
             raise HTTPException(status_code=500, detail="An error occurred during authentication")
 
-    def logout(self, token: str):
+    async def refresh(self, request: Request, refresh_token: str):
+        """
+        Обменивает токен обновления на новую пару токенов без проверки TOTP.
+
+        Роль пользователя перечитывается из базы (один запрос), запись в журнал не добавляется.
+        Повторное предъявление уже использованного токена означает, что он скопирован:
+        сессия отзывается целиком, а событие записывается в журнал как REFRESH_TOKEN_REUSE.
+
+        Исключения:
+            InvalidTokenError: Если токен недействителен, сессия завершена или токен использован повторно.
+        """
         try:
-            redis_client.sadd(BLACKLISTED_TOKENS, token)
+            client_ip = request.client.host if request.client else '???'
+            result = await rotate_refresh_token(refresh_token)
+            if result.status == "reuse":
+                logger.warning(f"Повторное использование токена обновления: {result.username} с IP {client_ip}, сессия отозвана")
+                await run_db(self.db, self._add_log, result.username, 'REFRESH_TOKEN_REUSE', client_ip, True)
+            if result.status != "ok":
+                raise InvalidTokenError("Invalid or expired refresh token")
+
+            user = await run_db(self.db, self._get_user, result.username)
+            if not user:
+                await revoke_session(result.session_id)
+                raise InvalidTokenError("Invalid or expired refresh token")
+
+            _, user_role = user
+            jwt_token = create_jwt_access_token({"sub": result.username, "role": user_role, "sid": result.session_id})
+            return {
+                "message": "Token refreshed",
+                "access_token": jwt_token,
+                "refresh_token": result.refresh_token,
+                "token_type": "bearer"
+            }
+
+        except InvalidTokenError:
+            raise
+        except Exception as error:
+            logger.error(f"Ошибка обновления токена: {str(error)}")
+            raise HTTPException(status_code=500, detail="An error occurred during token refresh")
+
+    async def logout(self, token: str):
+        try:
+            payload = await revoke_jwt_token(token)
+            if payload.get("sid"):
+                await revoke_session(str(payload["sid"]))
             logger.info("Пользователь вышел из системы.")
             return {"message": "Logged out successfully"}
+        except HTTPException:
+            raise
         except Exception as error:
             logger.error(f"Ошибка выхода: {str(error)}")
             raise HTTPException(status_code=500, detail="An error occurred")
 
-    def _handle_failed_login(self, username: str, client_ip: str):
-        redis_client.incr(f"fail_user:{username}")
-        redis_client.incr(f"fail_ip:{client_ip}")
-
-        attempts_user = int(redis_client.get(f"fail_user:{username}") or 0)
-        attempts_ip = int(redis_client.get(f"fail_ip:{client_ip}") or 0)
-
-        if attempts_user >= MAX_LOGIN_ATTEMPTS:
-            redis_client.setex(f"block_user:{username}", BLOCK_TIME_SECONDS, "1")
-        if attempts_ip >= MAX_LOGIN_ATTEMPTS:
-            redis_client.setex(f"block_ip:{client_ip}", BLOCK_TIME_SECONDS, "1")
-
-        logger.warning(f"Неудачная попытка входа: {username} с IP {client_ip}")
-        self.db.add(Log(username=username, action='LOGIN_FAIL', ip_address=client_ip))
-        self.db.commit() 
\ No newline at end of file
+    async def _handle_failed_login(self, username: str, client_ip: str):
+        state = await record_failed_login(username, client_ip)
+        logger.warning(f"Неудачная попытка входа: {username} с IP {client_ip} (попыток: {state.attempts_user}/{state.attempts_ip})")
+        if state.user_blocked or state.ip_blocked:
+            logger.warning(f"Вход заблокирован: {username} с IP {client_ip}")
+        # Запрос завершится ошибкой и транзакция запроса будет откачена,
+        # поэтому запись о неудачной попытке фиксируется сразу
+        await run_db(self.db, self._add_log, username, 'LOGIN_FAIL', client_ip, True)
+
+    def _get_user(self, username: str) -> Optional[tuple]:
+        # Сервисные учетные записи входят только по ключу API
+        user = self.session.query(User).filter(User.username == username, User.account_type == "user").first()
+        if not user:
+            return None
+
+        user_role = "user"
+        if user.roles:
+            admin_role = next((role for role in user.roles if role.name == "admin"), None)
+            if admin_role:
+                user_role = "admin"
+            else:
+                user_role = user.roles[0].name
+        return str(user.totp_secret), user_role
+
+    def _add_log(self, username: str, action: str, client_ip: str, commit: bool = False):
+        self.session.add(Log(username=username, action=action, ip_address=client_ip))
+        if commit:
+            self.session.commit()
+        else:
+            self.session.flush() 
\ No newline at end of file
@@ -0,0 +1,65 @@
+import logging
+from typing import NamedTuple
+from lockana.config import BLOCK_TIME_SECONDS, FAILED_LOGIN_WINDOW_SECONDS, MAX_LOGIN_ATTEMPTS
+from lockana.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS: fail_user, fail_ip, block_user, block_ip
+# ARGV: max_attempts, window_seconds, block_seconds
+# Счетчики неудачных попыток живут window_seconds с момента последней неудачи (скользящее окно),
+# при достижении max_attempts устанавливается блокировка на block_seconds.
+_FAILED_LOGIN_LUA = """
+local max_attempts = tonumber(ARGV[1])
+local attempts_user = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+local attempts_ip = redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local user_blocked = 0
+local ip_blocked = 0
+if attempts_user >= max_attempts then
+    redis.call('SET', KEYS[3], '1', 'EX', ARGV[3])
+    user_blocked = 1
+end
+if attempts_ip >= max_attempts then
+    redis.call('SET', KEYS[4], '1', 'EX', ARGV[3])
+    ip_blocked = 1
+end
+return {attempts_user, attempts_ip, user_blocked, ip_blocked}
+"""
+
+_failed_login_script = async_redis_client.register_script(_FAILED_LOGIN_LUA)
+
+
+class FailedLoginState(NamedTuple):
+    """
+    Состояние ограничения входа после неудачной попытки.
+
+    Атрибуты:
+        attempts_user (int): Неудачных попыток для пользователя в текущем окне.
+        attempts_ip (int): Неудачных попыток с IP-адреса в текущем окне.
+        user_blocked (bool): Пользователь заблокирован.
+        ip_blocked (bool): IP-адрес заблокирован.
+    """
+    attempts_user: int
+    attempts_ip: int
+    user_blocked: bool
+    ip_blocked: bool
+
+
+async def record_failed_login(username: str, ip: str) -> FailedLoginState:
+    """
+    Учитывает неудачную попытку входа и при превышении лимита блокирует пользователя и IP-адрес.
+
+    Счетчики увеличиваются, продлеваются и проверяются одним скриптом Lua на стороне Redis:
+    один запрос вместо шести и без гонки между увеличением и чтением счетчика.
+    """
+    attempts_user, attempts_ip, user_blocked, ip_blocked = await _failed_login_script(
+        keys=[f"fail_user:{username}", f"fail_ip:{ip}", f"block_user:{username}", f"block_ip:{ip}"],
+        args=[MAX_LOGIN_ATTEMPTS, FAILED_LOGIN_WINDOW_SECONDS, BLOCK_TIME_SECONDS]
+    )
+    return FailedLoginState(int(attempts_user), int(attempts_ip), bool(user_blocked), bool(ip_blocked))
+
+
+async def reset_failed_logins(username: str, ip: str) -> None:
+    await async_redis_client.delete(f"fail_user:{username}", f"fail_ip:{ip}")
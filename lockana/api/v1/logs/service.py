@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from lockana.database.database import run_db, sync_session
 from fastapi import HTTPException
 from lockana.models import Log
 from lockana.config import LOG_FILE_NAME
@@ -14,8 +15,21 @@ logger = logging.getLogger(__name__)
 class LogService:
     def __init__(self, db: Session):
         self.db = db
+        self.session = sync_session(db)
 
-    def get_logs_file(self):
+    async def get_logs_file(self):
+        return await run_db(self.db, self._get_logs_file)
+
+    async def delete_logs_file(self):
+        return await run_db(self.db, self._delete_logs_file)
+
+    async def get_auth_logs(self):
+        return await run_db(self.db, self._get_auth_logs)
+
+    async def delete_auth_logs(self):
+        return await run_db(self.db, self._delete_auth_logs)
+
+    def _get_logs_file(self):
         try:
             log_file_path = os.path.join(os.getcwd(), LOG_FILE_NAME)
             if not os.path.exists(log_file_path):
@@ -28,7 +42,7 @@ class LogService:
             logger.error(f"Error occurred while retrieving log file: {error}")
             raise InternalServerError(detail="Error retrieving log file")
 
-    def delete_logs_file(self):
+    def _delete_logs_file(self):
         try:
             log_file_path = os.path.join(os.getcwd(), LOG_FILE_NAME)
             if not os.path.exists(log_file_path):
@@ -42,21 +56,20 @@ class LogService:
             logger.error(f"Error when deleting a log file: {error}")
             raise InternalServerError(detail="Error deleting log file")
 
-    def get_auth_logs(self):
+    def _get_auth_logs(self):
         try:
-            logs = self.db.query(Log).all()
+            logs = self.session.query(Log).all()
             return logs
         except Exception as error:
             logger.error(f"Error occurred while retrieving the log: {error}")
             raise InternalServerError(detail="Error retrieving auth logs")
 
-    def delete_auth_logs(self):
+    def _delete_auth_logs(self):
         try:
-            deleted_count = self.db.query(Log).delete()
-            self.db.commit()
+            deleted_count = self.session.query(Log).delete()
+            self.session.flush()
             logger.info(f"Deleted {deleted_count} logs from the database.")
             return deleted_count
         except Exception as error:
-            self.db.rollback()
             logger.error(f"Error occurred while deleting logs: {error}")
             raise InternalServerError(detail="Error deleting auth logs") 
\ No newline at end of file
@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from lockana.database.database import run_db, sync_session
 from lockana.exceptions import InternalServerError
 import logging
 
@@ -7,8 +8,15 @@ logger = logging.getLogger(__name__)
 class NotificationService:
     def __init__(self, db: Session):
         self.db = db
+        self.session = sync_session(db)
 
-    def test_notification(self, username: str):
+    async def test_notification(self, username: str):
+        return await run_db(self.db, self._test_notification, username)
+
+    async def connect_telegram(self, username: str, telegram_id: str, telegram_username: str):
+        return await run_db(self.db, self._connect_telegram, username, telegram_id, telegram_username)
+
+    def _test_notification(self, username: str):
         try:
             # TODO: Implement notification logic
             return True
@@ -16,7 +24,7 @@ class NotificationService:
             logger.error(f"Error testing notification: {error}")
             raise InternalServerError(detail="Error testing notification")
 
-    def connect_telegram(self, username: str, telegram_id: str, telegram_username: str):
+    def _connect_telegram(self, username: str, telegram_id: str, telegram_username: str):
         try:
             # TODO: Implement notification logic
             return True
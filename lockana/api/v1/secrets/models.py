@@ -1,8 +1,13 @@
-from pydantic import BaseModel
+from typing import List
+from pydantic import BaseModel, Field
+from lockana.config import SECRETS_BATCH_MAX_SIZE, SECRETS_MAX_DATA_SIZE
 
 class SecretData(BaseModel):
     name: str
-    encrypted_data: str
+    encrypted_data: str = Field(..., max_length=SECRETS_MAX_DATA_SIZE)
 
 class SecretName(BaseModel):
-    name: str 
\ No newline at end of file
+    name: str
+
+class SecretNames(BaseModel):
+    names: List[str] = Field(..., min_length=1, max_length=SECRETS_BATCH_MAX_SIZE)
@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from lockana.database.database import get_db
-from lockana.api.v1.auth.jwt import oauth2_scheme, verify_jwt_token
-from lockana.permissions import check_permission
-from .models import SecretData, SecretName
+from lockana.permissions import Principal, check_permission, get_principal
+from .models import SecretData, SecretName, SecretNames
 from .service import SecretService
 from lockana.exceptions import (
+    ConflictError,
     InvalidTokenError,
     ResourceNotFoundError,
     PermissionDeniedError,
+    ServiceUnavailableError,
     InternalServerError
 )
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from lockana.config import SECRETS_LIST_PAGE_SIZE, SECRETS_LIST_MAX_PAGE_SIZE
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,70 +23,126 @@ router = APIRouter(prefix="/secrets", tags=["Secrets"])
 
 @router.get("/list")
 @check_permission("read")
-def list_secrets(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = verify_jwt_token(token)
+async def list_secrets(
+    limit: int = Query(SECRETS_LIST_PAGE_SIZE, ge=1, le=SECRETS_LIST_MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, ge=0),
+    names_only: bool = False,
+    principal: Principal = Depends(get_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Возвращает страницу секретов пользователя.
+
+    Пагинация по ключу (username, id): для следующей страницы передается `cursor`
+    из поля `next_cursor` предыдущего ответа. При `names_only=true` данные не расшифровываются.
+    """
+    username = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid token")
         
         service = SecretService(db)
-        secrets = service.list_secrets(username)
-        return {"secrets": secrets}
+        return await service.list_secrets(username, limit, cursor, names_only)
 
     except InvalidTokenError as e:
         return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except ServiceUnavailableError as e:
+        return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code, headers=e.headers)
     except Exception as e:
         logger.error(f"Error while listing secrets: {str(e)}. Username: {username}")
         raise InternalServerError(detail="Internal server error while listing secrets")
 
+@router.get("/stream")
+@check_permission("read")
+async def stream_secrets(names_only: bool = False, principal: Principal = Depends(get_principal)):
+    """
+    Передает все секреты пользователя потоком NDJSON (одна JSON-запись на строку).
+
+    Строки читаются серверным курсором и расшифровываются по одной.
+    """
+    return StreamingResponse(
+        SecretService.stream_secrets(principal.username, names_only),
+        media_type="application/x-ndjson"
+    )
+
 @router.post("/add")
 @check_permission("write")
-def add_secret(secret: SecretData, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = verify_jwt_token(token)
+async def add_secret(secret: SecretData, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    username = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid token")
 
         service = SecretService(db)
-        secret_name = service.add_secret(username, secret.name, secret.encrypted_data)
+        secret_name = await service.add_secret(username, secret.name, secret.encrypted_data)
         return {"message": "Secret added successfully", "secret": secret_name}
 
     except InvalidTokenError as e:
         return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except ConflictError as e:
+        return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
     except Exception as e:
         logger.error(f"Error while adding secret for user {username}: {str(e)}")
         raise InternalServerError(detail="Internal server error while adding secret")
 
 @router.post("/get")
 @check_permission("read")
-def get_secret(secret_name: SecretName, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = verify_jwt_token(token)
+async def get_secret(secret_name: SecretName, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    username = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid token")
         
         service = SecretService(db)
-        secret_data = service.get_secret(username, secret_name.name)
+        secret_data = await service.get_secret(username, secret_name.name)
         return {"secret": secret_data}
 
     except InvalidTokenError as e:
         return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
     except ResourceNotFoundError as e:
         return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except ServiceUnavailableError as e:
+        return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code, headers=e.headers)
     except Exception as e:
         logger.error(f"Error while retrieving secret for user {username}: {str(e)}")
         raise InternalServerError(detail="Internal server error while retrieving secret")
 
+@router.post("/batch-get")
+@check_permission("read")
+async def get_secrets_batch(secret_names: SecretNames, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    """
+    Возвращает несколько секретов за один запрос.
+
+    Все секреты выбираются одним запросом `WHERE name IN (...)`. Отсутствующие секреты
+    не приводят к ошибке всего запроса, а помечаются в ответе для каждого имени отдельно.
+    """
+    username = principal.username
+    try:
+        if not username:
+            raise InvalidTokenError("Invalid token")
+
+        service = SecretService(db)
+        secrets = await service.get_secrets(username, secret_names.names)
+        return {"secrets": secrets}
+
+    except InvalidTokenError as e:
+        return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code)
+    except ServiceUnavailableError as e:
+        return JSONResponse(content={"error": e.detail, "code": e.code}, status_code=e.status_code, headers=e.headers)
+    except Exception as e:
+        logger.error(f"Error while retrieving secrets for user {username}: {str(e)}")
+        raise InternalServerError(detail="Internal server error while retrieving secrets")
+
 @router.put("/update")
 @check_permission("write")
-def update_secret(secret: SecretData, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = verify_jwt_token(token)
+async def update_secret(secret: SecretData, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    username = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid token")
         
         service = SecretService(db)
-        secret_name = service.update_secret(username, secret.name, secret.encrypted_data)
+        secret_name = await service.update_secret(username, secret.name, secret.encrypted_data)
         return {"message": "Secret updated successfully", "secret": secret_name}
 
     except InvalidTokenError as e:
@@ -96,14 +155,14 @@ def update_secret(secret: SecretData, token: str = Depends(oauth2_scheme), db: S
 
 @router.delete("/delete")
 @check_permission("delete")
-def delete_secret(secret_name: SecretName, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    username = verify_jwt_token(token)
+async def delete_secret(secret_name: SecretName, principal: Principal = Depends(get_principal), db: Session = Depends(get_db)):
+    username = principal.username
     try:
         if not username:
             raise InvalidTokenError("Invalid token")
 
         service = SecretService(db)
-        service.delete_secret(username, secret_name.name)
+        await service.delete_secret(username, secret_name.name)
         return {"message": "Secret deleted successfully"}
 
     except InvalidTokenError as e:
@@ -1,68 +1,279 @@
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from lockana.database.database import _db_instance, run_db, sync_session
 from lockana.models import Secret
-from lockana.config import SECRET_KEY
-from lockana.crypto import encrypt_data, decrypt_data
+from lockana.config import DATABASE_ASYNC_MODE, SECRETS_STREAM_BATCH_SIZE, ENCRYPTION_LAZY_UPGRADE
+from lockana.crypto import encrypt_secret, decrypt_secret_async, decrypt_secret_offloaded, decrypt_secrets_async
 from lockana.exceptions import (
+    ConflictError,
     ResourceNotFoundError,
+    ServiceUnavailableError,
     InternalServerError
 )
+from typing import AsyncIterator, Iterator, List, Optional, Union
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Колонки, необходимые для расшифровки: бинарный конверт, устаревшая hex-строка и ключ данных
+_DATA_COLUMNS = (Secret.ciphertext, Secret.encrypted_data, Secret.data_key)
+
+
+def _stored_value(row):
+    """
+    Возвращает зашифрованное значение строки: бинарный конверт или, для записей,
+    которые еще не были перешифрованы, устаревшую hex-строку.
+    """
+    return row.ciphertext if row.ciphertext is not None else row.encrypted_data
+
+
+def _encrypted_fields(data: str) -> dict:
+    """
+    Шифрует данные секрета новым ключом данных и возвращает значения колонок модели.
+    """
+    ciphertext, data_key = encrypt_secret(data)
+    return {"ciphertext": ciphertext, "data_key": data_key, "encrypted_data": ""}
+
+
 class SecretService:
     def __init__(self, db: Session):
         self.db = db
+        self.session = sync_session(db)
+
+    # Расшифровка выполняется вне run_db: тяжелые операции (RSA) уходят в пул процессов
+    # CRYPTO_EXECUTOR и не блокируют ни поток с сессией, ни цикл событий в асинхронном режиме.
+
+    async def list_secrets(self, username: str, limit: int, cursor: Optional[int] = None, names_only: bool = False):
+        page = await run_db(self.db, self._list_secrets, username, limit, cursor, names_only)
+        if names_only:
+            return page
+        rows = page["secrets"]
+        try:
+            decrypted = await decrypt_secrets_async([(_stored_value(row), row.data_key) for row in rows])
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error decrypting secrets for user {username}: {str(e)}")
+            raise InternalServerError(detail="Error listing secrets")
+        page["secrets"] = [{"name": row.name, "data": data} for row, data in zip(rows, decrypted)]
+        return page
+
+    async def add_secret(self, username: str, name: str, encrypted_data: str):
+        return await run_db(self.db, self._add_secret, username, name, encrypted_data)
+
+    async def get_secret(self, username: str, name: str):
+        secret = await run_db(self.db, self._find_secret, username, name)
+        try:
+            data = await decrypt_secret_async(_stored_value(secret), secret.data_key)
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting secret for user {username}: {str(e)}")
+            raise InternalServerError(detail="Error getting secret")
+        if secret.data_key is None and ENCRYPTION_LAZY_UPGRADE:
+            await run_db(self.db, self._upgrade_legacy_rows, [secret], {secret.name: data})
+        logger.info(f"User accessed their secret")
+        return data
+
+    async def get_secrets(self, username: str, names: List[str]):
+        unique_names = list(dict.fromkeys(names))
+        rows = await run_db(self.db, self._find_secrets, username, unique_names)
+        rows_by_name = {row.name: row for row in rows}
+        found_names = [name for name in unique_names if name in rows_by_name]
+        try:
+            decrypted = dict(zip(found_names, await decrypt_secrets_async([
+                (_stored_value(rows_by_name[name]), rows_by_name[name].data_key) for name in found_names
+            ])))
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting secrets for user {username}: {str(e)}")
+            raise InternalServerError(detail="Error getting secrets")
+        if ENCRYPTION_LAZY_UPGRADE:
+            await run_db(self.db, self._upgrade_legacy_rows, [rows_by_name[name] for name in found_names], decrypted)
+
+        logger.info(f"User accessed {len(found_names)} of {len(unique_names)} requested secrets")
+        return [
+            {"name": name, "found": True, "data": decrypted[name]}
+            if name in decrypted else
+            {"name": name, "found": False, "error": "Secret not found"}
+            for name in unique_names
+        ]
 
-    def list_secrets(self, username: str):
+    async def update_secret(self, username: str, name: str, encrypted_data: str):
+        return await run_db(self.db, self._update_secret, username, name, encrypted_data)
+
+    async def delete_secret(self, username: str, name: str):
+        return await run_db(self.db, self._delete_secret, username, name)
+
+    def _list_secrets(self, username: str, limit: int, cursor: Optional[int], names_only: bool):
         try:
-            secrets = self.db.query(Secret).filter(Secret.username == username).all()
+            columns = (Secret.id, Secret.name) if names_only else (Secret.id, Secret.name, *_DATA_COLUMNS)
+            query = self.session.query(*columns).filter(Secret.username == username)
+            if cursor is not None:
+                query = query.filter(Secret.id > cursor)
+            rows = query.order_by(Secret.id).limit(limit + 1).all()
+
+            next_cursor = rows[limit - 1].id if len(rows) > limit else None
+            rows = rows[:limit]
             logger.info(f"User fetched their secrets.")
-            return [
-                {"name": secret.name, "data": decrypt_data(str(secret.encrypted_data), SECRET_KEY)}
-                for secret in secrets
-            ]
+            return {
+                "secrets": [{"name": row.name} for row in rows] if names_only else rows,
+                "next_cursor": next_cursor
+            }
         except Exception as e:
             logger.error(f"Error listing secrets for user {username}: {str(e)}")
             raise InternalServerError(detail="Error listing secrets")
 
-    def add_secret(self, username: str, name: str, encrypted_data: str):
+    @staticmethod
+    def _serialize(row, names_only: bool) -> dict:
+        if names_only:
+            return {"name": row.name}
+        return {"name": row.name, "data": decrypt_secret_offloaded(_stored_value(row), row.data_key)}
+
+    @staticmethod
+    async def _serialize_async(row, names_only: bool) -> dict:
+        if names_only:
+            return {"name": row.name}
+        return {"name": row.name, "data": await decrypt_secret_async(_stored_value(row), row.data_key)}
+
+    @staticmethod
+    def _stream_statement(username: str, names_only: bool):
+        columns = (Secret.id, Secret.name) if names_only else (Secret.id, Secret.name, *_DATA_COLUMNS)
+        return (
+            select(*columns)
+            .where(Secret.username == username)
+            .order_by(Secret.id)
+            .execution_options(stream_results=True, yield_per=SECRETS_STREAM_BATCH_SIZE)
+        )
+
+    @classmethod
+    def stream_secrets(cls, username: str, names_only: bool = False) -> Union[Iterator[str], AsyncIterator[str]]:
+        """
+        Возвращает итератор строк NDJSON со всеми секретами пользователя.
+
+        Строки читаются серверным курсором пачками по `secrets.stream_batch_size` и
+        расшифровываются по одной, поэтому память не растет с количеством секретов.
+        Итератор открывает собственную сессию: сессия запроса закрывается
+        до начала передачи тела ответа.
+
+        Параметры:
+            username (str): Имя пользователя.
+            names_only (bool): Возвращать только имена, без расшифровки данных.
+
+        Возвращает:
+            Iterator[str] | AsyncIterator[str]: Асинхронный итератор в асинхронном режиме, иначе синхронный.
+        """
+        if DATABASE_ASYNC_MODE:
+            return cls._stream_secrets_async(username, names_only)
+        return cls._stream_secrets_sync(username, names_only)
+
+    @classmethod
+    def _stream_secrets_sync(cls, username: str, names_only: bool) -> Iterator[str]:
+        with _db_instance.SessionLocal() as session:
+            try:
+                for row in session.execute(cls._stream_statement(username, names_only)):
+                    yield json.dumps(cls._serialize(row, names_only), ensure_ascii=False) + "\n"
+                logger.info(f"User streamed their secrets.")
+            except Exception as e:
+                logger.error(f"Error streaming secrets for user {username}: {str(e)}")
+                raise
+
+    @classmethod
+    async def _stream_secrets_async(cls, username: str, names_only: bool) -> AsyncIterator[str]:
+        async with _db_instance.AsyncSessionLocal() as session:
+            try:
+                result = await session.stream(cls._stream_statement(username, names_only))
+                async for row in result:
+                    yield json.dumps(await cls._serialize_async(row, names_only), ensure_ascii=False) + "\n"
+                logger.info(f"User streamed their secrets.")
+            except Exception as e:
+                logger.error(f"Error streaming secrets for user {username}: {str(e)}")
+                raise
+
+    def _add_secret(self, username: str, name: str, encrypted_data: str):
         try:
-            encrypted_data = encrypt_data(encrypted_data, SECRET_KEY)
-            new_secret = Secret(username=username, name=name, encrypted_data=encrypted_data)
-            self.db.add(new_secret)
-            self.db.commit()
+            new_secret = Secret(username=username, name=name, **_encrypted_fields(encrypted_data))
+            # Точка сохранения: нарушение уникальности не должно ломать транзакцию запроса
+            with self.session.begin_nested():
+                self.session.add(new_secret)
             logger.info(f"User added a new secret")
             return name
+        except IntegrityError:
+            logger.warning(f"User tried to add a secret with an existing name")
+            raise ConflictError(detail="Secret already exists")
         except Exception as e:
             logger.error(f"Error adding secret for user {username}: {str(e)}")
             raise InternalServerError(detail="Error adding secret")
 
-    def get_secret(self, username: str, name: str):
+    def _find_secret(self, username: str, name: str):
         try:
-            secret = self.db.query(Secret).filter(Secret.username == username, Secret.name == name).first()
+            secret = (
+                self.session.query(Secret.id, Secret.name, *_DATA_COLUMNS)
+                .filter(Secret.username == username, Secret.name == name)
+                .first()
+            )
             if not secret:
                 logger.warning(f"User tried to access a non-existing secret")
                 raise ResourceNotFoundError(detail="Secret not found")
-            
-            logger.info(f"User accessed their secret")
-            return decrypt_data(str(secret.encrypted_data), SECRET_KEY)
+            return secret
         except ResourceNotFoundError:
             raise
         except Exception as e:
             logger.error(f"Error getting secret for user {username}: {str(e)}")
             raise InternalServerError(detail="Error getting secret")
 
-    def update_secret(self, username: str, name: str, encrypted_data: str):
+    def _find_secrets(self, username: str, names: List[str]):
+        try:
+            return (
+                self.session.query(Secret.id, Secret.name, *_DATA_COLUMNS)
+                .filter(Secret.username == username, Secret.name.in_(names))
+                .all()
+            )
+        except Exception as e:
+            logger.error(f"Error getting secrets for user {username}: {str(e)}")
+            raise InternalServerError(detail="Error getting secrets")
+
+    def _upgrade_legacy_rows(self, rows, decrypted: dict):
+        """
+        Перешифровывает записи без ключа данных (в том числе в устаревшем hex-формате)
+        собственными ключами данных.
+
+        Новое значение получено из данных, прочитанных раньше в этом же запросе, поэтому
+        запись обновляется, только если она не изменилась с момента чтения: ключа данных
+        по-прежнему нет, а шифротекст совпадает с прочитанным. Записи, которые успели
+        изменить `/update` или задание ротации ключей, пропускаются.
+        """
+        upgraded = 0
+        for row in rows:
+            if row.data_key is not None:
+                continue
+            if row.ciphertext is None:
+                unchanged = (Secret.ciphertext.is_(None), Secret.encrypted_data == row.encrypted_data)
+            else:
+                unchanged = (Secret.ciphertext == row.ciphertext,)
+            statement = (
+                update(Secret)
+                .where(Secret.id == row.id, Secret.data_key.is_(None), *unchanged)
+                .values(**_encrypted_fields(decrypted[row.name]))
+                .execution_options(synchronize_session=False)
+            )
+            upgraded += self.session.execute(statement).rowcount
+        if upgraded:
+            logger.info(f"Upgraded {upgraded} secrets to per-secret data keys")
+
+    def _update_secret(self, username: str, name: str, encrypted_data: str):
         try:
-            secret = self.db.query(Secret).filter(Secret.username == username, Secret.name == name).first()
+            secret = self.session.query(Secret).filter(Secret.username == username, Secret.name == name).first()
             if not secret:
                 logger.warning(f"User tried to update a non-existing secret")
                 raise ResourceNotFoundError(detail="Secret not found")
             
-            encrypted_data = encrypt_data(encrypted_data, SECRET_KEY)
-            secret.encrypted_data = encrypted_data
-            self.db.commit()
+            for field, value in _encrypted_fields(encrypted_data).items():
+                setattr(secret, field, value)
+            self.session.flush()
             logger.info(f"User updated their secret")
             return name
         except ResourceNotFoundError:
@@ -71,15 +282,15 @@ class SecretService:
             logger.error(f"Error updating secret for user {username}: {str(e)}")
             raise InternalServerError(detail="Error updating secret")
 
-    def delete_secret(self, username: str, name: str):
+    def _delete_secret(self, username: str, name: str):
         try:
-            secret = self.db.query(Secret).filter(Secret.username == username, Secret.name == name).first()
+            secret = self.session.query(Secret).filter(Secret.username == username, Secret.name == name).first()
             if not secret:
                 logger.warning(f"User tried to delete a non-existing secret")
                 raise ResourceNotFoundError(detail="Secret not found")
             
-            self.db.delete(secret)
-            self.db.commit()
+            self.session.delete(secret)
+            self.session.flush()
             logger.info(f"User deleted their secret")
         except ResourceNotFoundError:
             raise
@@ -1,3 +1,4 @@
+import base64
 import os
 import yaml
 import logging
@@ -24,17 +25,105 @@ DATABASE_STRING = os.getenv("DATABASE_STRING", "")
 if not DATABASE_STRING:
     raise ValueError("DATABASE_STRING не может быть пустым!")
 
+# Асинхронный режим работы с базой данных
+DATABASE_ASYNC_MODE: bool = config.get("database", {}).get("async_mode", False)
+DATABASE_ASYNC_STRING = os.getenv("DATABASE_ASYNC_STRING", "")
+
+# Настройки пула соединений
+DATABASE_POOL_SIZE: int = config.get("database", {}).get("pool_size", 10)
+DATABASE_MAX_OVERFLOW: int = config.get("database", {}).get("max_overflow", 20)
+DATABASE_POOL_TIMEOUT: float = config.get("database", {}).get("pool_timeout", 10)
+DATABASE_POOL_RECYCLE: int = config.get("database", {}).get("pool_recycle", 1800)
+DATABASE_POOL_PRE_PING: bool = config.get("database", {}).get("pool_pre_ping", True)
+
 SECRET_KEY = os.getenv("SECRET_KEY", "").encode()
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY не может быть пустым!")
 
+# Подключение к Redis
+REDIS_MODE: str = os.getenv("REDIS_MODE", config.get("redis", {}).get("mode", "standalone"))
+REDIS_URL: str = os.getenv("REDIS_URL", config.get("redis", {}).get("url", "redis://localhost:6379/0"))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+REDIS_MAX_CONNECTIONS: int = config.get("redis", {}).get("max_connections", 50)
+REDIS_POOL_TIMEOUT: float = config.get("redis", {}).get("pool_timeout", 1)
+REDIS_SOCKET_TIMEOUT: float = config.get("redis", {}).get("socket_timeout", 2)
+REDIS_SOCKET_CONNECT_TIMEOUT: float = config.get("redis", {}).get("socket_connect_timeout", 1)
+REDIS_HEALTH_CHECK_INTERVAL: int = config.get("redis", {}).get("health_check_interval", 30)
+REDIS_RETRY_ATTEMPTS: int = config.get("redis", {}).get("retry_attempts", 2)
+REDIS_RETRY_BACKOFF_BASE: float = config.get("redis", {}).get("retry_backoff_base", 0.05)
+REDIS_RETRY_BACKOFF_CAP: float = config.get("redis", {}).get("retry_backoff_cap", 0.5)
+REDIS_SENTINEL_MASTER_NAME: str = config.get("redis", {}).get("sentinel", {}).get("master_name", "mymaster")
+REDIS_SENTINEL_NODES: list = config.get("redis", {}).get("sentinel", {}).get("nodes", [])
+REDIS_SENTINEL_PASSWORD = os.getenv("REDIS_SENTINEL_PASSWORD") or None
+
 # Настройки JWT
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = config["jwt"].get("access_token_expire_minutes", 1)
+# Токены обновления: время жизни с последнего обмена и максимальная длительность сессии
+JWT_REFRESH_TOKEN_EXPIRE_MINUTES: int = config["jwt"].get("refresh_token_expire_minutes", 1440)
+JWT_REFRESH_SESSION_MAX_HOURS: int = config["jwt"].get("refresh_session_max_hours", 168)
+# Асимметричные ключи подписи JWT (EdDSA/ES256) и ключ, которым подписываются новые токены
+JWT_SIGNING_KEYS: list = config["jwt"].get("signing_keys") or []
+JWT_ACTIVE_KEY_ID = config["jwt"].get("active_key_id")
+JWT_SIGNING_KEY_PASSWORD = os.getenv("JWT_SIGNING_KEY_PASSWORD", "").encode() or None
+# Отозванные токены в памяти воркера (синхронизируются через поток Redis)
+JWT_REVOCATION_CACHE_ENABLED: bool = config["jwt"].get("revocation_cache_enabled", True)
+JWT_REVOCATION_CACHE_MAX_SIZE: int = config["jwt"].get("revocation_cache_max_size", 1000000)
+JWT_REVOCATION_CACHE_MAX_STALENESS_SECONDS: float = config["jwt"].get("revocation_cache_max_staleness_seconds", 30)
+JWT_REVOCATION_STREAM_MAXLEN: int = config["jwt"].get("revocation_stream_maxlen", 100000)
 
 # Алгоритм шифрования
 ENCRYPTION_ALGORITHM: str = config["encryption"].get("algorithm", "AES")
+# Перешифровывать старые записи в текущий формат (конверт с ключом данных) при чтении
+ENCRYPTION_LAZY_UPGRADE: bool = config["encryption"].get("lazy_upgrade", True)
+
+# Мастер-ключи для шифрования ключей данных: MASTER_KEYS="1:<base64>,2:<base64>".
+# Ключ с идентификатором 0 - SECRET_KEY, которым зашифрованы записи до появления ключей данных.
+ENCRYPTION_MASTER_KEYS: Dict[int, bytes] = {0: SECRET_KEY}
+for _item in filter(None, (part.strip() for part in os.getenv("MASTER_KEYS", "").split(","))):
+    _key_id, _, _encoded_key = _item.partition(":")
+    if not _key_id.isdigit() or not 0 < int(_key_id) < 0xFFFF or not _encoded_key:
+        raise ValueError(f"Неверный формат MASTER_KEYS: ожидается '<id>:<base64>', id от 1 до 65534")
+    ENCRYPTION_MASTER_KEYS[int(_key_id)] = base64.b64decode(_encoded_key)
+# Ключи RSA для гибридного режима (algorithm: rsa): ключ данных шифруется RSA-OAEP, данные - AES-GCM.
+# Узлам, которые только записывают секреты, достаточно открытого ключа.
+ENCRYPTION_RSA_KEY_ID: int = config["encryption"].get("rsa_key_id", 32768)
+ENCRYPTION_RSA_PUBLIC_KEY_FILE: str = config["encryption"].get("rsa_public_key_file", "")
+ENCRYPTION_RSA_PRIVATE_KEY_FILE: str = config["encryption"].get("rsa_private_key_file", "")
+ENCRYPTION_RSA_PRIVATE_KEY_PASSWORD = os.getenv("RSA_PRIVATE_KEY_PASSWORD", "").encode() or None
+if ENCRYPTION_RSA_KEY_ID in ENCRYPTION_MASTER_KEYS:
+    raise ValueError(f"encryption.rsa_key_id {ENCRYPTION_RSA_KEY_ID} совпадает с идентификатором из MASTER_KEYS!")
+if ENCRYPTION_ALGORITHM.lower() == "rsa" and not (ENCRYPTION_RSA_PUBLIC_KEY_FILE or ENCRYPTION_RSA_PRIVATE_KEY_FILE):
+    raise ValueError("Для encryption.algorithm: rsa задайте encryption.rsa_public_key_file!")
+# Активный мастер-ключ для новых ключей данных (по умолчанию - ключ RSA в режиме rsa,
+# иначе мастер-ключ с наибольшим идентификатором)
+ENCRYPTION_ACTIVE_MASTER_KEY_ID: int = config["encryption"].get(
+    "active_master_key_id",
+    ENCRYPTION_RSA_KEY_ID if ENCRYPTION_ALGORITHM.lower() == "rsa" else max(ENCRYPTION_MASTER_KEYS)
+)
+if ENCRYPTION_ACTIVE_MASTER_KEY_ID not in ENCRYPTION_MASTER_KEYS and ENCRYPTION_ACTIVE_MASTER_KEY_ID != ENCRYPTION_RSA_KEY_ID:
+    raise ValueError(f"Мастер-ключ {ENCRYPTION_ACTIVE_MASTER_KEY_ID} не задан в MASTER_KEYS!")
+# Кэш расшифрованных ключей данных в памяти воркера
+ENCRYPTION_DATA_KEY_CACHE_SIZE: int = config["encryption"].get("data_key_cache_size", 10000)
+ENCRYPTION_DATA_KEY_CACHE_TTL_SECONDS: int = config["encryption"].get("data_key_cache_ttl_seconds", 300)
+# Пул процессов для тяжелых криптографических операций (расшифровка RSA)
+ENCRYPTION_EXECUTOR_WORKERS: int = config["encryption"].get("executor_workers", 2)
+ENCRYPTION_EXECUTOR_MAX_PENDING: int = config["encryption"].get("executor_max_pending", 64)
+ENCRYPTION_EXECUTOR_QUEUE_TIMEOUT_SECONDS: float = config["encryption"].get("executor_queue_timeout_seconds", 5)
+
+# Настройки секретов
+SECRETS_BATCH_MAX_SIZE: int = config.get("secrets", {}).get("batch_max_size", 500)
+SECRETS_LIST_PAGE_SIZE: int = config.get("secrets", {}).get("list_page_size", 100)
+SECRETS_LIST_MAX_PAGE_SIZE: int = config.get("secrets", {}).get("list_max_page_size", 1000)
+SECRETS_STREAM_BATCH_SIZE: int = config.get("secrets", {}).get("stream_batch_size", 500)
+SECRETS_MAX_DATA_SIZE: int = config.get("secrets", {}).get("max_data_size", 1024 * 1024)
+
+# Ротация ключей (перешифровка секретов)
+ROTATION_BATCH_SIZE: int = config.get("rotation", {}).get("batch_size", 500)
+ROTATION_WORKERS: int = config.get("rotation", {}).get("workers", 0)
+ROTATION_MAX_ROWS_PER_SECOND: float = config.get("rotation", {}).get("max_rows_per_second", 2000)
+ROTATION_STALE_AFTER_SECONDS: int = config.get("rotation", {}).get("stale_after_seconds", 300)
 
 # Логирование
 LOG_FILE_NAME: str = config["logging"].get("filename", "lockana.log")
@@ -42,18 +131,48 @@ LOG_FILE_NAME: str = config["logging"].get("filename", "lockana.log")
 # Конфигурация аутентификации
 BLOCK_TIME_SECONDS: int = config["auth"].get("block_duration_minutes", 5*60) * 60
 MAX_LOGIN_ATTEMPTS: int = config["auth"].get("max_login_attempts", 5)
+FAILED_LOGIN_WINDOW_SECONDS: int = config["auth"].get("failed_login_window_minutes", 15) * 60
 WHITELIST_IPS: list = config["auth"].get("whitelist_ips", [])
 
+# Ограничение частоты запросов
+RATE_LIMIT_ENABLED: bool = config.get("rate_limit", {}).get("enabled", True)
+RATE_LIMIT_GLOBAL: bool = config.get("rate_limit", {}).get("global", True)
+RATE_LIMIT_LOCAL_CACHE_SIZE: int = config.get("rate_limit", {}).get("local_cache_size", 100000)
+RATE_LIMIT_CLASSES: Dict[str, Any] = config.get("rate_limit", {}).get("classes") or {
+    "default": {"user": {"rate": 50, "burst": 100}, "ip": {"rate": 100, "burst": 200}},
+}
+
+# Кэш прав доступа
+PERMISSIONS_CACHE_TTL_SECONDS: int = config.get("permissions", {}).get("cache_ttl_seconds", 300)
+PERMISSIONS_CACHE_MAX_SIZE: int = config.get("permissions", {}).get("cache_max_size", 10000)
+PERMISSIONS_VERSION_CHECK_INTERVAL_SECONDS: float = config.get("permissions", {}).get("version_check_interval_seconds", 1)
+
+# Ключи API сервисных учетных записей: ключ HMAC для хэширования и кэш проверенных ключей
+API_KEY_HASH_KEY = os.getenv("API_KEY_HASH_KEY", "").encode() or None
+API_KEY_CACHE_TTL_SECONDS: int = config.get("api_keys", {}).get("cache_ttl_seconds", 300)
+API_KEY_CACHE_MAX_SIZE: int = config.get("api_keys", {}).get("cache_max_size", 10000)
+
 # Конфигурация TOTP
 TOTP_CODE_LEN: int = config["totp"].get("totp_code_len", 6)
 TOTP_SECRET_LEN: int = config["totp"].get("totp_secret_len", 32)
 TOTP_MINIMAL_SECRET_LEN: int = config["totp"].get("totp_minimal_secret_len", 16)
+# Допустимое расхождение часов (в шагах TOTP по 30 секунд в каждую сторону) и кэш кодов
+TOTP_VALID_WINDOW: int = config["totp"].get("valid_window", 1)
+TOTP_CODE_CACHE_SIZE: int = config["totp"].get("code_cache_size", 10000)
 
 # Конфигурация приложения 
 APP_PORT: int = config["app"].get("port", 8000)
 APP_HOST: str = config["app"].get("host", "0.0.0.0")
 APP_PREFIX: str = config["app"].get("prefix", "")
 
+# Настройки сервера
+SERVER_WORKERS: int = config.get("server", {}).get("workers", 1)
+SERVER_LOOP: str = config.get("server", {}).get("loop", "auto")
+SERVER_HTTP: str = config.get("server", {}).get("http", "auto")
+SERVER_TIMEOUT_KEEP_ALIVE: int = config.get("server", {}).get("timeout_keep_alive", 5)
+SERVER_BACKLOG: int = config.get("server", {}).get("backlog", 2048)
+SERVER_LIMIT_CONCURRENCY: int = config.get("server", {}).get("limit_concurrency", 0)
+
 # Настройки CORS
 CORS_ENABLED: bool = config["app"]["cros"].get("enabled", True)
 CORS_ORIGINS: list = config["app"]["cros"].get("allow_origins", ["*"])
@@ -1,57 +1,361 @@
-from .aes import aes_decrypt_data, aes_encrypt_data
-from .rsa import rsa_decrypt_data, rsa_encrypt_data
+from collections import defaultdict
+from typing import List, Optional, Sequence, Tuple, Union
+from .aes import aes_decrypt_data, aes_encrypt_data, aes_decrypt_many
+from .rsa import load_private_key, load_public_key, rsa_decrypt_data, rsa_encrypt_data
 from .chacha20 import chacha20_decrypt_data, chacha20_encrypt_data
+from .envelope import BytesLike, envelope_aad, is_envelope, pack_envelope, unpack_envelope
+from .registry import (
+    AES_GCM,
+    RSA_OAEP,
+    CipherEngine,
+    get_engine,
+    register_engine,
+    resolve_engine,
+    resolve_legacy_engine
+)
+from .keyring import DATA_KEY_ID, MasterKeyring, RSAKeyPair
+from .executor import CryptoExecutor
 
-from lockana.config import ENCRYPTION_ALGORITHM
+from lockana.config import (
+    ENCRYPTION_ALGORITHM,
+    ENCRYPTION_MASTER_KEYS,
+    ENCRYPTION_ACTIVE_MASTER_KEY_ID,
+    ENCRYPTION_DATA_KEY_CACHE_SIZE,
+    ENCRYPTION_DATA_KEY_CACHE_TTL_SECONDS,
+    ENCRYPTION_RSA_KEY_ID,
+    ENCRYPTION_RSA_PUBLIC_KEY_FILE,
+    ENCRYPTION_RSA_PRIVATE_KEY_FILE,
+    ENCRYPTION_RSA_PRIVATE_KEY_PASSWORD,
+    ENCRYPTION_EXECUTOR_WORKERS,
+    ENCRYPTION_EXECUTOR_MAX_PENDING,
+    ENCRYPTION_EXECUTOR_QUEUE_TIMEOUT_SECONDS
+)
 
-def encrypt_data(data: str, key: bytes) -> str:
+# Идентификатор ключа SECRET_KEY в конверте
+DEFAULT_KEY_ID = 0
+
+
+
+def _load_rsa_keys() -> dict:
+    """
+    Загружает пару ключей RSA из PEM-файлов конфигурации (один раз при импорте).
+    Если задан только закрытый ключ, открытый берется из него.
+    """
+    if not (ENCRYPTION_RSA_PUBLIC_KEY_FILE or ENCRYPTION_RSA_PRIVATE_KEY_FILE):
+        return {}
+    private_key = None
+    if ENCRYPTION_RSA_PRIVATE_KEY_FILE:
+        private_key = load_private_key(ENCRYPTION_RSA_PRIVATE_KEY_FILE, ENCRYPTION_RSA_PRIVATE_KEY_PASSWORD)
+    if ENCRYPTION_RSA_PUBLIC_KEY_FILE:
+        public_key = load_public_key(ENCRYPTION_RSA_PUBLIC_KEY_FILE)
+    else:
+        public_key = private_key.public_key()
+    return {ENCRYPTION_RSA_KEY_ID: RSAKeyPair(public_key, private_key)}
+
+
+KEYRING = MasterKeyring(
+    ENCRYPTION_MASTER_KEYS,
+    ENCRYPTION_ACTIVE_MASTER_KEY_ID,
+    cache_size=ENCRYPTION_DATA_KEY_CACHE_SIZE,
+    cache_ttl_seconds=ENCRYPTION_DATA_KEY_CACHE_TTL_SECONDS,
+    rsa_keys=_load_rsa_keys()
+)
+
+# Алгоритмы определяются один раз при импорте, а не на каждый вызов.
+# В режиме rsa RSA шифрует только ключи данных (см. KEYRING), данные шифруются AES-GCM:
+# RSA-OAEP ограничивает размер открытого текста и на порядки медленнее AEAD.
+_CONFIGURED_ENGINE: CipherEngine = resolve_engine(ENCRYPTION_ALGORITHM)
+DEFAULT_ENGINE: CipherEngine = AES_GCM if _CONFIGURED_ENGINE is RSA_OAEP else _CONFIGURED_ENGINE
+LEGACY_ENGINE: CipherEngine = resolve_legacy_engine(ENCRYPTION_ALGORITHM)
+
+CRYPTO_EXECUTOR = CryptoExecutor(
+    ENCRYPTION_EXECUTOR_WORKERS,
+    ENCRYPTION_EXECUTOR_MAX_PENDING,
+    ENCRYPTION_EXECUTOR_QUEUE_TIMEOUT_SECONDS
+)
+
+
+def encrypt_data(data: str, key: bytes, key_id: int = DEFAULT_KEY_ID) -> bytes:
     """
     Шифрует данные с использованием выбранного алгоритма шифрования.
 
-    Эта функция принимает открытые данные и шифрует их с использованием алгоритма шифрования, 
-    который указан в переменной `ENCRYPTION_ALGORITHM`. Поддерживаемые алгоритмы: AES, RSA, ChaCha20.
+    Алгоритм задается параметром `encryption.algorithm` и определяется один раз при импорте
+    (см. `lockana.crypto.registry`). Результат упаковывается в бинарный конверт
+    (см. `lockana.crypto.envelope`) вместе с идентификаторами алгоритма и ключа.
 
     Параметры:
         data (str): Открытые данные, которые нужно зашифровать.
         key (bytes): Ключ для шифрования данных.
+        key_id (int): Идентификатор ключа, записываемый в конверт.
 
     Возвращает:
-        str: Зашифрованные данные в строковом формате.
+        bytes: Бинарный конверт с зашифрованными данными.
+    """
+    aad = envelope_aad(DEFAULT_ENGINE.alg_id, key_id)
+    nonce, encrypted_data = DEFAULT_ENGINE.encrypt(key, data.encode(), aad)
+    return pack_envelope(DEFAULT_ENGINE.alg_id, key_id, nonce, encrypted_data)
 
-    Исключения:
-        ValueError: Если указанный алгоритм шифрования не поддерживается.
-    """
-    if ENCRYPTION_ALGORITHM.lower() == "aes":
-        return aes_encrypt_data(data, key)
-    elif ENCRYPTION_ALGORITHM.lower() == "rsa":
-        return rsa_encrypt_data(data, key)
-    elif ENCRYPTION_ALGORITHM.lower() == "cha20cha20":
-        return chacha20_encrypt_data(data, key)
-    else:
-        raise ValueError("Unsupported encryption algorithm")
-    
-def decrypt_data(encrypted_data: str, key: bytes) -> str:
+
+def _decrypt_legacy(encrypted_data: Union[BytesLike, str], key: bytes) -> str:
     """
-    Дешифрует данные с использованием выбранного алгоритма шифрования.
+    Дешифрует значение в устаревшем hex-формате 'iv:ciphertext' алгоритмом из конфигурации.
+    """
+    if isinstance(encrypted_data, (bytes, bytearray, memoryview)):
+        encrypted_data = bytes(encrypted_data).decode("ascii")
+    return LEGACY_ENGINE.decrypt_legacy(encrypted_data, key)
 
-    Эта функция принимает зашифрованные данные и расшифровывает их с использованием алгоритма шифрования, 
-    который указан в переменной `ENCRYPTION_ALGORITHM`. Поддерживаемые алгоритмы: AES, RSA, ChaCha20.
+
+def decrypt_data(encrypted_data: Union[BytesLike, str], key: bytes) -> str:
+    """
+    Дешифрует данные.
+
+    Для бинарного конверта алгоритм берется из самого конверта, поэтому значения,
+    зашифрованные разными алгоритмами, расшифровываются корректно. Значения в устаревшем
+    hex-формате 'iv:ciphertext' расшифровываются алгоритмом, которым они записывались
+    при текущем значении `encryption.algorithm`.
 
     Параметры:
-        encrypted_data (str): Зашифрованные данные.
+        encrypted_data (bytes | str): Бинарный конверт или устаревшая hex-строка.
         key (bytes): Ключ для расшифровки данных.
 
     Возвращает:
         str: Расшифрованные данные в строковом формате.
 
     Исключения:
-        ValueError: Если указанный алгоритм шифрования не поддерживается.
-    """
-    if ENCRYPTION_ALGORITHM.lower() == "aes":
-        return aes_decrypt_data(encrypted_data, key)
-    elif ENCRYPTION_ALGORITHM.lower() == "rsa":
-        return rsa_decrypt_data(encrypted_data, key)
-    elif ENCRYPTION_ALGORITHM.lower() == "cha20cha20":
-        return chacha20_decrypt_data(encrypted_data, key)
-    else:
-        raise ValueError("Unsupported encryption algorithm")
\ No newline at end of file
+        ValueError: Если алгоритм шифрования не поддерживается.
+        cryptography.exceptions.InvalidTag: Если данные AEAD были изменены.
+    """
+    if not is_envelope(encrypted_data):
+        return _decrypt_legacy(encrypted_data, key)
+
+    envelope = unpack_envelope(encrypted_data)
+    engine = get_engine(envelope.alg_id)
+    aad = envelope_aad(envelope.alg_id, envelope.key_id)
+    return engine.decrypt(key, envelope.nonce, envelope.ciphertext, aad).decode()
+
+
+def decrypt_many(encrypted_values: List[Union[BytesLike, str]], key: bytes) -> List[str]:
+    """
+    Дешифрует набор значений одним ключом.
+
+    Значения группируются по алгоритму из конверта, и каждая группа расшифровывается
+    одним вызовом `CipherEngine.decrypt_many` с общим подготовленным объектом шифра.
+
+    Параметры:
+        encrypted_values (List[bytes | str]): Бинарные конверты или устаревшие hex-строки.
+        key (bytes): Ключ для расшифровки данных.
+
+    Возвращает:
+        List[str]: Расшифрованные данные в том же порядке.
+
+    Исключения:
+        ValueError: Если алгоритм шифрования не поддерживается.
+    """
+    result: List[str] = [""] * len(encrypted_values)
+    groups = defaultdict(list)
+    for position, encrypted_value in enumerate(encrypted_values):
+        if not is_envelope(encrypted_value):
+            result[position] = _decrypt_legacy(encrypted_value, key)
+            continue
+        envelope = unpack_envelope(encrypted_value)
+        aad = envelope_aad(envelope.alg_id, envelope.key_id)
+        groups[envelope.alg_id].append((position, (envelope.nonce, envelope.ciphertext, aad)))
+
+    for alg_id, items in groups.items():
+        decrypted = get_engine(alg_id).decrypt_many(key, [item for _, item in items])
+        for (position, _), data in zip(items, decrypted):
+            result[position] = data.decode()
+    return result
+
+
+def encrypt_secret(data: str) -> Tuple[bytes, bytes]:
+    """
+    Шифрует секрет новым ключом данных (envelope encryption).
+
+    Параметры:
+        data (str): Открытые данные секрета.
+
+    Возвращает:
+        Tuple[bytes, bytes]: Конверт с данными и конверт ключа данных, зашифрованного активным мастер-ключом.
+    """
+    data_key, wrapped_data_key = KEYRING.generate_data_key()
+    return encrypt_data(data, data_key, DATA_KEY_ID), wrapped_data_key
+
+
+def decrypt_secret(encrypted_data: Union[BytesLike, str], wrapped_data_key: Optional[BytesLike]) -> str:
+    """
+    Дешифрует секрет.
+
+    Если у секрета нет ключа данных (запись создана до появления envelope encryption),
+    данные расшифровываются мастер-ключом из конверта (SECRET_KEY для старых записей).
+
+    Параметры:
+        encrypted_data (bytes | str): Конверт с данными или устаревшая hex-строка.
+        wrapped_data_key (Optional[bytes]): Конверт ключа данных.
+
+    Возвращает:
+        str: Расшифрованные данные.
+    """
+    if wrapped_data_key is not None:
+        return decrypt_data(encrypted_data, KEYRING.unwrap_data_key(wrapped_data_key))
+    key_id = unpack_envelope(encrypted_data).key_id if is_envelope(encrypted_data) else DEFAULT_KEY_ID
+    return decrypt_data(encrypted_data, KEYRING.master_key(key_id))
+
+
+def requires_offload(encrypted_data: Union[BytesLike, str]) -> bool:
+    """
+    Проверяет, нагружает ли расшифровка значения CPU (например, RSA) и нужно ли
+    выполнять ее в пуле процессов `CRYPTO_EXECUTOR`.
+    """
+    if not is_envelope(encrypted_data):
+        return LEGACY_ENGINE.cpu_bound
+    return get_engine(unpack_envelope(encrypted_data).alg_id).cpu_bound
+
+
+def unwrap_data_keys(wrapped_data_keys: Sequence[BytesLike]) -> List[bytes]:
+    """
+    Расшифровывает ключи данных. Выполняется в процессе пула `CRYPTO_EXECUTOR`.
+    """
+    return [KEYRING.unwrap_data_key(wrapped) for wrapped in wrapped_data_keys]
+
+
+def _pending_data_keys(wrapped_data_keys: Sequence[Optional[BytesLike]]) -> List[bytes]:
+    """
+    Ключи данных, для расшифровки которых нужен закрытый ключ RSA (без повторов и закэшированных).
+    """
+    pending = (bytes(wrapped) for wrapped in wrapped_data_keys if wrapped is not None)
+    return [wrapped for wrapped in dict.fromkeys(pending) if KEYRING.unwrap_requires_offload(wrapped)]
+
+
+def _unwrap_data_keys_offloaded(wrapped_data_keys: Sequence[Optional[BytesLike]]) -> None:
+    pending = _pending_data_keys(wrapped_data_keys)
+    if pending:
+        for wrapped, data_key in zip(pending, CRYPTO_EXECUTOR.map("rsa_unwrap", unwrap_data_keys, pending)):
+            KEYRING.cache_data_key(wrapped, data_key)
+
+
+async def _unwrap_data_keys_async(wrapped_data_keys: Sequence[Optional[BytesLike]]) -> None:
+    pending = _pending_data_keys(wrapped_data_keys)
+    if pending:
+        for wrapped, data_key in zip(pending, await CRYPTO_EXECUTOR.run_map("rsa_unwrap", unwrap_data_keys, pending)):
+            KEYRING.cache_data_key(wrapped, data_key)
+
+
+def decrypt_secret_offloaded(encrypted_data: Union[BytesLike, str], wrapped_data_key: Optional[BytesLike]) -> str:
+    """
+    Дешифрует секрет, выполняя операции, нагружающие CPU (расшифровку ключа данных или данных
+    закрытым ключом RSA), в пуле процессов `CRYPTO_EXECUTOR`, остальное - в текущем потоке.
+    Расшифрованный в пуле ключ данных сохраняется в кэше `KEYRING` текущего процесса.
+    Используется в синхронном коде вне цикла событий.
+    """
+    if requires_offload(encrypted_data):
+        return CRYPTO_EXECUTOR.call("decrypt_secret", decrypt_secret, encrypted_data, wrapped_data_key)
+    _unwrap_data_keys_offloaded([wrapped_data_key])
+    return CRYPTO_EXECUTOR.call("decrypt_secret", decrypt_secret, encrypted_data, wrapped_data_key, offload=False)
+
+
+async def decrypt_secret_async(encrypted_data: Union[BytesLike, str], wrapped_data_key: Optional[BytesLike]) -> str:
+    """
+    Асинхронный вариант `decrypt_secret_offloaded`, не блокирующий цикл событий.
+    """
+    if requires_offload(encrypted_data):
+        return await CRYPTO_EXECUTOR.run("decrypt_secret", decrypt_secret, encrypted_data, wrapped_data_key)
+    await _unwrap_data_keys_async([wrapped_data_key])
+    return CRYPTO_EXECUTOR.call("decrypt_secret", decrypt_secret, encrypted_data, wrapped_data_key, offload=False)
+
+
+def _split_offloaded(items: Sequence[Tuple[Union[BytesLike, str], Optional[BytesLike]]]) -> Tuple[List[int], List[int]]:
+    heavy = [position for position, (encrypted_data, _) in enumerate(items) if requires_offload(encrypted_data)]
+    heavy_set = set(heavy)
+    return [position for position in range(len(items)) if position not in heavy_set], heavy
+
+
+def decrypt_secrets_offloaded(items: Sequence[Tuple[Union[BytesLike, str], Optional[BytesLike]]]) -> List[str]:
+    """
+    Дешифрует набор секретов. Ключи данных, зашифрованные RSA, и данные, расшифровка которых
+    нагружает CPU, обрабатываются частями параллельно в пуле процессов `CRYPTO_EXECUTOR`,
+    остальное - в текущем потоке.
+    """
+    result: List[str] = [""] * len(items)
+    inline, heavy = _split_offloaded(items)
+    _unwrap_data_keys_offloaded([items[p][1] for p in inline])
+    decrypted_inline = CRYPTO_EXECUTOR.call("decrypt_secrets", decrypt_secrets, [items[p] for p in inline], offload=False)
+    decrypted_heavy = CRYPTO_EXECUTOR.map("decrypt_secrets", decrypt_secrets, [items[p] for p in heavy]) if heavy else []
+    for positions, decrypted in ((inline, decrypted_inline), (heavy, decrypted_heavy)):
+        for position, data in zip(positions, decrypted):
+            result[position] = data
+    return result
+
+
+async def decrypt_secrets_async(items: Sequence[Tuple[Union[BytesLike, str], Optional[BytesLike]]]) -> List[str]:
+    """
+    Асинхронный вариант `decrypt_secrets_offloaded`, не блокирующий цикл событий.
+    """
+    result: List[str] = [""] * len(items)
+    inline, heavy = _split_offloaded(items)
+    await _unwrap_data_keys_async([items[p][1] for p in inline])
+    decrypted_inline = CRYPTO_EXECUTOR.call("decrypt_secrets", decrypt_secrets, [items[p] for p in inline], offload=False)
+    decrypted_heavy = await CRYPTO_EXECUTOR.run_map("decrypt_secrets", decrypt_secrets, [items[p] for p in heavy]) if heavy else []
+    for positions, decrypted in ((inline, decrypted_inline), (heavy, decrypted_heavy)):
+        for position, data in zip(positions, decrypted):
+            result[position] = data
+    return result
+
+
+def decrypt_secrets(items: Sequence[Tuple[Union[BytesLike, str], Optional[BytesLike]]]) -> List[str]:
+    """
+    Дешифрует набор секретов в текущем потоке.
+
+    Записи без ключа данных (зашифрованные SECRET_KEY) расшифровываются одним вызовом
+    `decrypt_many`, остальные - собственными ключами данных из кэша `KEYRING`.
+
+    Параметры:
+        items (Sequence[Tuple[bytes | str, Optional[bytes]]]): Пары (данные, конверт ключа данных).
+
+    Возвращает:
+        List[str]: Расшифрованные данные в том же порядке.
+    """
+    result: List[str] = [""] * len(items)
+    legacy_positions = [position for position, (_, wrapped) in enumerate(items) if wrapped is None]
+    legacy_values = [items[position][0] for position in legacy_positions]
+    for position, data in zip(legacy_positions, decrypt_many(legacy_values, KEYRING.master_key(DEFAULT_KEY_ID))):
+        result[position] = data
+    for position, (encrypted_data, wrapped) in enumerate(items):
+        if wrapped is not None:
+            result[position] = decrypt_secret(encrypted_data, wrapped)
+    return result
+
+
+def rotate_secret(
+    encrypted_data: Union[BytesLike, str],
+    wrapped_data_key: Optional[BytesLike],
+    reencrypt: bool = False
+) -> Tuple[str, Optional[bytes], Optional[bytes]]:
+    """
+    Приводит зашифрованный секрет к текущим ключам и алгоритму.
+
+    - "rewrap": данные уже зашифрованы текущим алгоритмом собственным ключом данных,
+      но ключ данных зашифрован неактивным мастер-ключом - перешифровывается только ключ данных;
+    - "reencrypt": у секрета нет ключа данных, данные зашифрованы другим алгоритмом
+      или запрошена полная перешифровка - секрет шифруется новым ключом данных;
+    - "skip": секрет уже соответствует текущим ключам.
+
+    Параметры:
+        encrypted_data (bytes | str): Конверт с данными или устаревшая hex-строка.
+        wrapped_data_key (Optional[bytes]): Конверт ключа данных.
+        reencrypt (bool): Перешифровать данные новым ключом данных в любом случае.
+
+    Возвращает:
+        Tuple[str, Optional[bytes], Optional[bytes]]: Действие, новый конверт данных и новый конверт ключа данных
+            (для "rewrap" конверт данных не меняется и возвращается None).
+    """
+    current_algorithm = (
+        is_envelope(encrypted_data) and unpack_envelope(encrypted_data).alg_id == DEFAULT_ENGINE.alg_id
+    )
+    if not reencrypt and wrapped_data_key is not None and current_algorithm:
+        if KEYRING.key_id_of(wrapped_data_key) == KEYRING.active_key_id:
+            return "skip", None, None
+        return "rewrap", None, KEYRING.rewrap_data_key(wrapped_data_key)
+
+    ciphertext, data_key = encrypt_secret(decrypt_secret(encrypted_data, wrapped_data_key))
+    return "reencrypt", ciphertext, data_key
@@ -2,6 +2,48 @@ from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding
 import os
+from typing import List, Tuple
+
+def aes_encrypt_bytes(data: bytes, key: bytes) -> Tuple[bytes, bytes]:
+    """
+    Шифрует байты с использованием AES в режиме CBC с PKCS7 padding.
+
+    Параметры:
+        data (bytes): Открытые данные.
+        key (bytes): Ключ шифрования.
+
+    Возвращает:
+        Tuple[bytes, bytes]: Случайный IV и шифротекст.
+    """
+    iv = os.urandom(16)
+
+    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+    encryptor = cipher.encryptor()
+
+    padder = padding.PKCS7(128).padder()
+    padded_data = padder.update(data) + padder.finalize()
+
+    return iv, encryptor.update(padded_data) + encryptor.finalize()
+
+def aes_decrypt_bytes(iv: bytes, encrypted_data: bytes, key: bytes) -> bytes:
+    """
+    Дешифрует байты, зашифрованные `aes_encrypt_bytes`.
+
+    Параметры:
+        iv (bytes): Вектор инициализации.
+        encrypted_data (bytes): Шифротекст.
+        key (bytes): Ключ шифрования.
+
+    Возвращает:
+        bytes: Расшифрованные данные.
+    """
+    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+    decryptor = cipher.decryptor()
+
+    decrypted_data = decryptor.update(encrypted_data) + decryptor.finalize()
+
+    unpadder = padding.PKCS7(128).unpadder()
+    return unpadder.update(decrypted_data) + unpadder.finalize()
 
 def aes_encrypt_data(data: str, key: bytes) -> str:
     """
@@ -20,16 +62,7 @@ def aes_encrypt_data(data: str, key: bytes) -> str:
     Исключения:
         ValueError: Если входные данные не могут быть правильно дополнены перед шифрованием.
     """
-    iv = os.urandom(16)
-
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-    encryptor = cipher.encryptor()
-
-    padder = padding.PKCS7(128).padder()
-    padded_data = padder.update(data.encode()) + padder.finalize()
-
-    encrypted_data = encryptor.update(padded_data) + encryptor.finalize()
-
+    iv, encrypted_data = aes_encrypt_bytes(data.encode(), key)
     return f"{iv.hex()}:{encrypted_data.hex()}"
 
 def aes_decrypt_data(encrypted_data: str, key: bytes) -> str:
@@ -52,15 +85,29 @@ def aes_decrypt_data(encrypted_data: str, key: bytes) -> str:
         Exception: Если произошла ошибка при расшифровке данных.
     """
     iv_hex, encrypted_data_hex = encrypted_data.split(":")
-    iv = bytes.fromhex(iv_hex)
-    encrypted_data = bytes.fromhex(encrypted_data_hex)
+    return aes_decrypt_bytes(bytes.fromhex(iv_hex), bytes.fromhex(encrypted_data_hex), key).decode()
 
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-    decryptor = cipher.decryptor()
+def aes_decrypt_many(encrypted_values: List[Tuple[bytes, bytes]], key: bytes) -> List[bytes]:
+    """
+    Дешифрует набор значений, зашифрованных AES-CBC одним ключом.
 
-    decrypted_data = decryptor.update(encrypted_data) + decryptor.finalize()
+    Объект алгоритма (проверка ключа) и параметры PKCS7 создаются один раз
+    для всего набора, а не для каждого значения.
 
-    unpadder = padding.PKCS7(128).unpadder()
-    data = unpadder.update(decrypted_data) + unpadder.finalize()
+    Параметры:
+        encrypted_values (List[Tuple[bytes, bytes]]): Пары (IV, шифротекст).
+        key (bytes): Ключ шифрования.
 
-    return data.decode()
\ No newline at end of file
+    Возвращает:
+        List[bytes]: Расшифрованные данные в том же порядке.
+    """
+    algorithm = algorithms.AES(key)
+    pkcs7 = padding.PKCS7(128)
+    backend = default_backend()
+    result = []
+    for iv, encrypted_data in encrypted_values:
+        decryptor = Cipher(algorithm, modes.CBC(iv), backend=backend).decryptor()
+        decrypted_data = decryptor.update(encrypted_data) + decryptor.finalize()
+        unpadder = pkcs7.unpadder()
+        result.append(unpadder.update(decrypted_data) + unpadder.finalize())
+    return result
@@ -1,6 +1,31 @@
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
 from cryptography.hazmat.backends import default_backend
 import os
+from typing import Tuple
+
+
+def chacha20_encrypt_bytes(data: bytes, key: bytes) -> Tuple[bytes, bytes]:
+    """
+    Шифрует байты потоковым шифром ChaCha20.
+
+    Параметры:
+        data (bytes): Открытые данные.
+        key (bytes): Ключ шифрования (32 байта).
+
+    Возвращает:
+        Tuple[bytes, bytes]: Случайный nonce (16 байт) и шифротекст.
+    """
+    nonce = os.urandom(16)
+    cipher = Cipher(algorithms.ChaCha20(key, nonce), mode=None, backend=default_backend())
+    return nonce, cipher.encryptor().update(data)
+
+
+def chacha20_decrypt_bytes(nonce: bytes, encrypted_data: bytes, key: bytes) -> bytes:
+    """
+    Дешифрует байты, зашифрованные `chacha20_encrypt_bytes`.
+    """
+    cipher = Cipher(algorithms.ChaCha20(key, nonce), mode=None, backend=default_backend())
+    return cipher.decryptor().update(encrypted_data)
 
 
 def chacha20_encrypt_data(data: str, key: bytes) -> str:
@@ -21,10 +46,7 @@ def chacha20_encrypt_data(data: str, key: bytes) -> str:
     Исключения:
         Exception: Если возникла ошибка при шифровании данных.
     """
-    nonce = os.urandom(16)
-    cipher = Cipher(algorithms.ChaCha20(key, nonce), mode=None, backend=default_backend())
-    encryptor = cipher.encryptor()
-    encrypted_data = encryptor.update(data.encode())
+    nonce, encrypted_data = chacha20_encrypt_bytes(data.encode(), key)
     return f"{nonce.hex()}:{encrypted_data.hex()}"
 
 
@@ -47,12 +69,7 @@ def chacha20_decrypt_data(encrypted_data: str, key: bytes) -> str:
         Exception: Если возникла ошибка при расшифровке данных.
     """
     nonce_hex, encrypted_data_hex = encrypted_data.split(":")
-    nonce = bytes.fromhex(nonce_hex)
-    encrypted_data = bytes.fromhex(encrypted_data_hex)
-    cipher = Cipher(algorithms.ChaCha20(key, nonce), mode=None, backend=default_backend())
-    decryptor = cipher.decryptor()
-    decrypted_data = decryptor.update(encrypted_data)
-    return decrypted_data.decode()
+    return chacha20_decrypt_bytes(bytes.fromhex(nonce_hex), bytes.fromhex(encrypted_data_hex), key).decode()
 
 
 
@@ -0,0 +1,95 @@
+import struct
+from typing import NamedTuple, Union
+
+
+# Формат конверта:
+#   version (1 байт) | alg_id (1 байт) | key_id (2 байта, big-endian) | nonce_len (1 байт)
+#   | nonce | ciphertext (для AEAD - вместе с тегом аутентификации)
+ENVELOPE_VERSION = 1
+_HEADER = struct.Struct(">BBHB")
+_AAD = struct.Struct(">BBH")
+
+# Идентификаторы алгоритмов, записываемые в конверт
+ALG_AES_CBC = 1
+ALG_CHACHA20 = 2
+ALG_RSA_OAEP = 3
+ALG_AES_GCM = 4
+ALG_CHACHA20_POLY1305 = 5
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class Envelope(NamedTuple):
+    """
+    Разобранный бинарный конверт шифротекста.
+
+    Атрибуты:
+        alg_id (int): Идентификатор алгоритма шифрования.
+        key_id (int): Идентификатор (версия) ключа, которым зашифрованы данные.
+        nonce (bytes): Nonce или IV.
+        ciphertext (bytes): Шифротекст (для AEAD - вместе с тегом).
+    """
+    alg_id: int
+    key_id: int
+    nonce: bytes
+    ciphertext: bytes
+
+
+def pack_envelope(alg_id: int, key_id: int, nonce: bytes, ciphertext: bytes) -> bytes:
+    """
+    Упаковывает шифротекст и его параметры в компактный бинарный конверт.
+
+    Параметры:
+        alg_id (int): Идентификатор алгоритма (0-255).
+        key_id (int): Идентификатор ключа (0-65535).
+        nonce (bytes): Nonce или IV (до 255 байт).
+        ciphertext (bytes): Шифротекст.
+
+    Возвращает:
+        bytes: Конверт для хранения в колонке `LargeBinary`.
+    """
+    return _HEADER.pack(ENVELOPE_VERSION, alg_id, key_id, len(nonce)) + nonce + ciphertext
+
+
+def envelope_aad(alg_id: int, key_id: int) -> bytes:
+    """
+    Возвращает связанные данные (AAD) для AEAD: версия, алгоритм и ключ конверта.
+
+    Подмена идентификатора алгоритма или ключа в сохраненном конверте приводит
+    к ошибке проверки тега при расшифровке.
+    """
+    return _AAD.pack(ENVELOPE_VERSION, alg_id, key_id)
+
+
+def unpack_envelope(blob: BytesLike) -> Envelope:
+    """
+    Разбирает бинарный конверт.
+
+    Параметры:
+        blob (bytes): Конверт, созданный `pack_envelope`.
+
+    Возвращает:
+        Envelope: Параметры и шифротекст.
+
+    Исключения:
+        ValueError: Если данные не являются конвертом поддерживаемой версии.
+    """
+    blob = bytes(blob)
+    if len(blob) < _HEADER.size:
+        raise ValueError("Envelope is too short")
+    version, alg_id, key_id, nonce_len = _HEADER.unpack_from(blob)
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported envelope version: {version}")
+    body = blob[_HEADER.size:]
+    if len(body) < nonce_len:
+        raise ValueError("Envelope is truncated")
+    return Envelope(alg_id, key_id, body[:nonce_len], body[nonce_len:])
+
+
+def is_envelope(value: object) -> bool:
+    """
+    Проверяет, что значение - бинарный конверт, а не устаревшая hex-строка 'iv:ciphertext'.
+
+    Первый байт конверта (версия) не может быть символом hex-строки.
+    """
+    return isinstance(value, (bytes, bytearray, memoryview)) and len(value) > 0 and value[0] == ENVELOPE_VERSION
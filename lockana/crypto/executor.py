@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Sequence
+from lockana.exceptions import ServiceUnavailableError
+from lockana.metrics import (
+    CRYPTO_OPERATION_SECONDS,
+    CRYPTO_QUEUE_WAIT_SECONDS,
+    CRYPTO_PENDING,
+    CRYPTO_REJECTED
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CryptoExecutor:
+    """
+    Исполнитель криптографических операций.
+
+    Дешевые операции (AEAD, шифрование открытым ключом) выполняются в вызывающем потоке:
+    передача данных в другой процесс стоит дороже самой операции. Операции, нагружающие CPU
+    (расшифровка закрытым ключом RSA), выполняются в пуле процессов,
+    чтобы не занимать GIL и цикл событий воркера.
+
+    Пул создается при первой тяжелой операции в контексте spawn (в воркере уже есть потоки).
+    Количество операций в пуле и в очереди к нему ограничено `max_pending`: если место
+    не освободилось за `queue_timeout_seconds`, операция отклоняется с `ServiceUnavailableError`,
+    а не накапливается в памяти.
+
+    Атрибуты:
+        workers (int): Количество процессов пула (0 - все операции выполняются в вызывающем потоке).
+        max_pending (int): Максимум операций, отправленных в пул и ожидающих результата.
+        queue_timeout_seconds (float): Время ожидания места в очереди.
+    """
+    def __init__(self, workers: int, max_pending: int, queue_timeout_seconds: float):
+        self.workers = max(int(workers), 0)
+        self.max_pending = max(int(max_pending), 1)
+        self.queue_timeout_seconds = float(queue_timeout_seconds)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def call(self, operation: str, fn: Callable[..., Any], *args, offload: bool = True) -> Any:
+        """
+        Выполняет операцию синхронно.
+
+        Параметры:
+            operation (str): Имя операции для метрик.
+            fn (Callable): Функция уровня модуля (передается в процесс пула по имени).
+            offload (bool): Выполнить в пуле процессов.
+
+        Возвращает:
+            Any: Результат функции.
+
+        Исключения:
+            ServiceUnavailableError: Если очередь пула заполнена.
+        """
+        if not offload or not self.workers:
+            return self._call_inline(operation, fn, *args)
+        self._acquire(operation, self._slots.acquire(timeout=self.queue_timeout_seconds), 0.0)
+        return self._submit(operation, fn, *args).result()
+
+    async def run(self, operation: str, fn: Callable[..., Any], *args, offload: bool = True) -> Any:
+        """
+        Выполняет операцию, не блокируя цикл событий при `offload=True`.
+
+        Параметры и исключения - как у `call`.
+        """
+        if not offload or not self.workers:
+            return self._call_inline(operation, fn, *args)
+        started = time.monotonic()
+        acquired = await self._wait_for_slot()
+        submitted = False
+        try:
+            self._acquire(operation, acquired, time.monotonic() - started)
+            # С этого момента слот освобождает обработчик завершения операции
+            submitted = True
+            future = self._submit(operation, fn, *args)
+        finally:
+            if acquired and not submitted:
+                self._slots.release()
+        # Отмена ожидающего запроса отменяет и операцию в пуле, слот освобождается при ее завершении
+        return await asyncio.wrap_future(future)
+
+    def map(self, operation: str, fn: Callable[..., List[Any]], items: Sequence[Any], offload: bool = True) -> List[Any]:
+        """
+        Обрабатывает набор значений, разделив его на части по числу процессов пула.
+
+        Параметры:
+            fn (Callable): Функция, принимающая список значений и возвращающая список результатов.
+            items (Sequence): Значения.
+
+        Возвращает:
+            List[Any]: Результаты в том же порядке.
+        """
+        if not offload or not self.workers or len(items) < 2:
+            return self.call(operation, fn, list(items), offload=offload)
+        futures = []
+        for chunk in self._chunks(items):
+            self._acquire(operation, self._slots.acquire(timeout=self.queue_timeout_seconds), 0.0)
+            futures.append(self._submit(operation, fn, chunk))
+        return [result for future in futures for result in future.result()]
+
+    async def run_map(self, operation: str, fn: Callable[..., List[Any]], items: Sequence[Any], offload: bool = True) -> List[Any]:
+        """
+        Асинхронный вариант `map`: части обрабатываются в пуле параллельно.
+        """
+        if not offload or not self.workers or len(items) < 2:
+            return await self.run(operation, fn, list(items), offload=offload)
+        results = await asyncio.gather(*(self.run(operation, fn, chunk) for chunk in self._chunks(items)))
+        return [result for chunk in results for result in chunk]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _chunks(self, items: Sequence[Any]) -> List[list]:
+        chunk_size = -(-len(items) // self.workers)
+        return [list(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+
+    async def _wait_for_slot(self) -> bool:
+        """
+        Ожидает место в очереди, не блокируя цикл событий и не занимая поток.
+
+        Слот занимается только неблокирующей попыткой, а между попытками запрос спит
+        в цикле событий: отмененный во время ожидания запрос не держит ни слот, ни поток
+        пула по умолчанию (тот же пул, что использует `run_db`). Семафор общий с синхронными
+        вызовами `call` и `map`, поэтому ограничение `max_pending` действует на все операции.
+        """
+        deadline = time.monotonic() + self.queue_timeout_seconds
+        delay = 0.001
+        while not self._slots.acquire(blocking=False):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+        return True
+
+    def _acquire(self, operation: str, acquired: bool, waited: float) -> None:
+        if not acquired:
+            CRYPTO_REJECTED.labels(operation).inc()
+            logger.warning(f"Очередь криптографических операций заполнена, операция {operation} отклонена")
+            raise ServiceUnavailableError(
+                detail="Crypto executor is overloaded, retry later",
+                retry_after=max(int(self.queue_timeout_seconds), 1)
+            )
+        CRYPTO_QUEUE_WAIT_SECONDS.labels(operation).observe(waited)
+
+    def _submit(self, operation: str, fn: Callable[..., Any], *args) -> Future:
+        started = time.monotonic()
+        CRYPTO_PENDING.inc()
+        try:
+            pool = self._get_pool()
+            future = pool.submit(fn, *args)
+        except BaseException:
+            CRYPTO_PENDING.dec()
+            self._slots.release()
+            raise
+
+        def done(_: Future) -> None:
+            CRYPTO_PENDING.dec()
+            self._slots.release()
+            CRYPTO_OPERATION_SECONDS.labels(operation, "process").observe(time.monotonic() - started)
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._discard_pool(pool)
+
+        future.add_done_callback(done)
+        return future
+
+    def _call_inline(self, operation: str, fn: Callable[..., Any], *args) -> Any:
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            CRYPTO_OPERATION_SECONDS.labels(operation, "inline").observe(time.monotonic() - started)
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        # Процесс пула завершился аварийно: следующая операция создаст новый пул
+        with self._lock:
+            if self._pool is pool:
+                logger.error("Пул процессов криптографических операций поврежден и будет пересоздан")
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"Запущен пул процессов для криптографических операций ({self.workers})")
+            return self._pool
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import os
+from typing import Dict, NamedTuple, Optional, Tuple
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
+from lockana.cache import TTLCache
+from lockana.exceptions import CryptoError
+from .envelope import ALG_RSA_OAEP, BytesLike, envelope_aad, pack_envelope, unpack_envelope
+from .registry import AES_GCM, retain_key
+from .rsa import rsa_unwrap_key, rsa_wrap_key
+
+logger = logging.getLogger(__name__)
+
+DATA_KEY_SIZE = 32
+# Идентификатор ключа в конверте данных, зашифрованных собственным ключом данных секрета
+DATA_KEY_ID = 0xFFFF
+
+
+class RSAKeyPair(NamedTuple):
+    """
+    Пара ключей RSA для гибридного шифрования ключей данных.
+
+    Атрибуты:
+        public_key (RSAPublicKey): Открытый ключ - для шифрования ключей данных.
+        private_key (Optional[RSAPrivateKey]): Закрытый ключ - для расшифровки. На узлах,
+            которые только записывают секреты, не задается.
+    """
+    public_key: RSAPublicKey
+    private_key: Optional[RSAPrivateKey] = None
+
+
+class MasterKeyring:
+    """
+    Набор версионированных мастер-ключей (KEK) для шифрования ключей данных (DEK).
+
+    Каждый секрет шифруется собственным случайным ключом данных. Ключ данных хранится
+    рядом с секретом в виде конверта AES-GCM, зашифрованного активным мастер-ключом;
+    идентификатор мастер-ключа записывается в конверт. Ротация мастер-ключа - это
+    перешифровка небольших конвертов ключей данных, без перешифровки самих секретов.
+
+    Мастер-ключом может быть и пара ключей RSA (`rsa_keys`): ключ данных шифруется открытым
+    ключом RSA-OAEP, а данные - ключом данных алгоритмом AEAD. Для записи нужен только
+    открытый ключ, для чтения - закрытый.
+
+    Расшифрованные ключи данных кэшируются в памяти воркера (`TTLCache`), поэтому
+    частое чтение одного секрета не расшифровывает его ключ повторно.
+
+    Атрибуты:
+        active_key_id (int): Идентификатор мастер-ключа для новых ключей данных.
+    """
+    def __init__(
+        self,
+        keys: Dict[int, bytes],
+        active_key_id: int,
+        cache_size: int,
+        cache_ttl_seconds: float,
+        rsa_keys: Optional[Dict[int, RSAKeyPair]] = None
+    ):
+        self._keys = dict(keys)
+        self._rsa_keys = dict(rsa_keys or {})
+        if set(self._keys) & set(self._rsa_keys):
+            raise ValueError(f"RSA key ids {sorted(set(self._keys) & set(self._rsa_keys))} clash with master keys")
+        if active_key_id not in self._keys and active_key_id not in self._rsa_keys:
+            raise ValueError(f"Master key {active_key_id} is not configured")
+        self.active_key_id = active_key_id
+        self._data_keys = TTLCache(cache_size, cache_ttl_seconds)
+        # Мастер-ключи живут все время работы процесса: их объекты AEAD готовятся один раз
+        for key in self._keys.values():
+            retain_key(key)
+
+    def master_key(self, key_id: int) -> bytes:
+        """
+        Исключения:
+            ValueError: Если мастер-ключ с таким идентификатором не задан.
+        """
+        try:
+            return self._keys[key_id]
+        except KeyError:
+            raise ValueError(f"Master key {key_id} is not configured")
+
+    def wrap_data_key(self, data_key: bytes) -> bytes:
+        """
+        Шифрует ключ данных активным мастер-ключом.
+
+        Параметры:
+            data_key (bytes): Ключ данных.
+
+        Возвращает:
+            bytes: Конверт с зашифрованным ключом данных.
+        """
+        if self.active_key_id in self._rsa_keys:
+            wrapped = rsa_wrap_key(data_key, self._rsa_keys[self.active_key_id].public_key)
+            return pack_envelope(ALG_RSA_OAEP, self.active_key_id, b"", wrapped)
+        aad = envelope_aad(AES_GCM.alg_id, self.active_key_id)
+        nonce, wrapped = AES_GCM.encrypt(self.master_key(self.active_key_id), data_key, aad)
+        return pack_envelope(AES_GCM.alg_id, self.active_key_id, nonce, wrapped)
+
+    def generate_data_key(self) -> Tuple[bytes, bytes]:
+        """
+        Создает новый случайный ключ данных.
+
+        Возвращает:
+            Tuple[bytes, bytes]: Ключ данных и его конверт для хранения.
+        """
+        data_key = os.urandom(DATA_KEY_SIZE)
+        wrapped = self.wrap_data_key(data_key)
+        self._data_keys.set(self._cache_key(wrapped), data_key)
+        return data_key, wrapped
+
+    def unwrap_data_key(self, wrapped: BytesLike) -> bytes:
+        """
+        Расшифровывает ключ данных, используя кэш.
+
+        Параметры:
+            wrapped (bytes): Конверт ключа данных.
+
+        Возвращает:
+            bytes: Ключ данных.
+
+        Исключения:
+            ValueError: Если мастер-ключ из конверта не задан.
+            CryptoError: Если ключ данных зашифрован RSA, а закрытый ключ RSA не задан.
+            cryptography.exceptions.InvalidTag: Если конверт поврежден или ключ неверен.
+        """
+        wrapped = bytes(wrapped)
+        cache_key = self._cache_key(wrapped)
+        data_key = self._data_keys.get(cache_key)
+        if data_key is None:
+            envelope = unpack_envelope(wrapped)
+            if envelope.alg_id == ALG_RSA_OAEP:
+                data_key = rsa_unwrap_key(envelope.ciphertext, self._rsa_private_key(envelope.key_id))
+            else:
+                data_key = AES_GCM.decrypt(
+                    self.master_key(envelope.key_id),
+                    envelope.nonce,
+                    envelope.ciphertext,
+                    envelope_aad(envelope.alg_id, envelope.key_id)
+                )
+            self._data_keys.set(cache_key, data_key)
+        return data_key
+
+    def unwrap_requires_offload(self, wrapped: BytesLike) -> bool:
+        """
+        Проверяет, нужна ли для ключа данных расшифровка закрытым ключом RSA, нагружающая CPU
+        (ключ зашифрован RSA, закрытый ключ задан и ключа данных нет в кэше).
+        """
+        envelope = unpack_envelope(wrapped)
+        if envelope.alg_id != ALG_RSA_OAEP:
+            return False
+        key_pair = self._rsa_keys.get(envelope.key_id)
+        return (
+            key_pair is not None
+            and key_pair.private_key is not None
+            and self._data_keys.get(self._cache_key(bytes(wrapped))) is None
+        )
+
+    def cache_data_key(self, wrapped: BytesLike, data_key: bytes) -> None:
+        """
+        Сохраняет в кэше ключ данных, расшифрованный в другом процессе (пул `CryptoExecutor`).
+        """
+        self._data_keys.set(self._cache_key(bytes(wrapped)), data_key)
+
+    def key_id_of(self, wrapped: BytesLike) -> int:
+        """
+        Возвращает идентификатор мастер-ключа, которым зашифрован ключ данных.
+        """
+        return unpack_envelope(wrapped).key_id
+
+    def rewrap_data_key(self, wrapped: BytesLike) -> bytes:
+        """
+        Перешифровывает ключ данных активным мастер-ключом (ротация мастер-ключа).
+
+        Возвращает:
+            bytes: Новый конверт ключа данных (или исходный, если он уже зашифрован активным ключом).
+        """
+        if self.key_id_of(wrapped) == self.active_key_id:
+            return bytes(wrapped)
+        return self.wrap_data_key(self.unwrap_data_key(wrapped))
+
+    def _rsa_private_key(self, key_id: int) -> RSAPrivateKey:
+        if key_id not in self._rsa_keys:
+            raise ValueError(f"RSA key {key_id} is not configured")
+        private_key = self._rsa_keys[key_id].private_key
+        if private_key is None:
+            raise CryptoError(f"RSA private key {key_id} is not configured, this node can only encrypt secrets")
+        return private_key
+
+    def clear_cache(self) -> None:
+        self._data_keys.clear()
+
+    @staticmethod
+    def _cache_key(wrapped: bytes) -> bytes:
+        # В кэше хранится хеш конверта, а не сам конверт
+        return hashlib.sha256(wrapped).digest()
@@ -0,0 +1,227 @@
+import os
+import threading
+from typing import Dict, List, Sequence, Tuple
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from .aes import aes_encrypt_bytes, aes_decrypt_bytes, aes_decrypt_many, aes_decrypt_data
+from .chacha20 import chacha20_encrypt_bytes, chacha20_decrypt_bytes, chacha20_decrypt_data
+from .rsa import rsa_encrypt_data, rsa_decrypt_data
+from .envelope import ALG_AES_CBC, ALG_CHACHA20, ALG_RSA_OAEP, ALG_AES_GCM, ALG_CHACHA20_POLY1305
+
+class CipherEngine:
+    """
+    Алгоритм шифрования, зарегистрированный в реестре.
+
+    Атрибуты:
+        alg_id (int): Идентификатор алгоритма, записываемый в конверт.
+        name (str): Имя алгоритма в конфигурации.
+        authenticated (bool): Обеспечивает ли алгоритм целостность (AEAD).
+        cpu_bound (bool): Расшифровка нагружает CPU и выполняется в пуле процессов (см. `CryptoExecutor`).
+    """
+    alg_id: int = 0
+    name: str = ""
+    authenticated: bool = False
+    cpu_bound: bool = False
+
+    def encrypt(self, key, data: bytes, aad: bytes) -> Tuple[bytes, bytes]:
+        """
+        Шифрует данные.
+
+        Возвращает:
+            Tuple[bytes, bytes]: Nonce и шифротекст.
+        """
+        raise NotImplementedError
+
+    def decrypt(self, key, nonce: bytes, ciphertext: bytes, aad: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decrypt_many(self, key, items: Sequence[Tuple[bytes, bytes, bytes]]) -> List[bytes]:
+        """
+        Дешифрует набор значений одним ключом.
+
+        Параметры:
+            items (Sequence[Tuple[bytes, bytes, bytes]]): Тройки (nonce, шифротекст, aad).
+        """
+        return [self.decrypt(key, nonce, ciphertext, aad) for nonce, ciphertext, aad in items]
+
+    def decrypt_legacy(self, encrypted_data: str, key) -> str:
+        """
+        Дешифрует значение в устаревшем hex-формате 'iv:ciphertext'.
+        """
+        raise ValueError(f"Algorithm {self.name} has no legacy format")
+
+
+class AEADEngine(CipherEngine):
+    """
+    Алгоритм AEAD (`cryptography.hazmat.primitives.ciphers.aead`).
+
+    Объекты AEAD долгоживущих ключей (мастер-ключей, см. `retain_key`) создаются один раз
+    и переиспользуются. Для ключей данных секретов объект создается на вызов: расшифрованные
+    ключи данных хранятся только в ограниченном по времени кэше `MasterKeyring`, и их копии
+    не должны оставаться в памяти процесса дольше. Тег аутентификации хранится в конце шифротекста.
+    """
+    authenticated = True
+
+    def __init__(self, alg_id: int, name: str, aead_class, nonce_size: int = 12):
+        self.alg_id = alg_id
+        self.name = name
+        self.nonce_size = nonce_size
+        self._aead_class = aead_class
+        self._retained: Dict[bytes, object] = {}
+        self._lock = threading.Lock()
+
+    def retain_key(self, key: bytes) -> None:
+        """
+        Подготавливает и сохраняет объект AEAD для долгоживущего ключа.
+        """
+        key = bytes(key)
+        with self._lock:
+            if key not in self._retained:
+                self._retained[key] = self._aead_class(key)
+
+    def _aead(self, key: bytes):
+        key = bytes(key)
+        aead = self._retained.get(key)
+        return aead if aead is not None else self._aead_class(key)
+
+    def encrypt(self, key: bytes, data: bytes, aad: bytes) -> Tuple[bytes, bytes]:
+        nonce = os.urandom(self.nonce_size)
+        return nonce, self._aead(key).encrypt(nonce, data, aad)
+
+    def decrypt(self, key: bytes, nonce: bytes, ciphertext: bytes, aad: bytes) -> bytes:
+        return self._aead(key).decrypt(nonce, ciphertext, aad)
+
+    def decrypt_many(self, key: bytes, items: Sequence[Tuple[bytes, bytes, bytes]]) -> List[bytes]:
+        aead = self._aead(key)
+        return [aead.decrypt(nonce, ciphertext, aad) for nonce, ciphertext, aad in items]
+
+
+class AESCBCEngine(CipherEngine):
+    """
+    AES-CBC с PKCS7 без аутентификации. Оставлен для чтения старых записей.
+    """
+    alg_id = ALG_AES_CBC
+    name = "aes-cbc"
+
+    def encrypt(self, key: bytes, data: bytes, aad: bytes) -> Tuple[bytes, bytes]:
+        return aes_encrypt_bytes(data, key)
+
+    def decrypt(self, key: bytes, nonce: bytes, ciphertext: bytes, aad: bytes) -> bytes:
+        return aes_decrypt_bytes(nonce, ciphertext, key)
+
+    def decrypt_many(self, key: bytes, items: Sequence[Tuple[bytes, bytes, bytes]]) -> List[bytes]:
+        return aes_decrypt_many([(nonce, ciphertext) for nonce, ciphertext, _ in items], key)
+
+    def decrypt_legacy(self, encrypted_data: str, key: bytes) -> str:
+        return aes_decrypt_data(encrypted_data, key)
+
+
+class ChaCha20Engine(CipherEngine):
+    """
+    Потоковый ChaCha20 без аутентификации. Оставлен для чтения старых записей.
+    """
+    alg_id = ALG_CHACHA20
+    name = "chacha20-legacy"
+
+    def encrypt(self, key: bytes, data: bytes, aad: bytes) -> Tuple[bytes, bytes]:
+        return chacha20_encrypt_bytes(data, key)
+
+    def decrypt(self, key: bytes, nonce: bytes, ciphertext: bytes, aad: bytes) -> bytes:
+        return chacha20_decrypt_bytes(nonce, ciphertext, key)
+
+    def decrypt_legacy(self, encrypted_data: str, key: bytes) -> str:
+        return chacha20_decrypt_data(encrypted_data, key)
+
+
+class RSAEngine(CipherEngine):
+    """
+    RSA-OAEP (ключ - объект открытого или закрытого ключа RSA).
+    """
+    alg_id = ALG_RSA_OAEP
+    name = "rsa"
+    cpu_bound = True
+
+    def encrypt(self, public_key, data: bytes, aad: bytes) -> Tuple[bytes, bytes]:
+        return b"", bytes.fromhex(rsa_encrypt_data(data.decode(), public_key))
+
+    def decrypt(self, private_key, nonce: bytes, ciphertext: bytes, aad: bytes) -> bytes:
+        return rsa_decrypt_data(ciphertext.hex(), private_key).encode()
+
+    def decrypt_legacy(self, encrypted_data: str, private_key) -> str:
+        return rsa_decrypt_data(encrypted_data, private_key)
+
+
+_ENGINES: Dict[int, CipherEngine] = {}
+_NAMES: Dict[str, CipherEngine] = {}
+# Имена из конфигурации, под которыми раньше записывались значения в hex-формате
+_LEGACY_NAMES: Dict[str, CipherEngine] = {}
+
+
+def register_engine(engine: CipherEngine, *aliases: str) -> CipherEngine:
+    """
+    Регистрирует алгоритм шифрования под его идентификатором, именем и псевдонимами.
+
+    Исключения:
+        ValueError: Если идентификатор уже занят другим алгоритмом.
+    """
+    if engine.alg_id in _ENGINES and _ENGINES[engine.alg_id] is not engine:
+        raise ValueError(f"Encryption algorithm id {engine.alg_id} is already registered")
+    _ENGINES[engine.alg_id] = engine
+    for name in (engine.name, *aliases):
+        _NAMES[name.lower()] = engine
+    return engine
+
+
+def retain_key(key: bytes) -> None:
+    """
+    Сохраняет подготовленные объекты AEAD для долгоживущего ключа во всех алгоритмах AEAD.
+
+    Вызывается для мастер-ключей: их немного и они живут все время работы процесса.
+    """
+    for engine in _ENGINES.values():
+        if isinstance(engine, AEADEngine):
+            engine.retain_key(key)
+
+
+def get_engine(alg_id: int) -> CipherEngine:
+    """
+    Возвращает алгоритм по идентификатору из конверта.
+
+    Исключения:
+        ValueError: Если алгоритм не зарегистрирован.
+    """
+    try:
+        return _ENGINES[alg_id]
+    except KeyError:
+        raise ValueError(f"Unsupported encryption algorithm id: {alg_id}")
+
+
+def resolve_engine(name: str) -> CipherEngine:
+    """
+    Возвращает алгоритм по имени из конфигурации.
+
+    Исключения:
+        ValueError: Если алгоритм не поддерживается.
+    """
+    try:
+        return _NAMES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported encryption algorithm: {name}")
+
+
+def resolve_legacy_engine(name: str) -> CipherEngine:
+    """
+    Возвращает алгоритм, которым при данном имени из конфигурации записывались
+    значения в устаревшем hex-формате (до появления конвертов).
+    """
+    return _LEGACY_NAMES.get(name.lower()) or resolve_engine(name)
+
+
+AES_GCM = register_engine(AEADEngine(ALG_AES_GCM, "aes-gcm", AESGCM), "aes")
+CHACHA20_POLY1305 = register_engine(
+    AEADEngine(ALG_CHACHA20_POLY1305, "chacha20-poly1305", ChaCha20Poly1305), "chacha20"
+)
+AES_CBC = register_engine(AESCBCEngine())
+CHACHA20 = register_engine(ChaCha20Engine())
+RSA_OAEP = register_engine(RSAEngine())
+
+_LEGACY_NAMES.update({"aes": AES_CBC, "chacha20": CHACHA20, "cha20cha20": CHACHA20})
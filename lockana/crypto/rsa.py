@@ -1,5 +1,8 @@
+from functools import lru_cache
+from typing import Optional
 from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
+from cryptography.hazmat.primitives import hashes, serialization
 
 
 def rsa_encrypt_data(data: str, public_key) -> str:
@@ -55,4 +58,63 @@ def rsa_decrypt_data(encrypted_data: str, private_key) -> str:
             label=None
         )
     )
-    return decrypted_data.decode()
\ No newline at end of file
+    return decrypted_data.decode()
+
+_OAEP = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+# Самый большой поддерживаемый модуль RSA: под конверт ключа данных такого размера
+# рассчитана колонка secrets.data_key (см. `lockana.models.secret.DATA_KEY_MAX_BYTES`)
+RSA_MAX_KEY_BITS = 8192
+
+
+def _check_key_size(key, path: str) -> None:
+    if key.key_size > RSA_MAX_KEY_BITS:
+        raise ValueError(f"{path}: RSA keys larger than {RSA_MAX_KEY_BITS} bits are not supported")
+
+
+@lru_cache(maxsize=None)
+def load_public_key(path: str) -> RSAPublicKey:
+    """
+    Загружает открытый ключ RSA из PEM-файла. Ключ читается и разбирается один раз на процесс.
+
+    Исключения:
+        ValueError: Если файл не содержит открытый ключ RSA или ключ длиннее RSA_MAX_KEY_BITS.
+    """
+    with open(path, "rb") as key_file:
+        key = serialization.load_pem_public_key(key_file.read())
+    if not isinstance(key, RSAPublicKey):
+        raise ValueError(f"{path} is not an RSA public key")
+    _check_key_size(key, path)
+    return key
+
+
+@lru_cache(maxsize=None)
+def load_private_key(path: str, password: Optional[bytes] = None) -> RSAPrivateKey:
+    """
+    Загружает закрытый ключ RSA из PEM-файла. Ключ читается и разбирается один раз на процесс.
+
+    Исключения:
+        ValueError: Если файл не содержит закрытый ключ RSA, пароль неверен или ключ длиннее RSA_MAX_KEY_BITS.
+    """
+    with open(path, "rb") as key_file:
+        key = serialization.load_pem_private_key(key_file.read(), password=password)
+    if not isinstance(key, RSAPrivateKey):
+        raise ValueError(f"{path} is not an RSA private key")
+    _check_key_size(key, path)
+    return key
+
+
+def rsa_wrap_key(key: bytes, public_key: RSAPublicKey) -> bytes:
+    """
+    Шифрует симметричный ключ открытым ключом RSA (OAEP-SHA256).
+
+    Открытым ключом RSA шифруется только короткий ключ данных, сами данные
+    шифруются этим ключом алгоритмом AEAD (гибридное шифрование).
+    """
+    return public_key.encrypt(key, _OAEP)
+
+
+def rsa_unwrap_key(wrapped_key: bytes, private_key: RSAPrivateKey) -> bytes:
+    """
+    Расшифровывает симметричный ключ закрытым ключом RSA (OAEP-SHA256).
+    """
+    return private_key.decrypt(wrapped_key, _OAEP)
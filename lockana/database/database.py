@@ -1,10 +1,15 @@
 import os
 import logging
 from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, List, Optional, Union
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from lockana.models import Base
+from lockana.database.pool import TimedAsyncQueuePool, TimedQueuePool, instrument_pool
 from lockana.exceptions import DatabaseError
 from lockana.config import *
 
@@ -12,6 +17,34 @@ from lockana.config import *
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Асинхронные драйверы для синхронных строк подключения
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def make_async_database_string(database_string: str) -> str:
+    """
+    Преобразует синхронную строку подключения в строку для асинхронного драйвера.
+
+    Параметры:
+        database_string (str): Строка подключения, например `mysql+pymysql://...`.
+
+    Возвращает:
+        str: Строка подключения с асинхронным драйвером, например `mysql+aiomysql://...`.
+
+    Исключения:
+        DatabaseError: Если для диалекта нет известного асинхронного драйвера.
+    """
+    url = make_url(database_string)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise DatabaseError(f"Нет асинхронного драйвера для {url.get_backend_name()}")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
 class Database:
     """
     Класс для подключения и управления базой данных с использованием SQLAlchemy.
@@ -27,30 +60,66 @@ class Database:
         database_name (str): Имя базы данных.
         driver (str): Драйвер для подключения, по умолчанию 'pymysql'.
 
+    В асинхронном режиме (`database.async_mode`) дополнительно создаются `AsyncEngine`
+    и фабрика `AsyncSession`, которые используются маршрутами API. Синхронный движок
+    сохраняется для CLI-скриптов и создания схемы.
+
     Методы:
         __init__: Инициализирует соединение с базой данных и настраивает сессии.
         get_session: Контекстный менеджер для работы с сессиями базы данных.
         close: Закрывает соединение с базой данных.
     """
-    def __init__(self, DATABASE_STRING: str):
+    def __init__(
+        self,
+        DATABASE_STRING: str,
+        async_mode: bool = False,
+        async_database_string: str = "",
+        pool_options: Optional[dict] = None
+    ):
         """
-        Инициализирует класс для подключения к базе данных и создает все таблицы.
+        Инициализирует класс для подключения к базе данных.
+
+        Схема базы данных здесь не создается: она обновляется миграциями
+        (`python app.py migrate`), а при запуске проверяется только ее версия.
 
         Параметры:
             DATABASE_STRING (str): Строка подключения к базе данных.
+            async_mode (bool): Создавать ли асинхронный движок для маршрутов API.
+            async_database_string (str): Строка подключения для асинхронного драйвера.
+                Если не указана, выводится из DATABASE_STRING.
+            pool_options (dict): Параметры пула соединений (pool_size, max_overflow,
+                pool_timeout, pool_recycle, pool_pre_ping).
 
         """
+        self.async_mode = async_mode
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        pool_options = pool_options or {}
 
         try:
-            self.engine = create_engine(DATABASE_STRING, echo=False, pool_pre_ping=True)
-            Base.metadata.create_all(self.engine)
+            self.engine = create_engine(
+                DATABASE_STRING, echo=False, poolclass=TimedQueuePool, **pool_options
+            )
+            instrument_pool(self.engine, "sync")
             self.SessionLocal = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+            if async_mode:
+                self.async_engine = create_async_engine(
+                    async_database_string or make_async_database_string(DATABASE_STRING),
+                    echo=False,
+                    poolclass=TimedAsyncQueuePool,
+                    **pool_options
+                )
+                instrument_pool(self.async_engine.sync_engine, "async")
+                self.AsyncSessionLocal = async_sessionmaker(
+                    bind=self.async_engine, autoflush=False, expire_on_commit=False
+                )
             logger.info("Подключение к базе данных успешно")
         except SQLAlchemyError as e:
             logger.error(f"Ошибка подключения к базе данных: {e}")
             raise DatabaseError(f"Ошибка базы данных: {str(e)}")
 
-    def get_session(self) -> Session:
+    @contextmanager
+    def get_session(self) -> Iterator[Session]:
         """
         Контекстный менеджер для работы с сессией базы данных.
 
@@ -80,24 +149,129 @@ class Database:
         self.engine.dispose()
         logger.info("Подключение к базе данных закрыто")
 
+    async def close_async(self):
+        """
+        Закрывает соединения асинхронного движка, если он создан.
+        """
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+
 _db_instance = Database(
-    DATABASE_STRING=DATABASE_STRING
+    DATABASE_STRING=DATABASE_STRING,
+    async_mode=DATABASE_ASYNC_MODE,
+    async_database_string=DATABASE_ASYNC_STRING,
+    pool_options={
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_timeout": DATABASE_POOL_TIMEOUT,
+        "pool_recycle": DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": DATABASE_POOL_PRE_PING,
+    }
 )
 
-def get_db():
+def after_commit(db: Union[Session, AsyncSession], callback: Callable[[], Awaitable[Any]]) -> None:
+    """
+    Регистрирует асинхронный обработчик, вызываемый после успешного коммита запроса.
+
+    Используется для побочных эффектов, которые нельзя выполнять до фиксации транзакции
+    (например, сброс кэшей прав в других воркерах).
+    """
+    callbacks: List = sync_session(db).info.setdefault("after_commit", [])
+    callbacks.append(callback)
+
+
+async def _run_after_commit(db: Union[Session, AsyncSession]) -> None:
+    for callback in sync_session(db).info.pop("after_commit", []):
+        await callback()
+
+
+async def get_sync_db():
     """
-    Глобальный генератор сессий для работы с базой данных.
+    Генератор сессий базы данных на время запроса (синхронный движок).
 
-    Возвращает новую сессию базы данных, которая автоматически закрывается после использования.
+    Одна сессия используется на протяжении всего запроса. После успешной обработки
+    запроса транзакция фиксируется ровно один раз, при исключении - откатывается.
+    Блокирующие операции выполняются в пуле потоков.
 
-    Returns:
+    Yields:
         db (Session): Сессия базы данных.
 
     Исключения:
-        DatabaseException: Ошибка при создании или работе с сессией базы данных.
+        DatabaseError: Ошибка при фиксации транзакции.
     """
     db = _db_instance.SessionLocal()
     try:
-        return db
+        yield db
+        await run_in_threadpool(db.commit)
+    except SQLAlchemyError as e:
+        await run_in_threadpool(db.rollback)
+        logger.error(f"Ошибка базы данных при работе с сессией: {e}")
+        raise DatabaseError(f"Ошибка сессии: {str(e)}")
+    except BaseException:
+        await run_in_threadpool(db.rollback)
+        raise
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
+    await _run_after_commit(db)
+
+
+async def get_async_db():
+    """
+    Генератор асинхронных сессий на время запроса (асинхронный режим).
+
+    Транзакция фиксируется ровно один раз после успешной обработки запроса
+    и откатывается при исключении.
+
+    Yields:
+        db (AsyncSession): Асинхронная сессия базы данных, закрываемая после запроса.
+
+    Исключения:
+        DatabaseError: Ошибка при фиксации транзакции.
+    """
+    async with _db_instance.AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            logger.error(f"Ошибка базы данных при работе с сессией: {e}")
+            raise DatabaseError(f"Ошибка сессии: {str(e)}")
+        except BaseException:
+            await db.rollback()
+            raise
+    await _run_after_commit(db)
+
+
+# Зависимость маршрутов: AsyncSession в асинхронном режиме, иначе Session
+get_db = get_async_db if DATABASE_ASYNC_MODE else get_sync_db
+
+
+def sync_session(db: Union[Session, AsyncSession]) -> Session:
+    """
+    Возвращает синхронную сессию ORM для сессии любого режима.
+
+    Для AsyncSession это связанная с ней `sync_session`, используемая внутри `run_db`.
+    """
+    if isinstance(db, AsyncSession):
+        return db.sync_session
+    return db
+
+
+async def run_db(db: Union[Session, AsyncSession], fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Выполняет синхронный код ORM, не блокируя цикл событий.
+
+    Для AsyncSession код выполняется через `AsyncSession.run_sync` поверх асинхронного
+    драйвера, без потоков. Для Session код выполняется в пуле потоков, как раньше
+    выполнялись синхронные маршруты FastAPI.
+
+    Параметры:
+        db (Session | AsyncSession): Сессия текущего запроса.
+        fn (Callable): Функция, работающая с `sync_session(db)`.
+
+    Возвращает:
+        Any: Результат функции `fn`.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda _: fn(*args, **kwargs))
+    return await run_in_threadpool(fn, *args, **kwargs)
@@ -3,7 +3,8 @@ import pkgutil
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from lockana.database.database import _db_instance
-from lockana.models import Base
+from lockana.database.migrations import upgrade
+from lockana.exceptions import DatabaseError
 
 logger = logging.getLogger(__name__)
 
@@ -31,19 +32,18 @@ def import_database_models():
 
 def create_database_tables():
     """
-    Создает все таблицы в базе данных с использованием SQLAlchemy.
+    Создает или обновляет схему базы данных, применяя миграции до последней ревизии.
 
-    Эта функция вызывает `import_models` для импорта всех моделей, а затем использует SQLAlchemy для создания всех
-    таблиц, описанных в моделях, если они еще не существуют. В случае успешного создания таблиц выводится лог-сообщение.
+    Схема больше не создается через `Base.metadata.create_all`: таблицы, индексы и
+    изменения колонок описываются ревизиями в `lockana.database.migrations.versions`.
 
     Исключения:
-        - В случае ошибки при создании таблиц будет вызвано исключение SQLAlchemyError, и ошибка будет зафиксирована в логе.
+        - В случае ошибки при применении миграций будет вызвано исключение, и ошибка будет зафиксирована в логе.
     """
     import_database_models()
-    
+
     try:
-        Base.metadata.create_all(_db_instance.engine)
-        logger.info("Все таблицы успешно созданы")
-    except SQLAlchemyError as e:
-        logger.error(f"Ошибка при создании таблиц: {e}")
+        upgrade(_db_instance.engine)
+    except (SQLAlchemyError, DatabaseError) as e:
+        logger.error(f"Ошибка при применении миграций: {e}")
         raise
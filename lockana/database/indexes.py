@@ -0,0 +1,128 @@
+import logging
+from typing import Dict, List, Tuple
+from sqlalchemy import Integer, String, column, func, select, table, text, update
+from sqlalchemy.engine import Connection, Engine
+from lockana.models import Secret
+
+
+logger = logging.getLogger(__name__)
+
+SECRETS_UNIQUE_INDEX = "ux_secrets_username_name"
+# Индекс для постраничного списка секретов пользователя по курсору
+SECRETS_LIST_INDEX = "ix_secrets_username_id"
+# Одиночный индекс по имени, который создавался до появления составного
+LEGACY_SECRETS_NAME_INDEX = "ix_secrets_name"
+SECRET_NAME_MAX_LENGTH = 255
+
+# Минимальное описание таблицы для миграций, не зависящее от текущей модели
+_secrets = table(
+    "secrets",
+    column("id", Integer),
+    column("username", String),
+    column("name", String),
+)
+
+
+def find_duplicate_secrets(conn: Connection) -> List[Tuple[str, str, int]]:
+    """
+    Находит пары (username, name), у которых больше одного секрета.
+
+    Параметры:
+        conn (Connection): Соединение с базой данных.
+
+    Возвращает:
+        List[Tuple[str, str, int]]: Имя пользователя, имя секрета и количество записей.
+    """
+    statement = (
+        select(_secrets.c.username, _secrets.c.name, func.count(_secrets.c.id))
+        .group_by(_secrets.c.username, _secrets.c.name)
+        .having(func.count(_secrets.c.id) > 1)
+    )
+    return [tuple(row) for row in conn.execute(statement)]
+
+
+def rename_duplicate_secrets(conn: Connection) -> int:
+    """
+    Переименовывает дубликаты секретов, оставляя исходное имя у самой новой записи.
+
+    Данные не удаляются: старые записи получают имя вида `<name>#<id>`,
+    чтобы владелец мог просмотреть и удалить их вручную.
+
+    Параметры:
+        conn (Connection): Соединение с базой данных (внутри транзакции).
+
+    Возвращает:
+        int: Количество переименованных записей.
+    """
+    renamed = 0
+    for username, name, _ in find_duplicate_secrets(conn):
+        ids = conn.execute(
+            select(_secrets.c.id)
+            .where(_secrets.c.username == username, _secrets.c.name == name)
+            .order_by(_secrets.c.id.desc())
+        ).scalars().all()
+        for secret_id in ids[1:]:
+            suffix = f"#{secret_id}"
+            new_name = name[:SECRET_NAME_MAX_LENGTH - len(suffix)] + suffix
+            conn.execute(update(_secrets).where(_secrets.c.id == secret_id).values(name=new_name))
+            renamed += 1
+    if renamed:
+        logger.warning(f"Переименовано дубликатов секретов: {renamed}")
+    return renamed
+
+
+def _hot_secret_queries():
+    """
+    Запросы, которые выполняются на каждом чтении, изменении, удалении и просмотре
+    списка секретов, и индексы, которые они должны использовать.
+    """
+    return {
+        "get/update/delete": (
+            select(Secret.id, Secret.encrypted_data)
+                .where(Secret.username == "explain-user", Secret.name == "explain-secret"),
+            SECRETS_UNIQUE_INDEX
+        ),
+        "batch-get": (
+            select(Secret.name, Secret.encrypted_data)
+                .where(Secret.username == "explain-user", Secret.name.in_(["explain-a", "explain-b"])),
+            SECRETS_UNIQUE_INDEX
+        ),
+        "list": (
+            select(Secret.id, Secret.name)
+                .where(Secret.username == "explain-user", Secret.id > 0)
+                .order_by(Secret.id)
+                .limit(101),
+            SECRETS_LIST_INDEX
+        ),
+    }
+
+
+def _explain(conn: Connection, statement) -> str:
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings().all()
+        return "\n".join(str(row["detail"]) for row in rows)
+    rows = conn.execute(text(f"EXPLAIN {sql}")).mappings().all()
+    if conn.dialect.name == "mysql":
+        return "\n".join(f"table={row['table']} type={row['type']} key={row['key']}" for row in rows)
+    return "\n".join(str(value) for row in rows for value in row.values())
+
+
+def explain_secret_queries(engine: Engine) -> Dict[str, Tuple[bool, str]]:
+    """
+    Выполняет EXPLAIN для горячих запросов к секретам и проверяет, что они используют
+    свои индексы: `ux_secrets_username_name` для поиска по имени и `ix_secrets_username_id`
+    для постраничного списка.
+
+    Параметры:
+        engine (Engine): Синхронный движок базы данных.
+
+    Возвращает:
+        Dict[str, Tuple[bool, str]]: Для каждого запроса - используется ли его индекс и план выполнения.
+    """
+    results = {}
+    with engine.connect() as conn:
+        for label, (statement, index) in _hot_secret_queries().items():
+            plan = _explain(conn, statement)
+            results[label] = (index in plan, plan)
+    return results
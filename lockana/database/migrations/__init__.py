@@ -0,0 +1,7 @@
+from .runner import (
+    current_revision,
+    head_revision,
+    load_revisions,
+    upgrade,
+    verify_schema_version
+)
@@ -0,0 +1,131 @@
+import logging
+from typing import Sequence
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
+
+
+logger = logging.getLogger(__name__)
+
+
+def has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_index(conn: Connection, table: str, name: str) -> bool:
+    return any(index["name"] == name for index in inspect(conn).get_indexes(table))
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(item["name"] == column for item in inspect(conn).get_columns(table))
+
+
+def _is_mysql(conn: Connection) -> bool:
+    return conn.dialect.name == "mysql"
+
+
+def create_index(conn: Connection, table: str, name: str, columns: Sequence[str], unique: bool = False) -> bool:
+    """
+    Создает индекс, если его еще нет.
+
+    Для MySQL индекс строится онлайн (`ALGORITHM=INPLACE, LOCK=NONE`): таблица остается
+    доступной для чтения и записи на все время построения.
+
+    Параметры:
+        conn (Connection): Соединение с базой данных.
+        table (str): Имя таблицы.
+        name (str): Имя индекса.
+        columns (Sequence[str]): Колонки индекса.
+        unique (bool): Уникальный ли индекс.
+
+    Возвращает:
+        bool: True, если индекс был создан.
+    """
+    if has_index(conn, table, name):
+        return False
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    column_list = ", ".join(columns)
+    if _is_mysql(conn):
+        conn.execute(text(f"ALTER TABLE {table} ADD {kind} {name} ({column_list}), ALGORITHM=INPLACE, LOCK=NONE"))
+    else:
+        conn.execute(text(f"CREATE {kind} {name} ON {table} ({column_list})"))
+    logger.info(f"Создан индекс {name} на {table}")
+    return True
+
+
+def drop_index(conn: Connection, table: str, name: str) -> bool:
+    """
+    Удаляет индекс, если он существует (онлайн для MySQL).
+
+    Возвращает:
+        bool: True, если индекс был удален.
+    """
+    if not has_index(conn, table, name):
+        return False
+    if _is_mysql(conn):
+        conn.execute(text(f"ALTER TABLE {table} DROP INDEX {name}, ALGORITHM=INPLACE, LOCK=NONE"))
+    else:
+        conn.execute(text(f"DROP INDEX {name}"))
+    logger.info(f"Удален индекс {name} на {table}")
+    return True
+
+
+def add_column(conn: Connection, table: str, column: Column) -> bool:
+    """
+    Добавляет колонку, если ее еще нет.
+
+    Для MySQL сначала пробуется `ALGORITHM=INSTANT` (только метаданные, без перестройки
+    таблицы), затем `ALGORITHM=INPLACE, LOCK=NONE`. Чтобы изменение оставалось онлайн,
+    колонка должна допускать NULL или иметь `server_default`.
+
+    Параметры:
+        conn (Connection): Соединение с базой данных.
+        table (str): Имя таблицы.
+        column (Column): Описание колонки (не привязанное к таблице).
+
+    Возвращает:
+        bool: True, если колонка была добавлена.
+    """
+    if has_column(conn, table, column.name):
+        return False
+    ddl = str(CreateColumn(column).compile(dialect=conn.dialect))
+    if _is_mysql(conn):
+        try:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}, ALGORITHM=INSTANT"))
+        except OperationalError:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}, ALGORITHM=INPLACE, LOCK=NONE"))
+    else:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}"))
+    logger.info(f"Добавлена колонка {table}.{column.name}")
+    return True
+
+
+def modify_column(conn: Connection, table: str, column: Column) -> bool:
+    """
+    Меняет тип существующей колонки.
+
+    В MySQL смена типа (например, TINYBLOB на VARBINARY) перестраивает таблицу: запись
+    в нее блокируется на время копирования, чтение остается доступным. SQLite не проверяет
+    длину типов, поэтому для нее изменение не требуется.
+
+    Параметры:
+        conn (Connection): Соединение с базой данных.
+        table (str): Имя таблицы.
+        column (Column): Новое описание колонки (не привязанное к таблице).
+
+    Возвращает:
+        bool: True, если тип колонки был изменен.
+    """
+    if not has_column(conn, table, column.name):
+        raise ValueError(f"Колонка {table}.{column.name} не найдена")
+    if conn.dialect.name == "sqlite":
+        return False
+    if _is_mysql(conn):
+        ddl = str(CreateColumn(column).compile(dialect=conn.dialect))
+        conn.execute(text(f"ALTER TABLE {table} MODIFY COLUMN {ddl}, LOCK=SHARED"))
+    else:
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column.name} TYPE {column_type}"))
+    logger.info(f"Изменен тип колонки {table}.{column.name}")
+    return True
@@ -0,0 +1,193 @@
+import importlib
+import logging
+import pkgutil
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import Column, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from lockana.exceptions import DatabaseError
+from . import versions
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = "schema_version"
+# Имя блокировки MySQL, чтобы миграции не выполнялись одновременно из нескольких процессов
+MIGRATION_LOCK_NAME = "lockana_migrations"
+MIGRATION_LOCK_TIMEOUT = 600
+
+_metadata = MetaData()
+schema_version = Table(
+    SCHEMA_VERSION_TABLE,
+    _metadata,
+    Column("version_num", String(32), primary_key=True),
+)
+
+
+class Revision:
+    """
+    Ревизия схемы базы данных.
+
+    Каждая ревизия - модуль в `lockana.database.migrations.versions` с атрибутами
+    `revision`, `down_revision`, `description` и функцией `upgrade(conn)`.
+    Функция `upgrade` должна быть идемпотентной: в MySQL DDL фиксируется неявно, и ревизия,
+    прерванная до записи версии, будет выполнена повторно.
+
+    Атрибуты:
+        revision (str): Идентификатор ревизии.
+        down_revision (Optional[str]): Предыдущая ревизия или None для первой.
+        description (str): Краткое описание изменений.
+    """
+    __slots__ = ("revision", "down_revision", "description", "module")
+
+    def __init__(self, module: ModuleType):
+        self.module = module
+        self.revision = str(module.revision)
+        self.down_revision = module.down_revision
+        self.description = getattr(module, "description", "")
+
+    def upgrade(self, conn: Connection) -> None:
+        self.module.upgrade(conn)
+
+
+def load_revisions() -> List[Revision]:
+    """
+    Загружает ревизии и выстраивает их в цепочку от первой к последней.
+
+    Возвращает:
+        List[Revision]: Ревизии в порядке применения.
+
+    Исключения:
+        DatabaseError: Если цепочка ревизий разветвлена или разорвана.
+    """
+    revisions: Dict[Optional[str], Revision] = {}
+    for _, module_name, _ in pkgutil.iter_modules(versions.__path__):
+        revision = Revision(importlib.import_module(f"{versions.__name__}.{module_name}"))
+        if revision.down_revision in revisions:
+            raise DatabaseError(
+                f"Ревизии {revisions[revision.down_revision].revision} и {revision.revision} "
+                f"ссылаются на одну и ту же предыдущую ревизию {revision.down_revision}"
+            )
+        revisions[revision.down_revision] = revision
+
+    chain = []
+    current = revisions.pop(None, None)
+    while current is not None:
+        chain.append(current)
+        current = revisions.pop(current.revision, None)
+    if revisions:
+        orphans = ", ".join(revision.revision for revision in revisions.values())
+        raise DatabaseError(f"Ревизии не связаны с цепочкой миграций: {orphans}")
+    return chain
+
+
+def head_revision() -> Optional[str]:
+    chain = load_revisions()
+    return chain[-1].revision if chain else None
+
+
+def current_revision(conn: Connection) -> Optional[str]:
+    """
+    Возвращает версию схемы из таблицы `schema_version` или None для пустой базы.
+    """
+    try:
+        return conn.execute(select(schema_version.c.version_num)).scalar()
+    except SQLAlchemyError:
+        conn.rollback()
+        return None
+
+
+def _set_revision(conn: Connection, revision: str) -> None:
+    conn.execute(schema_version.delete())
+    conn.execute(schema_version.insert().values(version_num=revision))
+
+
+@contextmanager
+def _migration_lock(engine: Engine) -> Iterator[None]:
+    if engine.dialect.name != "mysql":
+        yield
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}
+        ).scalar()
+        if acquired != 1:
+            raise DatabaseError("Не удалось получить блокировку миграций: миграции уже выполняются")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+
+def upgrade(engine: Engine, target: Optional[str] = None) -> List[str]:
+    """
+    Применяет ревизии до `target` (по умолчанию - до последней).
+
+    Каждая ревизия выполняется в отдельной транзакции вместе с записью новой версии.
+
+    Параметры:
+        engine (Engine): Синхронный движок базы данных.
+        target (Optional[str]): Ревизия, до которой нужно обновить схему.
+
+    Возвращает:
+        List[str]: Примененные ревизии.
+
+    Исключения:
+        DatabaseError: Если целевая или текущая ревизия неизвестна.
+    """
+    chain = load_revisions()
+    known = [revision.revision for revision in chain]
+    if target is not None and target not in known:
+        raise DatabaseError(f"Неизвестная ревизия: {target}")
+
+    applied = []
+    with _migration_lock(engine):
+        with engine.begin() as conn:
+            schema_version.create(conn, checkfirst=True)
+            current = current_revision(conn)
+        if current is not None and current not in known:
+            raise DatabaseError(f"Версия схемы {current} неизвестна этой версии приложения")
+
+        start = known.index(current) + 1 if current is not None else 0
+        stop = known.index(target) + 1 if target is not None else len(chain)
+        for revision in chain[start:stop]:
+            logger.info(f"Применение миграции {revision.revision}: {revision.description}")
+            with engine.begin() as conn:
+                revision.upgrade(conn)
+                _set_revision(conn, revision.revision)
+            applied.append(revision.revision)
+
+    if applied:
+        logger.info(f"Схема базы данных обновлена до версии {applied[-1]}")
+    else:
+        logger.info("Схема базы данных уже актуальна")
+    return applied
+
+
+def verify_schema_version(engine: Engine) -> str:
+    """
+    Проверяет, что схема базы данных соответствует последней ревизии.
+
+    Выполняет один запрос к таблице `schema_version` вместо рефлексии всех таблиц.
+
+    Параметры:
+        engine (Engine): Синхронный движок базы данных.
+
+    Возвращает:
+        str: Текущая версия схемы.
+
+    Исключения:
+        DatabaseError: Если схема не создана или ее версия отличается от последней ревизии.
+    """
+    head = head_revision()
+    with engine.connect() as conn:
+        current = current_revision(conn)
+    if current != head:
+        raise DatabaseError(
+            f"Версия схемы базы данных {current or 'отсутствует'}, ожидается {head}. "
+            "Выполните `python app.py migrate`"
+        )
+    return current
@@ -0,0 +1,6 @@
+"""
+Ревизии схемы базы данных.
+
+Каждый модуль описывает одну ревизию: `revision`, `down_revision`, `description`
+и функцию `upgrade(conn)`. Модули именуются `v<номер>_<описание>.py`.
+"""
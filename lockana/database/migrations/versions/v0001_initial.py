@@ -0,0 +1,64 @@
+"""
+Исходная схема: пользователи, роли, разрешения, секреты и журнал входов.
+
+Таблицы описаны здесь явно, а не через модели, чтобы ревизия не менялась
+вместе с моделями. На установках, созданных через `create_all`, существующие
+таблицы пропускаются.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+revision = "0001"
+down_revision = None
+description = "Исходная схема"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(256), unique=True, nullable=False),
+    Column("totp_secret", String(256), nullable=False),
+    Column("created_at", DateTime),
+    Column("telegram_connection", Integer, nullable=False),
+)
+Table(
+    "roles", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(50), unique=True, nullable=False),
+)
+Table(
+    "permissions", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(50), unique=True, nullable=False),
+)
+Table(
+    "user_roles", metadata,
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("role_id", Integer, ForeignKey("roles.id")),
+)
+Table(
+    "role_permissions", metadata,
+    Column("role_id", Integer, ForeignKey("roles.id")),
+    Column("permission_id", Integer, ForeignKey("permissions.id")),
+)
+Table(
+    "secrets", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(256), ForeignKey("users.username"), nullable=False),
+    Column("name", String(255), nullable=False, index=True),
+    Column("encrypted_data", String(255), nullable=False),
+    Column("created_at", DateTime),
+)
+Table(
+    "logs", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(256), nullable=False),
+    Column("action", String(255), nullable=False),
+    Column("timestamp", DateTime),
+    Column("ip_address", String(255), nullable=True),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,34 @@
+"""
+Уникальный составной индекс secrets (username, name) вместо индекса по имени.
+
+Индекс строится онлайн для MySQL. Если у пользователя есть секреты с одинаковыми
+именами, миграция останавливается: переименуйте дубликаты командой
+`python3 -m scripts.migrate_secrets_index --rename-duplicates`.
+"""
+from sqlalchemy.engine import Connection
+from lockana.database.indexes import (
+    LEGACY_SECRETS_NAME_INDEX,
+    SECRETS_UNIQUE_INDEX,
+    find_duplicate_secrets
+)
+from lockana.database.migrations.operations import create_index, drop_index, has_index
+from lockana.exceptions import DatabaseError
+
+revision = "0002"
+down_revision = "0001"
+description = "Уникальный индекс secrets (username, name)"
+
+
+def upgrade(conn: Connection) -> None:
+    if has_index(conn, "secrets", SECRETS_UNIQUE_INDEX):
+        drop_index(conn, "secrets", LEGACY_SECRETS_NAME_INDEX)
+        return
+
+    duplicates = find_duplicate_secrets(conn)
+    if duplicates:
+        raise DatabaseError(
+            f"Найдено {len(duplicates)} пар (username, name) с дубликатами. "
+            "Выполните `python3 -m scripts.migrate_secrets_index --rename-duplicates`"
+        )
+    create_index(conn, "secrets", SECRETS_UNIQUE_INDEX, ("username", "name"), unique=True)
+    drop_index(conn, "secrets", LEGACY_SECRETS_NAME_INDEX)
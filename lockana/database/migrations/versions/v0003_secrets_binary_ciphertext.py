@@ -0,0 +1,17 @@
+"""
+Бинарная колонка secrets.ciphertext для шифротекста в конверте.
+
+Колонка добавляется онлайн (в MySQL - ALGORITHM=INSTANT), существующие строки не
+переписываются: записи в hex-формате в `encrypted_data` перешифровываются лениво при чтении.
+"""
+from sqlalchemy import Column, LargeBinary
+from sqlalchemy.engine import Connection
+from lockana.database.migrations.operations import add_column
+
+revision = "0003"
+down_revision = "0002"
+description = "Бинарная колонка secrets.ciphertext"
+
+
+def upgrade(conn: Connection) -> None:
+    add_column(conn, "secrets", Column("ciphertext", LargeBinary(16 * 1024 * 1024 - 1), nullable=True))
@@ -0,0 +1,17 @@
+"""
+Колонка secrets.data_key для ключа данных секрета, зашифрованного мастер-ключом.
+
+Колонка добавляется онлайн; записи без ключа данных продолжают расшифровываться
+SECRET_KEY и переводятся на собственный ключ данных при чтении или ротации.
+"""
+from sqlalchemy import Column, LargeBinary
+from sqlalchemy.engine import Connection
+from lockana.database.migrations.operations import add_column
+
+revision = "0004"
+down_revision = "0003"
+description = "Колонка secrets.data_key"
+
+
+def upgrade(conn: Connection) -> None:
+    add_column(conn, "secrets", Column("data_key", LargeBinary(255), nullable=True))
@@ -0,0 +1,34 @@
+"""
+Таблица key_rotation_jobs с контрольными точками заданий ротации ключей.
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+revision = "0005"
+down_revision = "0004"
+description = "Таблица key_rotation_jobs"
+
+metadata = MetaData()
+
+key_rotation_jobs = Table(
+    "key_rotation_jobs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("status", String(32), nullable=False, index=True),
+    Column("mode", String(32), nullable=False),
+    Column("master_key_id", Integer, nullable=False),
+    Column("algorithm_id", Integer, nullable=False),
+    Column("last_id", Integer, nullable=False),
+    Column("processed", Integer, nullable=False),
+    Column("rewrapped", Integer, nullable=False),
+    Column("reencrypted", Integer, nullable=False),
+    Column("conflicts", Integer, nullable=False),
+    Column("failed", Integer, nullable=False),
+    Column("error", Text, nullable=True),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("finished_at", DateTime, nullable=True),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    key_rotation_jobs.create(conn, checkfirst=True)
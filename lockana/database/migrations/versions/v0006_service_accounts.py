@@ -0,0 +1,38 @@
+"""
+Сервисные учетные записи и их ключи API.
+
+Колонка users.account_type ("user" или "service") добавляется онлайн со значением
+по умолчанию, таблица api_keys хранит только HMAC-хэши ключей.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+from lockana.database.migrations.operations import add_column
+
+revision = "0006"
+down_revision = "0005"
+description = "Сервисные учетные записи и таблица api_keys"
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(256), unique=True, nullable=False),
+)
+api_keys = Table(
+    "api_keys", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("key_id", String(32), nullable=False, unique=True),
+    Column("key_hash", String(64), nullable=False),
+    Column("username", String(256), ForeignKey("users.username"), nullable=False, index=True),
+    Column("name", String(255), nullable=False),
+    Column("scopes", Text, nullable=True),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=True),
+    Column("revoked_at", DateTime, nullable=True),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    add_column(conn, "users", Column("account_type", String(16), nullable=False, server_default="user"))
+    api_keys.create(conn, checkfirst=True)
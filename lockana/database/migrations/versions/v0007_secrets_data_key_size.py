@@ -0,0 +1,25 @@
+"""
+Расширение secrets.data_key под конверты ключей данных, зашифрованных RSA.
+
+Колонка создавалась как LargeBinary(255) - в MySQL это TINYBLOB (до 255 байт), а конверт
+ключа данных в гибридном режиме RSA-2048 занимает 261 байт: запись завершалась ошибкой
+или ключ обрезался. Новый размер рассчитан на самый большой поддерживаемый модуль RSA
+(8192 бита): 1024 байта шифротекста и 5 байт заголовка конверта.
+"""
+from sqlalchemy import Column, LargeBinary
+from sqlalchemy.dialects.mysql import VARBINARY
+from sqlalchemy.engine import Connection
+from lockana.database.migrations.operations import modify_column
+
+revision = "0007"
+down_revision = "0006"
+description = "Размер secrets.data_key под RSA до 8192 бит"
+
+DATA_KEY_MAX_BYTES = 1029
+
+
+def upgrade(conn: Connection) -> None:
+    modify_column(
+        conn, "secrets",
+        Column("data_key", LargeBinary(DATA_KEY_MAX_BYTES).with_variant(VARBINARY(DATA_KEY_MAX_BYTES), "mysql"), nullable=True)
+    )
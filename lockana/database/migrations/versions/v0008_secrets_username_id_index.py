@@ -0,0 +1,19 @@
+"""
+Составной индекс secrets (username, id) для постраничного списка секретов.
+
+Список и выгрузка секретов выбирают записи пользователя по курсору
+(`WHERE username = ? AND id > ? ORDER BY id LIMIT n`). Индекс (username, name) не дает
+порядка по id: без нового индекса база читает все секреты пользователя и сортирует их
+на каждой странице. Индекс строится онлайн для MySQL.
+"""
+from sqlalchemy.engine import Connection
+from lockana.database.indexes import SECRETS_LIST_INDEX
+from lockana.database.migrations.operations import create_index
+
+revision = "0008"
+down_revision = "0007"
+description = "Индекс secrets (username, id)"
+
+
+def upgrade(conn: Connection) -> None:
+    create_index(conn, "secrets", SECRETS_LIST_INDEX, ("username", "id"))
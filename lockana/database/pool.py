@@ -0,0 +1,62 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from lockana.metrics import (
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_CHECKOUT_TIMEOUTS,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_SATURATION,
+)
+
+
+class _TimedPoolMixin:
+    """
+    Замеряет время ожидания соединения из пула и количество таймаутов.
+    """
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self.metrics_label).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def instrument_pool(engine, label: str) -> None:
+    """
+    Подписывается на события пула и обновляет метрики занятости соединений.
+
+    Параметры:
+        engine (Engine): Синхронный движок (для AsyncEngine - его `sync_engine`).
+        label (str): Метка движка в метриках.
+    """
+    def update(delta: int = 0):
+        # Пул пересоздается при engine.dispose(), поэтому берется текущий
+        pool = engine.pool
+        checked_out = max(pool.checkedout() + delta, 0)
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        DB_POOL_CHECKED_OUT.labels(label).set(checked_out)
+        DB_POOL_SATURATION.labels(label).set(checked_out / capacity if capacity else 0)
+
+    def on_checkout(*_):
+        update()
+
+    def on_checkin(*_):
+        # Событие checkin срабатывает до возврата соединения в пул
+        update(-1)
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
@@ -19,6 +19,7 @@ from .exceptions import (
     RateLimitError,
     InternalServerError,
     RateLimitExceededError,
+    ServiceUnavailableError,
     ResourceNotFoundError,
     InvalidTokenError,
     PermissionDeniedError
@@ -60,6 +61,7 @@ async def handle_http_exception(request: Request, exc: HTTPError):
     
     return JSONResponse(
         status_code=exc.status_code,
+        headers=exc.headers,
         content={
             "error": {
                 "code": error_code,
@@ -174,6 +176,7 @@ exception_handlers = {
     AuthenticationError: handle_http_exception,
     AuthorizationError: handle_http_exception,
     RateLimitExceededError: handle_http_exception,
+    ServiceUnavailableError: handle_http_exception,
     ResourceNotFoundError: handle_http_exception,
     InvalidTokenError: handle_http_exception,
     PermissionDeniedError: handle_permission_denied_error
@@ -107,10 +107,11 @@ class ConflictError(HTTPError):
 
 class RateLimitError(HTTPError):
     """Превышен лимит запросов"""
-    def __init__(self, detail: str = "Превышен лимит запросов"):
+    def __init__(self, detail: str = "Превышен лимит запросов", retry_after: Optional[int] = None):
         super().__init__(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=detail,
+            headers={"Retry-After": str(retry_after)} if retry_after is not None else None,
             code="RATE_LIMIT"
         )
 
@@ -123,6 +124,16 @@ class InternalServerError(HTTPError):
             code="INTERNAL_SERVER_ERROR"
         )
 
+class ServiceUnavailableError(HTTPError):
+    """Сервис временно перегружен"""
+    def __init__(self, detail: str = "Сервис временно недоступен", retry_after: int = 1):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+            code="SERVICE_UNAVAILABLE"
+        )
+
 class RateLimitExceededError(HTTPError):
     """Превышен лимит запросов для конкретного ресурса"""
     def __init__(self, detail: str = "Превышен лимит запросов для данного ресурса"):
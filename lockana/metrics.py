@@ -0,0 +1,90 @@
+import os
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+
+# Пул соединений с базой данных
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "lockana_db_pool_checkout_seconds",
+    "Время ожидания соединения из пула базы данных",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "lockana_db_pool_checkout_timeouts_total",
+    "Количество запросов соединения, завершившихся таймаутом пула",
+    ["engine"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "lockana_db_pool_checked_out",
+    "Количество соединений, выданных из пула",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SATURATION = Gauge(
+    "lockana_db_pool_saturation",
+    "Доля занятых соединений от pool_size + max_overflow",
+    ["engine"],
+    multiprocess_mode="livemax",
+)
+
+# Криптографические операции
+CRYPTO_OPERATION_SECONDS = Histogram(
+    "lockana_crypto_operation_seconds",
+    "Время выполнения криптографической операции (для пула процессов - вместе с ожиданием в пуле)",
+    ["operation", "mode"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+CRYPTO_QUEUE_WAIT_SECONDS = Histogram(
+    "lockana_crypto_queue_wait_seconds",
+    "Время ожидания места в очереди пула процессов криптографических операций",
+    ["operation"],
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+CRYPTO_PENDING = Gauge(
+    "lockana_crypto_pending",
+    "Количество операций, отправленных в пул процессов и ожидающих результата",
+    multiprocess_mode="livesum",
+)
+CRYPTO_REJECTED = Counter(
+    "lockana_crypto_rejected_total",
+    "Количество операций, отклоненных из-за заполненной очереди пула процессов",
+    ["operation"],
+)
+
+# Ограничение частоты запросов
+RATE_LIMITED = Counter(
+    "lockana_rate_limited_total",
+    "Количество запросов, отклоненных ограничением частоты (scope: local - лимит воркера, global - общий лимит в Redis)",
+    ["route_class", "scope"],
+)
+RATE_LIMIT_ERRORS = Counter(
+    "lockana_rate_limit_redis_errors_total",
+    "Количество ошибок Redis при проверке общего лимита (запрос пропускается по лимиту воркера)",
+)
+
+
+def render_metrics() -> tuple:
+    """
+    Формирует ответ для эндпоинта /metrics в формате Prometheus.
+
+    При запуске нескольких воркеров с переменной окружения PROMETHEUS_MULTIPROC_DIR
+    метрики собираются со всех процессов.
+
+    Возвращает:
+        tuple: Тело ответа (bytes) и значение заголовка Content-Type.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,5 +1,7 @@
 from .user import User
 from .secret import Secret
 from .log import Log
+from .key_rotation import KeyRotationJob
+from .api_key import ApiKey
 from .base import Base
 from .role_permissions import Role, Permission
\ No newline at end of file
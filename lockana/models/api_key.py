@@ -0,0 +1,46 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Optional, FrozenSet
+from .base import Base
+
+
+class ApiKey(Base):
+    """
+    Модель ключа API сервисной учетной записи.
+
+    Ключ показывается один раз при выпуске; в базе хранится только его HMAC-SHA256 хэш.
+    Открытая часть ключа (`key_id`) используется для поиска записи.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор записи.
+        key_id (str): Открытый идентификатор ключа (часть самого ключа).
+        key_hash (str): HMAC-SHA256 ключа в шестнадцатеричном виде.
+        username (str): Сервисная учетная запись, которой принадлежит ключ.
+        name (str): Описание ключа (например, "ci-deploy").
+        scopes (str): Разрешения через запятую, которыми ограничен ключ, или None (все права учетной записи).
+        created_at (datetime): Время выпуска ключа.
+        expires_at (datetime): Время истечения ключа или None (бессрочный).
+        revoked_at (datetime): Время отзыва ключа или None.
+
+    Таблица:
+        api_keys (table): Таблица ключей API.
+    """
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True)
+    key_id = Column(String(32), nullable=False, unique=True)
+    key_hash = Column(String(64), nullable=False)
+    username = Column(String(256), ForeignKey("users.username"), nullable=False, index=True)
+    name = Column(String(255), nullable=False)
+    scopes = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+    user = relationship("User", back_populates="api_keys")
+
+    @property
+    def scope_set(self) -> Optional[FrozenSet[str]]:
+        if self.scopes is None:
+            return None
+        return frozenset(scope for scope in self.scopes.split(",") if scope)
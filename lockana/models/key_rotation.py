@@ -0,0 +1,49 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text
+from datetime import datetime
+from .base import Base
+
+class KeyRotationJob(Base):
+    """
+    Модель задания перешифровки секретов (ротации ключей).
+
+    Задание обходит таблицу secrets пачками по возрастанию id и сохраняет контрольную точку
+    (`last_id` и счетчики) в той же транзакции, что и перешифрованные строки,
+    поэтому прерванное задание продолжается с места остановки.
+
+    Атрибуты:
+        id (int): Уникальный идентификатор задания.
+        status (str): Состояние: "running", "cancelling", "cancelled", "completed" или "failed".
+        mode (str): Режим: "auto" (только необходимая перешифровка) или "reencrypt" (новые ключи данных для всех секретов).
+        master_key_id (int): Мастер-ключ, которым шифруются ключи данных.
+        algorithm_id (int): Алгоритм шифрования данных.
+        last_id (int): Идентификатор последнего обработанного секрета.
+        processed (int): Количество обработанных секретов.
+        rewrapped (int): Количество ключей данных, перешифрованных новым мастер-ключом.
+        reencrypted (int): Количество секретов, перешифрованных новым ключом данных.
+        conflicts (int): Количество секретов, измененных во время обработки (пропущены).
+        failed (int): Количество секретов, которые не удалось расшифровать.
+        error (str): Текст ошибки, остановившей задание.
+        created_at (datetime): Время создания задания.
+        updated_at (datetime): Время последней контрольной точки.
+        finished_at (datetime): Время завершения задания.
+
+    Таблица:
+        key_rotation_jobs (table): Таблица заданий ротации ключей.
+    """
+    __tablename__ = "key_rotation_jobs"
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String(32), nullable=False, index=True)
+    mode = Column(String(32), nullable=False)
+    master_key_id = Column(Integer, nullable=False)
+    algorithm_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    rewrapped = Column(Integer, nullable=False, default=0)
+    reencrypted = Column(Integer, nullable=False, default=0)
+    conflicts = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,7 +1,14 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, func
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Index, LargeBinary, func
+from sqlalchemy.dialects.mysql import VARBINARY
 from sqlalchemy.orm import relationship
 from .base import Base
 
+# 16 МБ: в MySQL колонка создается как MEDIUMBLOB
+SECRET_CIPHERTEXT_MAX_BYTES = 16 * 1024 * 1024 - 1
+# Конверт ключа данных: заголовок (5 байт) и ключ, зашифрованный RSA-OAEP с самым большим
+# поддерживаемым модулем (RSA_MAX_KEY_BITS = 8192, 1024 байта); конверты AES-GCM короче
+DATA_KEY_MAX_BYTES = 5 + 8192 // 8
+
 class Secret(Base):
     """
     Модель для хранения зашифрованных данных пользователей.
@@ -12,9 +19,20 @@ class Secret(Base):
         id (int): Уникальный идентификатор записи секрета.
         username (str): Имя пользователя, которому принадлежит секрет. Ссылается на пользователя в таблице "users".
         name (str): Имя секрета. Это поле используется для идентификации секрета.
-        encrypted_data (str): Зашифрованные данные секрета.
+        ciphertext (bytes): Зашифрованные данные секрета в бинарном конверте (см. `lockana.crypto.envelope`).
+        data_key (bytes): Ключ данных секрета, зашифрованный мастер-ключом (см. `lockana.crypto.keyring`).
+            Пуст у записей, зашифрованных напрямую SECRET_KEY.
+        encrypted_data (str): Устаревший формат 'iv:ciphertext' в hex. Заполнен только у записей, которые
+            еще не были перешифрованы в бинарный конверт; у новых записей - пустая строка.
         created_at (datetime): Время создания секрета. По умолчанию - текущее время.
 
+    Индексы:
+        ux_secrets_username_name: Уникальный составной индекс (username, name). Обслуживает поиск
+            секрета владельца по имени и не допускает двух секретов с одним именем у пользователя.
+        ix_secrets_username_id: Составной индекс (username, id). Обслуживает постраничный список
+            и выгрузку секретов пользователя (`WHERE username = ? AND id > ? ORDER BY id LIMIT n`)
+            без сортировки и без чтения чужих записей.
+
     Связи:
         user (User): Связь с таблицей пользователей, где у каждого секрета есть один владелец.
     
@@ -22,11 +40,17 @@ class Secret(Base):
         secrets (table): Таблица для хранения записей секретов пользователей.
     """
     __tablename__ = "secrets"
+    __table_args__ = (
+        Index("ux_secrets_username_name", "username", "name", unique=True),
+        Index("ix_secrets_username_id", "username", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(256), ForeignKey("users.username"), nullable=False)
-    name = Column(String(255), nullable=False, index=True)
-    encrypted_data = Column(String(255), nullable=False)
+    name = Column(String(255), nullable=False)
+    ciphertext = Column(LargeBinary(SECRET_CIPHERTEXT_MAX_BYTES), nullable=True)
+    data_key = Column(LargeBinary(DATA_KEY_MAX_BYTES).with_variant(VARBINARY(DATA_KEY_MAX_BYTES), "mysql"), nullable=True)
+    encrypted_data = Column(String(255), nullable=False, default="")
     created_at = Column(DateTime, default=func.now())
 
     user = relationship("User", back_populates="secrets")
@@ -19,9 +19,11 @@ class User(Base):
         created_at (datetime): Время создания пользователя. По умолчанию - текущее время.
         role (str): Роль пользователя в системе. По умолчанию это "user".
         telegram_connection (int): Флаг, показывающий состояние подключения к Telegram. 0 - не подключён, 1 - подключён.
+        account_type (str): "user" - человек (вход по TOTP) или "service" - сервисная учетная запись (вход по ключу API).
 
     Связи:
         secrets (list of Secret): Список секретов пользователя. Связано с таблицей "secrets", где хранятся зашифрованные данные пользователя.
+        api_keys (list of ApiKey): Ключи API сервисной учетной записи.
     
     Таблица:
         users (table): Таблица для хранения пользователей системы.
@@ -34,4 +36,6 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     secrets = relationship("Secret", back_populates="user")
     roles = relationship("Role", secondary=user_roles, back_populates="users")
-    telegram_connection = Column(Integer, nullable=False, default=0)
\ No newline at end of file
+    telegram_connection = Column(Integer, nullable=False, default=0)
+    account_type = Column(String(16), nullable=False, default="user", server_default="user")
+    api_keys = relationship("ApiKey", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
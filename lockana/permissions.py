@@ -1,62 +1,342 @@
 from fastapi import Depends
 from sqlalchemy.orm import Session
-from lockana.api.v1.auth.jwt import oauth2_scheme, verify_jwt_token
-from lockana.database.database import get_db
-from lockana.models import User, Permission
+from lockana.api.v1.auth.jwt import oauth2_scheme, decode_jwt_token
+from lockana.api.v1.auth.api_keys import hash_api_key, is_api_key, parse_key_id
+from lockana.redis_client import redis_client, async_redis_client
+from lockana.database.database import get_db, run_db, sync_session
+from lockana.models import ApiKey, User, Role, Permission
+from lockana.cache import TTLCache
+from lockana.config import (
+    PERMISSIONS_CACHE_TTL_SECONDS,
+    PERMISSIONS_CACHE_MAX_SIZE,
+    PERMISSIONS_VERSION_CHECK_INTERVAL_SECONDS,
+    API_KEY_CACHE_TTL_SECONDS,
+    API_KEY_CACHE_MAX_SIZE
+)
 from lockana.exceptions import (
     InvalidTokenError,
-    ResourceNotFoundError,
     PermissionDeniedError
 )
+from datetime import datetime
 from functools import wraps
+import calendar
+import hmac
+import inspect
+from typing import Any, FrozenSet, Optional, Tuple
+import logging
+import threading
+import time
+
+
+PERMISSIONS_VERSION_KEY = "permissions_version"
+
+logger = logging.getLogger(__name__)
+
+
+class Principal:
+    """
+    Аутентифицированный субъект запроса: пользователь или сервисная учетная запись.
+
+    Создается один раз за запрос зависимостью `get_principal` и передается в маршруты
+    и декораторы проверки прав, поэтому токен декодируется и проверяется на отзыв один раз,
+    а роли и разрешения загружаются не более чем одним запросом к базе данных.
+
+    Атрибуты:
+        username (str): Имя пользователя из токена (для ключа API - имя сервисной учетной записи).
+        roles (FrozenSet[str]): Имена ролей пользователя.
+        permissions (FrozenSet[str]): Разрешения, предоставленные ролями пользователя.
+    """
+    __slots__ = ("username", "roles", "permissions")
 
+    def __init__(self, username: str, roles: FrozenSet[str], permissions: FrozenSet[str]):
+        self.username = username
+        self.roles = roles
+        self.permissions = permissions
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    username = verify_jwt_token(token)
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
+    @property
+    def is_admin(self) -> bool:
+        return "admin" in self.roles
+
+    def has_role(self, role_name: str) -> bool:
+        return self.is_admin or role_name in self.roles
+
+    def has_permission(self, permission_name: str) -> bool:
+        return self.is_admin or permission_name in self.permissions
+
+
+def load_principal(db: Session, username: str) -> Principal:
+    """
+    Загружает роли и разрешения пользователя одним запросом.
+
+    Параметры:
+        db (Session): Сессия базы данных.
+        username (str): Имя пользователя.
+
+    Возвращает:
+        Principal: Субъект с ролями и разрешениями пользователя.
+
+    Исключения:
+        InvalidTokenError: Если пользователь не найден.
+    """
+    rows = (
+        db.query(User.id, Role.name, Permission.name)
+        .select_from(User)
+        .outerjoin(User.roles)
+        .outerjoin(Role.permissions)
+        .filter(User.username == username)
+        .all()
+    )
+    if not rows:
         raise InvalidTokenError("Invalid token or user not found")
-    return user
 
+    roles = frozenset(role for _, role, _ in rows if role)
+    permissions = frozenset(perm for _, _, perm in rows if perm)
+    return Principal(username, roles, permissions)
+
+
+def scope_principal(principal: Principal, scopes: Optional[FrozenSet[str]]) -> Principal:
+    """
+    Ограничивает права субъекта разрешениями ключа API.
+
+    Ключ с ограничениями не получает полномочий роли admin: ему доступны только
+    перечисленные разрешения, которые есть у учетной записи.
+    """
+    if scopes is None:
+        return principal
+    allowed = scopes if principal.is_admin else principal.permissions & scopes
+    return Principal(principal.username, principal.roles - {"admin"}, frozenset(allowed))
+
+
+def load_api_key_principal(db: Session, api_key: str) -> Tuple[Principal, Optional[float]]:
+    """
+    Проверяет ключ API и загружает права его сервисной учетной записи.
+
+    Параметры:
+        db (Session): Сессия базы данных.
+        api_key (str): Ключ API из заголовка Authorization.
+
+    Возвращает:
+        Tuple[Principal, Optional[float]]: Субъект с правами, ограниченными ключом,
+        и время истечения ключа (Unix time) или None для бессрочного ключа.
+
+    Исключения:
+        InvalidTokenError: Если ключ неизвестен, отозван, истек или принадлежит не сервисной учетной записи.
+    """
+    key_id = parse_key_id(api_key)
+    if key_id is None:
+        raise InvalidTokenError("Invalid API key")
+    row = (
+        db.query(ApiKey)
+        .join(ApiKey.user)
+        .filter(ApiKey.key_id == key_id, User.account_type == "service")
+        .first()
+    )
+    if (
+        row is None
+        or not hmac.compare_digest(row.key_hash, hash_api_key(api_key))
+        or row.revoked_at is not None
+        or (row.expires_at is not None and row.expires_at <= datetime.utcnow())
+    ):
+        raise InvalidTokenError("Invalid API key")
+    expires_at = calendar.timegm(row.expires_at.utctimetuple()) if row.expires_at is not None else None
+    return scope_principal(load_principal(db, row.username), row.scope_set), expires_at
+
+
+class PermissionCache:
+    """
+    Кэш субъектов (ролей и разрешений) в памяти воркера.
+
+    Записи помечаются версией прав, которая хранится в Redis под ключом `permissions_version`.
+    Любое изменение ролей, разрешений или пользователей увеличивает версию через
+    `bump_permissions_version`, и все воркеры перестают использовать устаревшие записи,
+    не опрашивая MySQL. Версия запрашивается из Redis не чаще одного раза в
+    `version_check_interval` секунд.
+
+    Атрибуты:
+        version_check_interval (float): Интервал между проверками версии в Redis.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float, version_check_interval: float):
+        self.version_check_interval = float(version_check_interval)
+        self._entries = TTLCache(max_size, ttl_seconds)
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    async def current_version(self) -> Optional[int]:
+        """
+        Возвращает текущую версию прав или None, если Redis недоступен.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._version_checked_at < self.version_check_interval:
+                return self._version
+        try:
+            version = int(await async_redis_client.get(PERMISSIONS_VERSION_KEY) or 0)
+        except Exception as error:
+            logger.warning(f"Не удалось получить версию прав из Redis: {error}")
+            return None
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._version_checked_at = now
+        return version
+
+    async def get(self, username: str) -> Optional[Any]:
+        version = await self.current_version()
+        if version is None:
+            return None
+        entry = self._entries.get(username)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    async def set(self, username: str, principal: Any) -> None:
+        version = await self.current_version()
+        if version is not None:
+            self._entries.set(username, (version, principal))
+
+    def discard(self, username: str) -> None:
+        self._entries.pop(username)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = None
+        self._entries.clear()
+
+
+PERMISSION_CACHE = PermissionCache(
+    max_size=PERMISSIONS_CACHE_MAX_SIZE,
+    ttl_seconds=PERMISSIONS_CACHE_TTL_SECONDS,
+    version_check_interval=PERMISSIONS_VERSION_CHECK_INTERVAL_SECONDS
+)
+
+# Проверенные ключи API по их HMAC-хэшу: повторный запрос с тем же ключом не обращается к БД.
+# Отзыв ключа увеличивает версию прав и сбрасывает кэш во всех воркерах.
+API_KEY_CACHE = PermissionCache(
+    max_size=API_KEY_CACHE_MAX_SIZE,
+    ttl_seconds=API_KEY_CACHE_TTL_SECONDS,
+    version_check_interval=PERMISSIONS_VERSION_CHECK_INTERVAL_SECONDS
+)
+
+
+def bump_permissions_version() -> None:
+    """
+    Увеличивает версию прав в Redis, сбрасывая кэши прав во всех воркерах.
+
+    Вызывается после изменения пользователей, ролей или разрешений.
+    """
+    try:
+        redis_client.incr(PERMISSIONS_VERSION_KEY)
+    except Exception as error:
+        logger.error(f"Не удалось обновить версию прав в Redis: {error}")
+    PERMISSION_CACHE.invalidate()
+    API_KEY_CACHE.invalidate()
+
+
+async def bump_permissions_version_async() -> None:
+    """
+    Асинхронный вариант `bump_permissions_version` для маршрутов API.
+    """
+    try:
+        await async_redis_client.incr(PERMISSIONS_VERSION_KEY)
+    except Exception as error:
+        logger.error(f"Не удалось обновить версию прав в Redis: {error}")
+    PERMISSION_CACHE.invalidate()
+    API_KEY_CACHE.invalidate()
+
+
+async def get_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """
+    Зависимость FastAPI, возвращающая субъект текущего запроса.
+
+    FastAPI кэширует результат зависимости в пределах запроса, поэтому несколько
+    декораторов `check_permission` на одном маршруте используют один и тот же объект.
+    В установившемся режиме роли и разрешения берутся из `PERMISSION_CACHE` без запросов к БД.
+
+    Вместо JWT сервисная учетная запись передает ключ API (`lk_...`): проверенные ключи
+    кэшируются в `API_KEY_CACHE` по хэшу, поэтому повторный запрос стоит одного HMAC.
+    """
+    if is_api_key(token):
+        key_hash = hash_api_key(token)
+        entry = await API_KEY_CACHE.get(key_hash)
+        if entry is None:
+            entry = await run_db(db, load_api_key_principal, sync_session(db), token)
+            await API_KEY_CACHE.set(key_hash, entry)
+        principal, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            API_KEY_CACHE.discard(key_hash)
+            raise InvalidTokenError("Invalid API key")
+        return principal
+
+    payload = await decode_jwt_token(token)
+    username = str(payload["sub"])
+
+    principal = await PERMISSION_CACHE.get(username)
+    if principal is None:
+        principal = await run_db(db, load_principal, sync_session(db), username)
+        await PERMISSION_CACHE.set(username, principal)
+    return principal
 
-def get_user_permissions(user: User, db: Session):
-    if any(role.name == 'admin' for role in user.roles):
-        all_permissions = db.query(Permission.name).all()
-        return {perm[0] for perm in all_permissions}
-    
-    perms = set()
-    for role in user.roles:
-        perms.update({perm.name for perm in role.permissions})
-    return perms
 
 def require_permission(permission: str):
-    def permission_checker(user: User = Depends(get_current_user)):
-        user_permissions = get_user_permissions(user, get_db())
-        if permission not in user_permissions:
+    def permission_checker(principal: Principal = Depends(get_principal)) -> Principal:
+        if not principal.has_permission(permission):
             raise PermissionDeniedError("Operation not permitted for your role")
-        return user
+        return principal
     return permission_checker
 
+
+def _get_principal_argument(kwargs: dict) -> Principal:
+    principal = kwargs.get("principal")
+    if not isinstance(principal, Principal):
+        raise InvalidTokenError("Invalid token")
+    return principal
+
+
+def _principal_check(func, check):
+    """
+    Оборачивает маршрут (синхронный или асинхронный) проверкой субъекта запроса.
+    """
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            check(_get_principal_argument(kwargs))
+            return await func(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        check(_get_principal_argument(kwargs))
+        return func(*args, **kwargs)
+    return wrapper
+
+
 def check_permission(permission_name: str):
+    """
+    Декоратор маршрута, проверяющий наличие разрешения у субъекта запроса.
+
+    Маршрут должен объявлять параметр `principal: Principal = Depends(get_principal)`.
+    """
+    def check(principal: Principal):
+        if not principal.has_permission(permission_name):
+            raise PermissionDeniedError("Permission denied")
+
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db), **kwargs):
-            username = verify_jwt_token(token)
-            if not username:
-                raise InvalidTokenError("Invalid token")
-            
-            user = db.query(User).filter(User.username == username).first()
-            if not user:
-                raise ResourceNotFoundError("User not found")
-            
-            if any(role.name == 'admin' for role in user.roles):
-                return func(*args, token=token, db=db, **kwargs)
-            
-            user_permissions = get_user_permissions(user, db)
-            
-            if permission_name not in user_permissions:
-                raise PermissionDeniedError("Permission denied")
-
-            return func(*args, token=token, db=db, **kwargs)
-        return wrapper
-    return decorator
\ No newline at end of file
+        return _principal_check(func, check)
+    return decorator
+
+
+def check_role(role_name: str):
+    """
+    Декоратор маршрута, проверяющий наличие роли у субъекта запроса.
+
+    Маршрут должен объявлять параметр `principal: Principal = Depends(get_principal)`.
+    """
+    def check(principal: Principal):
+        if not principal.has_role(role_name):
+            raise PermissionDeniedError("Permission denied")
+
+    def decorator(func):
+        return _principal_check(func, check)
+    return decorator
@@ -0,0 +1,289 @@
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from fastapi.responses import JSONResponse
+from lockana.api.v1.auth.jwt import token_subject
+from lockana.api.v1.auth.api_keys import hash_api_key, is_api_key
+from lockana.cache import TTLCache
+from lockana.config import (
+    APP_PREFIX,
+    RATE_LIMIT_CLASSES,
+    RATE_LIMIT_GLOBAL,
+    RATE_LIMIT_LOCAL_CACHE_SIZE,
+    WHITELIST_IPS
+)
+from lockana.exceptions import RateLimitError
+from lockana.metrics import RATE_LIMITED, RATE_LIMIT_ERRORS
+from lockana.redis_client import async_redis_client
+
+logger = logging.getLogger(__name__)
+
+# GCRA для нескольких ключей за один вызов. Запрос пропускается, только если его допускают
+# все ключи; отклоненный запрос не расходует лимит ни одного ключа.
+# KEYS: ключи лимитов; ARGV: now, затем для каждого ключа interval и tolerance (в секундах).
+# Возвращает {1, "0"} или {0, "<retry_after>"}.
+_GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local retry_after = 0
+local tats = {}
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[2 * i])
+    local tolerance = tonumber(ARGV[2 * i + 1])
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - tolerance
+    if allow_at > now then
+        retry_after = math.max(retry_after, allow_at - now)
+    end
+    tats[i] = new_tat
+end
+if retry_after > 0 then
+    return {0, tostring(retry_after)}
+end
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], tostring(tats[i]), 'PX', math.ceil((tats[i] - now) * 1000))
+end
+return {1, "0"}
+"""
+
+# Сколько хранить проверенное имя пользователя для токена, секунд
+_PRINCIPAL_TTL_SECONDS = 60
+
+
+class RateLimit(NamedTuple):
+    """
+    Лимит частоты запросов.
+
+    Атрибуты:
+        rate (float): Запросов в секунду в среднем.
+        burst (int): Сколько запросов можно выполнить подряд без паузы.
+    """
+    rate: float
+    burst: int
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate
+
+    @property
+    def tolerance(self) -> float:
+        return self.interval * self.burst
+
+
+class GCRA:
+    """
+    Ограничитель частоты в памяти воркера (Generic Cell Rate Algorithm).
+
+    Для каждого ключа хранится одно число - теоретическое время прибытия следующего запроса (TAT),
+    поэтому алгоритм эквивалентен token bucket, но не требует периодического пополнения.
+    Записи хранятся в LRU кэше и удаляются, когда лимит ключа полностью восстановился.
+    """
+    def __init__(self, limit: RateLimit, max_size: int):
+        self.limit = limit
+        self._tat = TTLCache(max_size, limit.tolerance)
+        self._lock = threading.Lock()
+
+    def check(self, key: str, now: float) -> float:
+        """
+        Учитывает запрос.
+
+        Возвращает:
+            float: 0, если запрос разрешен, иначе через сколько секунд его можно повторить.
+        """
+        with self._lock:
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + self.limit.interval
+            allow_at = new_tat - self.limit.tolerance
+            if allow_at > now:
+                return allow_at - now
+            self._tat.set(key, new_tat)
+            return 0.0
+
+    def deny_until(self, key: str, until: float) -> None:
+        """
+        Запоминает отказ общего лимита: до `until` запросы ключа отклоняются без обращения к Redis.
+        """
+        with self._lock:
+            tat = until + self.limit.tolerance - self.limit.interval
+            if tat > self._tat.get(key, 0.0):
+                self._tat.set(key, tat)
+
+
+class RouteClass(NamedTuple):
+    """
+    Класс маршрутов с общими лимитами.
+
+    Атрибуты:
+        name (str): Имя класса (ключ в `rate_limit.classes`).
+        prefixes (Tuple[str, ...]): Префиксы путей, включая префикс API.
+        limits (Dict[str, GCRA]): Лимиты по измерениям "user" и "ip".
+    """
+    name: str
+    prefixes: Tuple[str, ...]
+    limits: Dict[str, GCRA]
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов к API по пользователю и IP-адресу для каждого класса маршрутов.
+
+    Запрос сначала проверяется лимитом в памяти воркера: клиент, превысивший лимит на одном
+    воркере, превысил и общий, поэтому получает отказ без обращения к Redis. Затем все ключи
+    запроса проверяются одним скриптом Lua в Redis - это общий лимит для всех воркеров.
+    Отказ Redis запоминается в памяти воркера до истечения `Retry-After`, поэтому клиент,
+    продолжающий слать запросы, не нагружает Redis. Если Redis недоступен, действует только
+    лимит воркера.
+
+    Атрибуты:
+        use_redis (bool): Проверять общий лимит в Redis.
+        whitelist_ips (List[str]): IP-адреса без ограничений.
+    """
+    def __init__(
+        self,
+        classes: dict,
+        prefix: str = APP_PREFIX,
+        whitelist_ips: List[str] = WHITELIST_IPS,
+        use_redis: bool = RATE_LIMIT_GLOBAL,
+        cache_size: int = RATE_LIMIT_LOCAL_CACHE_SIZE,
+        redis_client=async_redis_client
+    ):
+        self.prefix = prefix.rstrip("/")
+        self.whitelist_ips = set(whitelist_ips or [])
+        self.use_redis = use_redis
+        self._classes: List[RouteClass] = []
+        self._default: Optional[RouteClass] = None
+        for name, options in classes.items():
+            limits = {
+                dimension: GCRA(RateLimit(float(options[dimension]["rate"]), int(options[dimension]["burst"])), cache_size)
+                for dimension in ("user", "ip") if options.get(dimension)
+            }
+            route_class = RouteClass(name, tuple(self.prefix + p for p in options.get("prefixes", [])), limits)
+            if name == "default":
+                self._default = route_class
+            else:
+                self._classes.append(route_class)
+        self._principals = TTLCache(cache_size, _PRINCIPAL_TTL_SECONDS)
+        self._script = redis_client.register_script(_GCRA_LUA) if use_redis else None
+        self._redis_failing = False
+
+    def route_class(self, path: str) -> Optional[RouteClass]:
+        """
+        Возвращает класс маршрута или None для путей вне API (документация, метрики).
+        """
+        if not path.startswith(self.prefix + "/"):
+            return None
+        for route_class in self._classes:
+            if any(path == p or path.startswith(p + "/") for p in route_class.prefixes):
+                return route_class
+        return self._default
+
+    async def check(self, scope: dict) -> Tuple[Optional[str], float]:
+        """
+        Проверяет лимиты запроса.
+
+        Возвращает:
+            Tuple[Optional[str], float]: Класс маршрута и 0, если запрос разрешен,
+            иначе через сколько секунд его можно повторить.
+        """
+        route_class = self.route_class(scope.get("path", ""))
+        if route_class is None or not route_class.limits:
+            return None, 0.0
+        client_ip = scope["client"][0] if scope.get("client") else "???"
+        if client_ip in self.whitelist_ips:
+            return route_class.name, 0.0
+
+        identities = {"ip": client_ip}
+        if "user" in route_class.limits:
+            username = self._principal(scope)
+            if username:
+                identities["user"] = username
+
+        now = time.time()
+        checks = [
+            (f"rate:{route_class.name}:{dimension}:{identity}", route_class.limits[dimension])
+            for dimension, identity in identities.items() if dimension in route_class.limits
+        ]
+        if not checks:
+            return route_class.name, 0.0
+        retry_after = max([limit.check(key, now) for key, limit in checks])
+        if retry_after:
+            RATE_LIMITED.labels(route_class.name, "local").inc()
+            return route_class.name, retry_after
+        if self._script is None:
+            return route_class.name, 0.0
+
+        retry_after = await self._check_global(checks, now)
+        if retry_after:
+            RATE_LIMITED.labels(route_class.name, "global").inc()
+            for key, limit in checks:
+                limit.deny_until(key, now + retry_after)
+        return route_class.name, retry_after
+
+    async def _check_global(self, checks: List[Tuple[str, GCRA]], now: float) -> float:
+        args = [now]
+        for _, limit in checks:
+            args.extend((limit.limit.interval, limit.limit.tolerance))
+        try:
+            allowed, retry_after = await self._script(keys=[key for key, _ in checks], args=args)
+        except Exception as error:
+            RATE_LIMIT_ERRORS.inc()
+            if not self._redis_failing:
+                self._redis_failing = True
+                logger.warning(f"Общий лимит запросов недоступен, действует лимит воркера: {error}")
+            return 0.0
+        if self._redis_failing:
+            self._redis_failing = False
+            logger.info("Общий лимит запросов снова проверяется в Redis")
+        return 0.0 if int(allowed) else float(retry_after)
+
+    def _principal(self, scope: dict) -> Optional[str]:
+        # Имя пользователя берется только из токена с действительной подписью, иначе чужим
+        # именем можно было бы израсходовать лимит другого пользователя
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                username = self._principals.get(token)
+                if username is None:
+                    if is_api_key(token):
+                        # Ключ API здесь не проверяется: лимит считается по его хэшу,
+                        # поэтому поддельный ключ не расходует лимит настоящего
+                        username = "key:" + hash_api_key(token)[:32]
+                    else:
+                        username = token_subject(token) or ""
+                    self._principals.set(token, username)
+                return username or None
+        return None
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware, отклоняющий запросы сверх лимита ответом 429 с заголовком `Retry-After`.
+    """
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or RateLimiter(RATE_LIMIT_CLASSES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        _, retry_after = await self.limiter.check(scope)
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+        # Ответ в формате обработчика HTTPError, но без записи в журнал на каждый отказ
+        error = RateLimitError(detail="Too many requests, retry later", retry_after=max(math.ceil(retry_after), 1))
+        response = JSONResponse(
+            status_code=error.status_code,
+            headers=error.headers,
+            content={"error": {"code": error.code, "message": error.detail, "type": type(error).__name__}}
+        )
+        await response(scope, receive, send)
+
@@ -0,0 +1,137 @@
+from typing import List, Tuple
+import redis
+import redis.asyncio
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+from lockana.config import (
+    REDIS_MODE,
+    REDIS_URL,
+    REDIS_PASSWORD,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_RETRY_ATTEMPTS,
+    REDIS_RETRY_BACKOFF_BASE,
+    REDIS_RETRY_BACKOFF_CAP,
+    REDIS_SENTINEL_MASTER_NAME,
+    REDIS_SENTINEL_NODES,
+    REDIS_SENTINEL_PASSWORD
+)
+
+REDIS_MODES = ("standalone", "sentinel", "fake")
+
+# Общий сервер fakeredis для синхронного и асинхронного клиентов в режиме fake
+_FAKE_SERVER = None
+
+
+def _sentinel_nodes() -> List[Tuple[str, int]]:
+    nodes = []
+    for node in REDIS_SENTINEL_NODES:
+        host, _, port = str(node).rpartition(":")
+        nodes.append((host, int(port)))
+    return nodes
+
+
+def _connection_options(retry_class) -> dict:
+    """
+    Параметры соединений пула: таймауты, проверка соединения и повтор с экспоненциальной задержкой.
+    """
+    return {
+        "password": REDIS_PASSWORD,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "retry": retry_class(
+            ExponentialBackoff(cap=REDIS_RETRY_BACKOFF_CAP, base=REDIS_RETRY_BACKOFF_BASE),
+            REDIS_RETRY_ATTEMPTS
+        ),
+        "retry_on_error": [ConnectionError, TimeoutError],
+        "decode_responses": True,
+    }
+
+
+def _sentinel_options() -> dict:
+    return {
+        "password": REDIS_SENTINEL_PASSWORD,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+    }
+
+
+def _fakeredis():
+    global _FAKE_SERVER
+    try:
+        import fakeredis
+    except ImportError:
+        raise RuntimeError("Для redis.mode: fake нужен fakeredis: pip install fakeredis[lua]")
+    if _FAKE_SERVER is None:
+        _FAKE_SERVER = fakeredis.FakeServer()
+    return fakeredis, _FAKE_SERVER
+
+
+def create_redis_client() -> redis.Redis:
+    """
+    Создает синхронный клиент Redis по секции `redis` конфигурации.
+
+    В режиме standalone используется `BlockingConnectionPool`: не более `max_connections`
+    соединений, а запрос, не получивший соединение за `pool_timeout`, завершается ошибкой,
+    вместо того чтобы открывать новые соединения к перегруженному Redis. В режиме sentinel
+    адрес мастера запрашивается у Sentinel и обновляется при переключении. Режим fake
+    (fakeredis в памяти процесса) предназначен для разработки и бенчмарков.
+
+    Возвращает:
+        redis.Redis: Клиент.
+
+    Исключения:
+        ValueError: Если режим не поддерживается.
+    """
+    if REDIS_MODE == "fake":
+        fakeredis, server = _fakeredis()
+        return fakeredis.FakeRedis(server=server, decode_responses=True)
+    options = _connection_options(Retry)
+    if REDIS_MODE == "sentinel":
+        from redis.sentinel import Sentinel
+        sentinel = Sentinel(
+            _sentinel_nodes(),
+            sentinel_kwargs=_sentinel_options(),
+        )
+        return sentinel.master_for(REDIS_SENTINEL_MASTER_NAME, max_connections=REDIS_MAX_CONNECTIONS, **options)
+    if REDIS_MODE == "standalone":
+        pool = redis.BlockingConnectionPool.from_url(
+            REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT, **options
+        )
+        return redis.Redis(connection_pool=pool)
+    raise ValueError(f"Неподдерживаемый режим Redis: {REDIS_MODE} (допустимы: {', '.join(REDIS_MODES)})")
+
+
+def create_async_redis_client() -> redis.asyncio.Redis:
+    """
+    Создает асинхронный клиент Redis с теми же параметрами, что и `create_redis_client`.
+    """
+    if REDIS_MODE == "fake":
+        fakeredis, server = _fakeredis()
+        return fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    options = _connection_options(AsyncRetry)
+    if REDIS_MODE == "sentinel":
+        from redis.asyncio.sentinel import Sentinel
+        sentinel = Sentinel(
+            _sentinel_nodes(),
+            sentinel_kwargs=_sentinel_options(),
+        )
+        return sentinel.master_for(REDIS_SENTINEL_MASTER_NAME, max_connections=REDIS_MAX_CONNECTIONS, **options)
+    if REDIS_MODE == "standalone":
+        pool = redis.asyncio.BlockingConnectionPool.from_url(
+            REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT, **options
+        )
+        return redis.asyncio.Redis(connection_pool=pool)
+    raise ValueError(f"Неподдерживаемый режим Redis: {REDIS_MODE} (допустимы: {', '.join(REDIS_MODES)})")
+
+
+# Синхронный клиент для CLI-скриптов и синхронного кода, асинхронный - для маршрутов API.
+# Соединения открываются при первом запросе, а не при импорте.
+redis_client = create_redis_client()
+async_redis_client = create_async_redis_client()
@@ -0,0 +1,292 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from lockana.config import (
+    ROTATION_BATCH_SIZE,
+    ROTATION_WORKERS,
+    ROTATION_MAX_ROWS_PER_SECOND,
+    ROTATION_STALE_AFTER_SECONDS
+)
+from lockana.crypto import DEFAULT_ENGINE, KEYRING, rotate_secret
+from lockana.database.database import _db_instance
+from lockana.exceptions import ConflictError, ResourceNotFoundError
+from lockana.models import KeyRotationJob, Secret
+
+logger = logging.getLogger(__name__)
+
+ROTATION_MODES = ("auto", "reencrypt")
+ACTIVE_STATUSES = ("running", "cancelling")
+# Счетчик задания для каждого действия `rotate_secret`
+_ACTION_COUNTERS = {"rewrap": "rewrapped", "reencrypt": "reencrypted"}
+
+# (id, ciphertext, encrypted_data, data_key)
+SecretRow = Tuple[int, Optional[bytes], str, Optional[bytes]]
+
+
+def _rotate_rows(rows: Sequence[SecretRow], reencrypt: bool) -> List[tuple]:
+    """
+    Перешифровывает пачку секретов. Выполняется в процессе пула.
+
+    Возвращает:
+        List[tuple]: (id, прежний ключ данных, действие, новый конверт данных, новый ключ данных, текст ошибки).
+    """
+    results = []
+    for secret_id, ciphertext, encrypted_data, data_key in rows:
+        try:
+            stored = ciphertext if ciphertext is not None else encrypted_data
+            action, new_ciphertext, new_data_key = rotate_secret(stored, data_key, reencrypt)
+            results.append((secret_id, data_key, action, new_ciphertext, new_data_key, None))
+        except Exception as error:
+            results.append((secret_id, data_key, "failed", None, None, f"{type(error).__name__}: {error}"))
+    return results
+
+
+def job_to_dict(job: KeyRotationJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "mode": job.mode,
+        "master_key_id": job.master_key_id,
+        "algorithm_id": job.algorithm_id,
+        "last_id": job.last_id,
+        "processed": job.processed,
+        "rewrapped": job.rewrapped,
+        "reencrypted": job.reencrypted,
+        "conflicts": job.conflicts,
+        "failed": job.failed,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def create_rotation_job(session: Session, mode: str = "auto") -> KeyRotationJob:
+    """
+    Создает задание ротации ключей под текущие активный мастер-ключ и алгоритм.
+
+    Параметры:
+        session (Session): Сессия базы данных (коммит выполняет вызывающий код).
+        mode (str): "auto" или "reencrypt".
+
+    Возвращает:
+        KeyRotationJob: Новое задание.
+
+    Исключения:
+        ValueError: Если режим не поддерживается.
+        ConflictError: Если уже есть выполняющееся задание.
+    """
+    if mode not in ROTATION_MODES:
+        raise ValueError(f"Unsupported rotation mode: {mode}")
+    active = session.query(KeyRotationJob.id).filter(KeyRotationJob.status.in_(ACTIVE_STATUSES)).first()
+    if active:
+        raise ConflictError(detail=f"Key rotation job {active.id} is already running")
+    job = KeyRotationJob(
+        status="running",
+        mode=mode,
+        master_key_id=KEYRING.active_key_id,
+        algorithm_id=DEFAULT_ENGINE.alg_id,
+        last_id=0, processed=0, rewrapped=0, reencrypted=0, conflicts=0, failed=0
+    )
+    session.add(job)
+    session.flush()
+    logger.info(f"Создано задание ротации ключей {job.id} (режим {mode})")
+    return job
+
+
+def claim_rotation_job(session: Session, job_id: int) -> KeyRotationJob:
+    """
+    Переводит прерванное задание в состояние "running" для продолжения с контрольной точки.
+
+    Продолжить можно остановленное или завершившееся ошибкой задание, а также задание
+    в состоянии "running", контрольная точка которого не обновлялась дольше
+    `rotation.stale_after_seconds` (процесс, выполнявший его, остановлен).
+
+    Исключения:
+        ResourceNotFoundError: Если задание не найдено.
+        ConflictError: Если задание завершено, выполняется или настроено под другие ключи.
+    """
+    job = session.get(KeyRotationJob, job_id)
+    if job is None:
+        raise ResourceNotFoundError(detail="Key rotation job not found")
+    if job.status == "completed":
+        raise ConflictError(detail="Key rotation job is already completed")
+    if job.status in ACTIVE_STATUSES and job.updated_at > datetime.utcnow() - timedelta(seconds=ROTATION_STALE_AFTER_SECONDS):
+        raise ConflictError(detail="Key rotation job is still running")
+    if (job.master_key_id, job.algorithm_id) != (KEYRING.active_key_id, DEFAULT_ENGINE.alg_id):
+        raise ConflictError(detail="Encryption settings changed since the job was created, start a new job")
+    job.status = "running"
+    job.error = None
+    job.finished_at = None
+    job.updated_at = datetime.utcnow()
+    session.flush()
+    return job
+
+
+def cancel_rotation_job(session: Session, job_id: int) -> KeyRotationJob:
+    """
+    Запрашивает остановку задания. Задание останавливается после текущей пачки.
+    """
+    job = session.get(KeyRotationJob, job_id)
+    if job is None:
+        raise ResourceNotFoundError(detail="Key rotation job not found")
+    if job.status == "running":
+        job.status = "cancelling"
+        session.flush()
+    return job
+
+
+class KeyRotationRunner:
+    """
+    Выполняет задание ротации ключей.
+
+    Таблица secrets обходится пачками по возрастанию id (keyset pagination), каждая
+    пачка расшифровывается и шифруется заново в пуле процессов, затем записывается
+    с оптимистичной блокировкой: строка обновляется, только если ее ключ данных не изменился
+    после чтения (каждая запись секрета создает новый ключ данных, поэтому он служит версией строки).
+    Измененные за это время строки пропускаются - они уже зашифрованы текущими ключами.
+    Контрольная точка сохраняется в той же транзакции, что и пачка, а скорость
+    ограничивается `max_rows_per_second`, чтобы не мешать основной нагрузке.
+
+    Атрибуты:
+        batch_size (int): Количество секретов в пачке.
+        workers (int): Количество процессов пула (1 - без пула, в текущем процессе).
+        max_rows_per_second (float): Ограничение скорости (0 - без ограничения).
+    """
+    def __init__(
+        self,
+        batch_size: int = ROTATION_BATCH_SIZE,
+        workers: int = ROTATION_WORKERS,
+        max_rows_per_second: float = ROTATION_MAX_ROWS_PER_SECOND,
+        session_factory=None
+    ):
+        self.batch_size = max(int(batch_size), 1)
+        self.workers = max(int(workers or multiprocessing.cpu_count() or 1), 1)
+        self.max_rows_per_second = float(max_rows_per_second or 0)
+        self._session_factory = session_factory or _db_instance.SessionLocal
+
+    def run(self, job_id: int) -> dict:
+        """
+        Выполняет задание до конца, остановки или ошибки.
+
+        Возвращает:
+            dict: Итоговое состояние задания.
+        """
+        logger.info(f"Запуск задания ротации ключей {job_id}")
+        pool = None
+        if self.workers > 1:
+            # spawn: пул может создаваться из воркера API, в котором уже есть потоки
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            return self._run(job_id, pool)
+        except Exception as error:
+            logger.error(f"Задание ротации ключей {job_id} завершилось ошибкой: {error}")
+            with self._session_factory() as session:
+                job = session.get(KeyRotationJob, job_id)
+                job.status = "failed"
+                job.error = str(error)
+                job.updated_at = datetime.utcnow()
+                session.commit()
+                return job_to_dict(job)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def run_in_background(self, job_id: int) -> threading.Thread:
+        """
+        Запускает задание в фоновом потоке текущего процесса.
+        """
+        thread = threading.Thread(target=self.run, args=(job_id,), name=f"key-rotation-{job_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self, job_id: int, pool: Optional[ProcessPoolExecutor]) -> dict:
+        started = time.monotonic()
+        rows_done = 0
+        while True:
+            with self._session_factory() as session:
+                job = session.get(KeyRotationJob, job_id)
+                if job.status == "cancelling":
+                    job.status = "cancelled"
+                    job.finished_at = job.updated_at = datetime.utcnow()
+                    session.commit()
+                    logger.info(f"Задание ротации ключей {job_id} остановлено на id {job.last_id}")
+                    return job_to_dict(job)
+                rows = session.execute(
+                    select(Secret.id, Secret.ciphertext, Secret.encrypted_data, Secret.data_key)
+                    .where(Secret.id > job.last_id)
+                    .order_by(Secret.id)
+                    .limit(self.batch_size)
+                ).all()
+                if not rows:
+                    job.status = "completed"
+                    job.finished_at = job.updated_at = datetime.utcnow()
+                    session.commit()
+                    logger.info(
+                        f"Задание ротации ключей {job_id} завершено: обработано {job.processed}, "
+                        f"перешифровано ключей {job.rewrapped}, секретов {job.reencrypted}, "
+                        f"конфликтов {job.conflicts}, ошибок {job.failed}"
+                    )
+                    return job_to_dict(job)
+                reencrypt = job.mode == "reencrypt"
+
+            results = self._process([tuple(row) for row in rows], reencrypt, pool)
+            self._write_batch(job_id, rows[-1].id, results)
+
+            rows_done += len(rows)
+            self._throttle(started, rows_done)
+
+    def _process(self, rows: List[SecretRow], reencrypt: bool, pool: Optional[ProcessPoolExecutor]) -> List[tuple]:
+        if pool is None:
+            return _rotate_rows(rows, reencrypt)
+        chunk_size = -(-len(rows) // self.workers)
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        return [result for chunk in pool.map(_rotate_rows, chunks, repeat(reencrypt)) for result in chunk]
+
+    def _write_batch(self, job_id: int, last_id: int, results: List[tuple]) -> None:
+        counters = {"rewrapped": 0, "reencrypted": 0, "conflicts": 0, "failed": 0}
+        with self._session_factory() as session:
+            for secret_id, old_data_key, action, new_ciphertext, new_data_key, error in results:
+                if action == "skip":
+                    continue
+                if action == "failed":
+                    counters["failed"] += 1
+                    logger.error(f"Не удалось перешифровать секрет {secret_id}: {error}")
+                    continue
+
+                values = {"data_key": new_data_key}
+                if action == "reencrypt":
+                    values.update(ciphertext=new_ciphertext, encrypted_data="")
+                unchanged = Secret.data_key.is_(None) if old_data_key is None else Secret.data_key == old_data_key
+                statement = (
+                    update(Secret)
+                    .where(Secret.id == secret_id, unchanged)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                if session.execute(statement).rowcount:
+                    counters[_ACTION_COUNTERS[action]] += 1
+                else:
+                    counters["conflicts"] += 1
+
+            job = session.get(KeyRotationJob, job_id)
+            job.last_id = last_id
+            job.processed += len(results)
+            for name, value in counters.items():
+                setattr(job, name, getattr(job, name) + value)
+            job.updated_at = datetime.utcnow()
+            session.commit()
+
+    def _throttle(self, started: float, rows_done: int) -> None:
+        if self.max_rows_per_second <= 0:
+            return
+        delay = rows_done / self.max_rows_per_second - (time.monotonic() - started)
+        if delay > 0:
+            time.sleep(delay)
@@ -1,8 +1,22 @@
+import math
 import pyotp
 import base64
 import secrets
-from lockana.config import TOTP_CODE_LEN, TOTP_SECRET_LEN, TOTP_MINIMAL_SECRET_LEN
+import time
+from typing import Dict, Optional
+from lockana.cache import TTLCache
+from lockana.config import (
+    TOTP_CODE_LEN,
+    TOTP_SECRET_LEN,
+    TOTP_MINIMAL_SECRET_LEN,
+    TOTP_VALID_WINDOW,
+    TOTP_CODE_CACHE_SIZE
+)
 from lockana.exceptions import TOTPCodeError, TOTPSecretError
+from lockana.redis_client import async_redis_client
+
+# Длительность шага TOTP в секундах (стандартное значение приложений-аутентификаторов)
+TOTP_INTERVAL = 30
 
 
 class TOTPManager:
@@ -15,6 +29,7 @@ class TOTPManager:
         totp_code_len (int): Длина генерируемых TOTP кодов. По умолчанию 6 символов.
         totp_secre_len (int): Длина создаваемого TOTP секрета в байтах. По умолчанию 6 байтов.
         totp_minimal_secret_len (int): Минимальная длина секрета TOTP. Секреты короче этого значения считаются недействительными.
+        valid_window (int): Сколько соседних шагов принимается в каждую сторону при расхождении часов.
 
     Методы:
         create_totp(secret: str) -> pyotp.TOTP:
@@ -23,16 +38,26 @@ class TOTPManager:
         check_totp_code(totp_code: str, secret: str) -> bool:
             Проверяет, является ли введённый TOTP код действительным для данного секрета.
 
+        match_totp_code(totp_code: str, secret: str) -> Optional[int]:
+            Возвращает шаг, которому соответствует код, или None.
+
+        consume_totp_code(totp_code: str, secret: str, username: str) -> bool:
+            Проверяет код и отмечает его использованным, отклоняя повторное использование.
+
         create_totp_secret() -> str:
             Генерирует случайный TOTP секрет, который может быть использован для создания одноразовых паролей.
     """
-    def __init__(self):
+    def __init__(self, valid_window: int = TOTP_VALID_WINDOW, code_cache_size: int = TOTP_CODE_CACHE_SIZE):
         """
         Инициализирует менеджер TOTP с дефолтными значениями для длины кода и секрета.
         """
         self.totp_code_len: int = int(TOTP_CODE_LEN)
         self.totp_secret_len: int = int(TOTP_SECRET_LEN)
         self.totp_minimal_secret_len: int = int(TOTP_MINIMAL_SECRET_LEN)
+        self.valid_window: int = max(int(valid_window), 0)
+        # Коды текущего и соседних шагов по (секрет, шаг): повторные попытки против одного
+        # секрета в пределах шага стоят поиска в словаре вместо вычисления HMAC
+        self._codes = TTLCache(code_cache_size, TOTP_INTERVAL)
 
     def create_totp(self, secret: str) -> pyotp.TOTP:
         """
@@ -72,12 +97,70 @@ class TOTPManager:
         if len(totp_code) != self.totp_code_len:
             raise TOTPCodeError('Некорректный код TOTP (длина не соответствует требуемой)!')
 
-        totp = self.create_totp(secret)
-        if totp.verify(totp_code):
-            return True
-        else:
+        return self.match_totp_code(totp_code, secret) is not None
+
+    def match_totp_code(self, totp_code: str, secret: str, for_time: Optional[float] = None) -> Optional[int]:
+        """
+        Ищет шаг TOTP, код которого совпадает с переданным.
+
+        Принимаются коды текущего шага и `valid_window` соседних шагов в каждую сторону.
+        Коды вычисляются один раз за шаг для каждого секрета и кэшируются.
+
+        Аргументы:
+            totp_code (str): Код TOTP для проверки.
+            secret (str): Секрет, используемый для генерации TOTP.
+            for_time (Optional[float]): Время проверки (Unix time), по умолчанию текущее.
+
+        Возвращает:
+            Optional[int]: Номер шага, которому соответствует код, или None.
+
+        Исключения:
+            TOTPSecretError: Если длина секрета меньше минимально допустимой.
+        """
+        step = int((time.time() if for_time is None else for_time) // TOTP_INTERVAL)
+        codes: Optional[Dict[str, int]] = self._codes.get((secret, step))
+        if codes is None:
+            totp = self.create_totp(secret)
+            codes = {}
+            # Текущий шаг записывается последним и имеет приоритет при совпадении кодов
+            for offset in sorted(range(-self.valid_window, self.valid_window + 1), key=abs, reverse=True):
+                codes[totp.generate_otp(step + offset)] = step + offset
+            self._codes.set((secret, step), codes)
+        return codes.get(totp_code)
+
+    async def consume_totp_code(self, totp_code: str, secret: str, username: str) -> bool:
+        """
+        Проверяет код TOTP и отмечает его использованным.
+
+        Использованный код хранится в Redis (`totp_used:<пользователь>:<шаг>`) до конца окна,
+        в котором он принимается, поэтому перехваченный код нельзя предъявить повторно.
+
+        Аргументы:
+            totp_code (str): Код TOTP для проверки.
+            secret (str): Секрет пользователя.
+            username (str): Имя пользователя.
+
+        Возвращает:
+            bool: True, если код верен и используется впервые, иначе False.
+
+        Исключения:
+            TOTPSecretError: Если длина секрета меньше минимально допустимой.
+            TOTPCodeError: Если длина кода TOTP не соответствует ожидаемой.
+        """
+        if len(secret) < self.totp_minimal_secret_len:
+            raise TOTPSecretError('Некорректный секрет TOTP (длина меньше требуемой)!')
+        if len(totp_code) != self.totp_code_len:
+            raise TOTPCodeError('Некорректный код TOTP (длина не соответствует требуемой)!')
+
+        now = time.time()
+        step = self.match_totp_code(totp_code, secret, now)
+        if step is None:
             return False
-        
+        # Код шага step принимается до конца шага step + valid_window
+        ttl = max(math.ceil((step + self.valid_window + 1) * TOTP_INTERVAL - now), 1)
+        return bool(await async_redis_client.set(f"totp_used:{username}:{step}", "1", nx=True, ex=ttl))
+
+
     def create_totp_secret(self):
         """
         Генерирует случайный TOTP секрет для дальнейшего использования.
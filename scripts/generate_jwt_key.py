@@ -0,0 +1,54 @@
+"""
+Генерация ключа подписи JWT (jwt.signing_keys).
+
+Запуск:
+    python3 -m scripts.generate_jwt_key --kid 2026-10                  # EdDSA (Ed25519)
+    python3 -m scripts.generate_jwt_key --kid 2026-10 --algorithm ES256
+
+Создает keys/jwt_<kid>.pem (закрытый ключ) и keys/jwt_<kid>.pub.pem (открытый ключ)
+и печатает фрагмент config.yaml. Закрытый ключ шифруется паролем из переменной
+окружения JWT_SIGNING_KEY_PASSWORD, если она задана.
+"""
+import argparse
+import os
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Генерация ключа подписи JWT")
+    parser.add_argument("--kid", required=True, help="Идентификатор ключа (заголовок kid)")
+    parser.add_argument("--algorithm", choices=["EdDSA", "ES256"], default="EdDSA", help="Алгоритм подписи")
+    parser.add_argument("--output-dir", default="keys", help="Каталог для файлов ключей")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    private_key = generate_private_key(args.algorithm)
+    password = os.getenv("JWT_SIGNING_KEY_PASSWORD", "").encode()
+    encryption = serialization.BestAvailableEncryption(password) if password else serialization.NoEncryption()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    private_path = os.path.join(args.output_dir, f"jwt_{args.kid}.pem")
+    public_path = os.path.join(args.output_dir, f"jwt_{args.kid}.pub.pem")
+    with open(os.open(private_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as key_file:
+        key_file.write(private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, encryption))
+    with open(public_path, "wb") as key_file:
+        key_file.write(private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+
+    print(f"✅ Закрытый ключ: {private_path}, открытый ключ: {public_path}")
+    print("Добавьте в секцию jwt файла config.yaml:")
+    print(f"  active_key_id: \"{args.kid}\"")
+    print("  signing_keys:")
+    print(f"    - kid: \"{args.kid}\"")
+    print(f"      algorithm: {args.algorithm}")
+    print(f"      private_key_file: {private_path}")
@@ -0,0 +1,41 @@
+"""
+Перенос отозванных токенов из множества `blacklisted_tokens` в `revoked_tokens`.
+
+Раньше выход из системы добавлял полный токен в множество, которое никогда не очищалось.
+Теперь отзыв хранится по `jti` токена в sorted set с временем истечения, а истекшие записи
+удаляются. Скрипт переносит еще действующие токены и удаляет множество по мере обработки,
+поэтому его можно прервать и запустить повторно.
+
+Запуск (после обновления всех воркеров):
+    python3 -m scripts.migrate_revoked_tokens
+    python3 -m scripts.migrate_revoked_tokens --check   # сколько токенов осталось в старом множестве
+
+Код возврата 1 означает, что в старом множестве остались токены.
+"""
+import argparse
+import sys
+from lockana.api.v1.auth.jwt import BLACKLISTED_TOKENS, migrate_legacy_blacklist
+from lockana.redis_client import redis_client
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Перенос отозванных токенов в revoked_tokens")
+    parser.add_argument(
+        "--batch-size", type=int, default=1000,
+        help="Количество токенов, переносимых за одну транзакцию"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Только показать количество токенов в старом множестве"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.check:
+        migrated, dropped = migrate_legacy_blacklist(args.batch_size)
+        print(f"✅ Перенесено действующих токенов: {migrated}, отброшено истекших и недействительных: {dropped}")
+    remaining = redis_client.scard(BLACKLISTED_TOKENS)
+    print(f"Осталось в {BLACKLISTED_TOKENS}: {remaining}")
+    sys.exit(0 if remaining == 0 else 1)
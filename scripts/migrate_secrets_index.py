@@ -0,0 +1,70 @@
+"""
+Подготовка и проверка индексов secrets: уникального (username, name) и (username, id).
+
+Сами индексы создаются миграциями 0002 и 0008 (`python app.py migrate`). Этот скрипт находит
+дубликаты, которые мешают миграции 0002, и проверяет планы запросов после миграций.
+
+Запуск:
+    python3 -m scripts.migrate_secrets_index            # показать дубликаты
+    python3 -m scripts.migrate_secrets_index --rename-duplicates
+    python3 -m scripts.migrate_secrets_index --check    # EXPLAIN горячих запросов
+
+Код возврата 1 означает, что остались дубликаты или запросы не используют индекс.
+"""
+import argparse
+import sys
+from lockana.database.database import _db_instance
+from lockana.database.indexes import (
+    explain_secret_queries,
+    find_duplicate_secrets,
+    rename_duplicate_secrets
+)
+
+
+def check_indexes() -> bool:
+    ok = True
+    for label, (uses_index, plan) in explain_secret_queries(_db_instance.engine).items():
+        status = "OK" if uses_index else "FAIL"
+        print(f"[{status}] {label}:\n    " + plan.replace("\n", "\n    "))
+        ok = ok and uses_index
+    if not ok:
+        print("❌ Не все запросы используют свои индексы")
+    return ok
+
+
+def resolve_duplicates(rename_duplicates: bool) -> bool:
+    with _db_instance.engine.begin() as conn:
+        duplicates = find_duplicate_secrets(conn)
+        if duplicates and rename_duplicates:
+            renamed = rename_duplicate_secrets(conn)
+            print(f"✏️ Переименовано дубликатов: {renamed}")
+        elif duplicates:
+            print(f"❌ Найдено {len(duplicates)} пар (username, name) с дубликатами:")
+            for username, name, count in duplicates[:20]:
+                print(f"    {username} / {name}: {count}")
+            print("Запустите с --rename-duplicates, чтобы сохранить старые записи под именами вида <name>#<id>")
+            return False
+        else:
+            print("✅ Дубликатов нет")
+    print("Теперь выполните `python app.py migrate`")
+    return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Подготовка уникального индекса секретов")
+    parser.add_argument(
+        "--rename-duplicates", action="store_true",
+        help="Переименовать дубликаты (username, name) перед миграцией"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Только проверить через EXPLAIN, что горячие запросы используют индексы"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.check:
+        sys.exit(0 if check_indexes() else 1)
+    sys.exit(0 if resolve_duplicates(args.rename_duplicates) else 1)
@@ -0,0 +1,99 @@
+"""
+Ротация ключей шифрования секретов.
+
+Задание приводит все секреты к активному мастер-ключу (`MASTER_KEYS`, см. README) и
+алгоритму `encryption.algorithm`: у секретов с собственным ключом данных перешифровывается
+только ключ данных, секреты без ключа данных или под другим алгоритмом шифруются заново.
+Задание обрабатывает таблицу пачками, сохраняет контрольную точку и может быть продолжено
+после остановки. Сервис при этом продолжает работать.
+
+Запуск:
+    python3 -m scripts.rotate_keys                       # новое задание
+    python3 -m scripts.rotate_keys --reencrypt           # перешифровать все секреты новыми ключами данных
+    python3 -m scripts.rotate_keys --resume 3            # продолжить задание 3
+    python3 -m scripts.rotate_keys --status [3]          # состояние задания (по умолчанию последнего)
+    python3 -m scripts.rotate_keys --cancel 3            # остановить задание 3 после текущей пачки
+"""
+import argparse
+import json
+import sys
+from lockana.config import ROTATION_BATCH_SIZE, ROTATION_WORKERS, ROTATION_MAX_ROWS_PER_SECOND
+from lockana.database.database import _db_instance
+from lockana.exceptions import ConflictError, ResourceNotFoundError
+from lockana.models import KeyRotationJob
+from lockana.rotation import (
+    KeyRotationRunner,
+    cancel_rotation_job,
+    claim_rotation_job,
+    create_rotation_job,
+    job_to_dict
+)
+
+
+def show_status(job_id) -> bool:
+    with _db_instance.SessionLocal() as session:
+        if job_id:
+            job = session.get(KeyRotationJob, job_id)
+        else:
+            job = session.query(KeyRotationJob).order_by(KeyRotationJob.id.desc()).first()
+        if job is None:
+            print("❌ Задание не найдено")
+            return False
+        print(json.dumps(job_to_dict(job), ensure_ascii=False, indent=2))
+        return True
+
+
+def cancel(job_id: int) -> bool:
+    with _db_instance.SessionLocal() as session:
+        job = cancel_rotation_job(session, job_id)
+        session.commit()
+        print(f"⏹️ Задание {job.id}: {job.status}")
+        return True
+
+
+def rotate(args) -> bool:
+    with _db_instance.SessionLocal() as session:
+        if args.resume:
+            job = claim_rotation_job(session, args.resume)
+        else:
+            job = create_rotation_job(session, "reencrypt" if args.reencrypt else "auto")
+        session.commit()
+        job_id = job.id
+
+    print(f"🔑 Задание ротации ключей {job_id} запущено")
+    runner = KeyRotationRunner(batch_size=args.batch_size, workers=args.workers, max_rows_per_second=args.rate)
+    result = runner.run(job_id)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return result["status"] == "completed" and not result["failed"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ротация ключей шифрования секретов")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--reencrypt", action="store_true", help="Перешифровать все секреты новыми ключами данных")
+    group.add_argument("--resume", type=int, metavar="ID", help="Продолжить прерванное задание")
+    group.add_argument("--status", nargs="?", type=int, const=0, metavar="ID", help="Показать состояние задания")
+    group.add_argument("--cancel", type=int, metavar="ID", help="Остановить задание")
+    parser.add_argument("--batch-size", type=int, default=ROTATION_BATCH_SIZE, help="Секретов в пачке")
+    parser.add_argument("--workers", type=int, default=ROTATION_WORKERS, help="Процессов шифрования (0 - по числу CPU)")
+    parser.add_argument("--rate", type=float, default=ROTATION_MAX_ROWS_PER_SECOND, help="Максимум секретов в секунду (0 - без ограничения)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        if args.status is not None:
+            ok = show_status(args.status)
+        elif args.cancel:
+            ok = cancel(args.cancel)
+        else:
+            ok = rotate(args)
+    except (ConflictError, ResourceNotFoundError) as error:
+        print(f"❌ {error.detail}")
+        return 1
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
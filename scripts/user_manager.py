@@ -3,7 +3,9 @@ from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 from lockana.totp import TOTPManager
 from lockana.database.database import _db_instance
+from lockana.database.database_setup import create_database_tables
 from lockana.models import User, Role, Permission
+from lockana.permissions import bump_permissions_version
 
 totp_manager = TOTPManager()
 
@@ -98,6 +100,7 @@ def add_user_interactive():
             session.commit()
             handle_permissions(session, role)
             session.commit()
+            bump_permissions_version()
 
         secret, uri = generate_secret_interactive(username)
         
@@ -111,6 +114,7 @@ def add_user_interactive():
         try:
             session.add(new_user)
             session.commit()
+            bump_permissions_version()
             print(f"✅ Пользователь {username} успешно добавлен!")
             print(f"Роль: {role_name}")
             print(f"Секрет: {secret}")
@@ -224,6 +228,7 @@ def delete_role():
         if role:
             session.delete(role)
             session.commit()
+            bump_permissions_version()
             print(f"✅ Роль {role_name} удалена!")
         else:
             print(f"❌ Роль {role_name} не найдена!")
@@ -261,6 +266,7 @@ def assign_permissions(role_name: str = None):
 
         role.permissions = selected
         session.commit()
+        bump_permissions_version()
         print(f"✅ Разрешения для роли {role_name} обновлены!")
 
 def delete_user():
@@ -287,6 +293,7 @@ def delete_user():
         if user:
             session.delete(user)
             session.commit()
+            bump_permissions_version()
             print(f"✅ Пользователь {username} успешно удалён!")
         else:
             print(f"❌ Пользователь {username} не найден!")
@@ -332,6 +339,7 @@ def edit_user():
                     
                 user.roles.append(role)
                 session.commit()
+                bump_permissions_version()
                 print(f"✅ Роль {role_name} добавлена пользователю {username}")
                 
             elif action == "remove_role":
@@ -347,6 +355,7 @@ def edit_user():
                 role = session.query(Role).filter_by(name=role_to_remove).first()
                 user.roles.remove(role)
                 session.commit()
+                bump_permissions_version()
                 print(f"✅ Роль {role_to_remove} удалена у пользователя {username}")
                 
             elif action == "reset_totp":
@@ -404,5 +413,6 @@ def main_menu():
 
 if __name__ == "__main__":
     print("🛡️ Lockana User Management CLI\n")
+    create_database_tables()
     initialize_roles_and_permissions() 
     main_menu()
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Окружение тестов: SQLite во временном каталоге вместо MySQL и fakeredis вместо Redis.
+
+Переменные окружения задаются до импорта модулей `lockana`: конфигурация читается при импорте,
+а клиенты Redis создаются на уровне модуля `lockana.redis_client` (в режиме fake).
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="lockana-tests-")
+
+os.environ["DATABASE_STRING"] = f"sqlite:///{os.path.join(WORK_DIR, 'tests.db')}"
+os.environ.pop("DATABASE_ASYNC_STRING", None)
+os.environ.setdefault("SECRET_KEY", "0123456789abcdef0123456789abcdef")
+os.environ.setdefault("JWT_SECRET_KEY", "tests-jwt-secret")
+os.environ.pop("MASTER_KEYS", None)
+os.environ["REDIS_MODE"] = "fake"
+
+# config.yaml читается из текущего каталога
+os.chdir(ROOT)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    Схема базы данных, созданная миграциями (как `python app.py migrate`).
+    """
+    from lockana.database.database import _db_instance
+    from lockana.database.database_setup import create_database_tables
+    create_database_tables()
+    yield _db_instance
+    _db_instance.close()
+
+
+@pytest.fixture
+def db_session(database):
+    with database.SessionLocal() as session:
+        yield session
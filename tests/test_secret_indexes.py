@@ -0,0 +1,47 @@
+"""
+Запросы к секретам используют индексы `ux_secrets_username_name` и `ix_secrets_username_id`,
+а постраничный список выбирает страницы по курсору.
+"""
+import asyncio
+import pytest
+from sqlalchemy import inspect
+from lockana.api.v1.secrets.service import SecretService
+from lockana.database.indexes import SECRETS_LIST_INDEX, SECRETS_UNIQUE_INDEX, explain_secret_queries
+from lockana.models import Secret
+
+
+def test_migrations_create_model_indexes(database):
+    migrated = {index["name"] for index in inspect(database.engine).get_indexes("secrets")}
+    assert {index.name for index in Secret.__table__.indexes} <= migrated
+    assert {SECRETS_UNIQUE_INDEX, SECRETS_LIST_INDEX} <= migrated
+
+
+@pytest.mark.parametrize("label", ["get/update/delete", "batch-get", "list"])
+def test_hot_queries_use_index(database, label):
+    uses_index, plan = explain_secret_queries(database.engine)[label]
+    assert uses_index, plan
+
+
+def test_list_secrets_pages_by_cursor(db_session):
+    service = SecretService(db_session)
+    names = [f"secret-{number}" for number in range(5)]
+    for name in names:
+        asyncio.run(service.add_secret("pager", name, "value"))
+    asyncio.run(service.add_secret("other", "secret-0", "value"))
+    db_session.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = asyncio.run(service.list_secrets("pager", 2, cursor, True))
+        seen.extend(secret["name"] for secret in page["secrets"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == names
+    assert pages == 3
+
+    # Страница ровно на все записи: следующей страницы нет
+    page = asyncio.run(service.list_secrets("pager", len(names), None, True))
+    assert page["next_cursor"] is None
+    assert [secret["name"] for secret in page["secrets"]] == names